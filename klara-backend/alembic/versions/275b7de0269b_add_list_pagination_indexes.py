@@ -0,0 +1,56 @@
+"""Add composite indexes for paginated list endpoints
+
+Revision ID: 275b7de0269b
+Revises: 3aab0895a699
+Create Date: 2026-10-17 10:12:41.508317
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "275b7de0269b"
+down_revision: Union[str, Sequence[str], None] = "3aab0895a699"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_tasks_user_id_id", "tasks", ["user_id", "id"])
+    op.create_index(
+        "ix_tasks_user_id_completed_id", "tasks", ["user_id", "completed", "id"]
+    )
+    op.create_index(
+        "ix_tasks_user_id_due_date_id", "tasks", ["user_id", "due_date", "id"]
+    )
+    op.create_index(
+        "ix_tasks_user_id_completed_due_date",
+        "tasks",
+        ["user_id", "completed", "due_date", "id"],
+    )
+    op.create_index("ix_shopping_items_user_id_id", "shopping_items", ["user_id", "id"])
+    op.create_index(
+        "ix_shopping_items_user_id_completed_id",
+        "shopping_items",
+        ["user_id", "completed", "id"],
+    )
+    op.create_index(
+        "ix_calendar_events_user_id_event_date",
+        "calendar_events",
+        ["user_id", "event_date", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_calendar_events_user_id_event_date", table_name="calendar_events")
+    op.drop_index("ix_shopping_items_user_id_completed_id", table_name="shopping_items")
+    op.drop_index("ix_shopping_items_user_id_id", table_name="shopping_items")
+    op.drop_index("ix_tasks_user_id_completed_due_date", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_due_date_id", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_completed_id", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_id", table_name="tasks")
@@ -0,0 +1,29 @@
+"""Add job_id to idempotency_keys for queued brain dumps
+
+Revision ID: 346fef4bce6c
+Revises: e4efceb7309b
+Create Date: 2026-10-17 16:40:27.390514
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "346fef4bce6c"
+down_revision: Union[str, Sequence[str], None] = "e4efceb7309b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("idempotency_keys", sa.Column("job_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("idempotency_keys", "job_id")
@@ -0,0 +1,130 @@
+"""Store each brain dump's text once, in brain_dumps
+
+Revision ID: e4efceb7309b
+Revises: f3b5d0ed03e3
+Create Date: 2026-10-17 15:02:11.418530
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4efceb7309b"
+down_revision: Union[str, Sequence[str], None] = "f3b5d0ed03e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ITEM_TABLES = ("tasks", "shopping_items", "calendar_events")
+
+# Items of one submission were saved in one transaction (so with the same
+# created_at) or, when streamed, seconds apart
+SUBMISSION_GAP = "interval '1 minute'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "brain_dumps",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("raw_input", sa.Text(), nullable=False),
+        sa.Column("source", sa.String(length=16), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_brain_dumps_user_id_id", "brain_dumps", ["user_id", "id"])
+    for table in ITEM_TABLES:
+        op.add_column(table, sa.Column("brain_dump_id", sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            f"fk_{table}_brain_dump_id",
+            table,
+            "brain_dumps",
+            ["brain_dump_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+
+    # Backfill: one brain dump per submission, dated by its first item. A
+    # user's items with the same text belong to one submission unless more
+    # than SUBMISSION_GAP separates them, so a list sent every week keeps
+    # one brain dump per week.
+    op.execute(
+        f"""
+        INSERT INTO brain_dumps (user_id, raw_input, created_at)
+        SELECT user_id, raw_input, created_at
+        FROM (
+            SELECT
+                user_id,
+                raw_input,
+                created_at,
+                LAG(created_at) OVER (
+                    PARTITION BY user_id, raw_input ORDER BY created_at
+                ) AS previous_at
+            FROM (
+                SELECT user_id, raw_input, created_at FROM tasks
+                UNION
+                SELECT user_id, raw_input, created_at FROM shopping_items
+                UNION
+                SELECT user_id, raw_input, created_at FROM calendar_events
+            ) AS items
+        ) AS ordered
+        WHERE previous_at IS NULL OR created_at - previous_at > {SUBMISSION_GAP}
+        ORDER BY created_at
+        """
+    )
+    # Long texts don't fit in a btree entry, so match on their hash
+    op.execute(
+        "CREATE INDEX tmp_brain_dumps_backfill "
+        "ON brain_dumps (user_id, md5(raw_input), created_at)"
+    )
+    # Each item belongs to the latest submission started at or before it
+    for table in ITEM_TABLES:
+        op.execute(
+            f"""
+            UPDATE {table} AS item
+            SET brain_dump_id = (
+                SELECT brain_dumps.id
+                FROM brain_dumps
+                WHERE brain_dumps.user_id = item.user_id
+                  AND md5(brain_dumps.raw_input) = md5(item.raw_input)
+                  AND brain_dumps.raw_input = item.raw_input
+                  AND brain_dumps.created_at <= item.created_at
+                ORDER BY brain_dumps.created_at DESC
+                LIMIT 1
+            )
+            """
+        )
+    op.execute("DROP INDEX tmp_brain_dumps_backfill")
+
+    for table in ITEM_TABLES:
+        op.drop_column(table, "raw_input")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ITEM_TABLES:
+        op.add_column(table, sa.Column("raw_input", sa.Text(), nullable=True))
+        op.execute(
+            f"""
+            UPDATE {table} AS item
+            SET raw_input = brain_dumps.raw_input
+            FROM brain_dumps
+            WHERE brain_dumps.id = item.brain_dump_id
+            """
+        )
+        op.execute(f"UPDATE {table} SET raw_input = '' WHERE raw_input IS NULL")
+        op.alter_column(table, "raw_input", nullable=False)
+        op.drop_constraint(f"fk_{table}_brain_dump_id", table, type_="foreignkey")
+        op.drop_column(table, "brain_dump_id")
+    op.drop_index("ix_brain_dumps_user_id_id", table_name="brain_dumps")
+    op.drop_table("brain_dumps")
@@ -0,0 +1,60 @@
+"""Add brain_dump_jobs table for background processing
+
+Revision ID: f3b5d0ed03e3
+Revises: f385c4c80ee7
+Create Date: 2026-10-17 12:31:48.771205
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b5d0ed03e3"
+down_revision: Union[str, Sequence[str], None] = "f385c4c80ee7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "brain_dump_jobs",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("priority", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("callback_url", sa.Text(), nullable=True),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("started_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_brain_dump_jobs_status_priority_id",
+        "brain_dump_jobs",
+        ["status", "priority", "id"],
+    )
+    op.create_index(
+        "ix_brain_dump_jobs_user_id_status", "brain_dump_jobs", ["user_id", "status"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_brain_dump_jobs_user_id_status", table_name="brain_dump_jobs")
+    op.drop_index("ix_brain_dump_jobs_status_priority_id", table_name="brain_dump_jobs")
+    op.drop_table("brain_dump_jobs")
@@ -0,0 +1,289 @@
+"""
+Brain dump persistence - saves every item of processed brain dumps in bulk
+"""
+
+from typing import Dict, List, NamedTuple, Optional, overload
+from datetime import datetime, date, time
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db_models import Task, SubTask, ShoppingItem, CalendarEvent
+from app.access import (
+    task_access,
+    shopping_item_access,
+    calendar_event_access,
+    raw_input_access,
+)
+from app.tracing import tracer
+from app.models import (
+    ProcessedBrainDump,
+    ProcessedTask,
+    ProcessedShoppingItem,
+    ProcessedCalendarEvent,
+    BrainDumpResponse,
+    TaskResponse,
+    SubTaskResponse,
+    ShoppingItemResponse,
+    CalendarEventResponse,
+)
+
+
+@overload
+def parse_date(value: str) -> date: ...
+@overload
+def parse_date(value: Optional[str]) -> Optional[date]: ...
+def parse_date(value: Optional[str]) -> Optional[date]:
+    """Convert a YYYY-MM-DD string from the LLM to a date"""
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_time(value: Optional[str]) -> Optional[time]:
+    """Convert an HH:MM or HH:MM:SS string from the LLM to a time"""
+    if not value:
+        return None
+    time_format = "%H:%M:%S" if value.count(":") == 2 else "%H:%M"
+    return datetime.strptime(value, time_format).time()
+
+
+class BrainDumpToSave(NamedTuple):
+    """A processed brain dump waiting to be persisted"""
+
+    user_id: int
+    raw_input: str
+    processed: ProcessedBrainDump
+
+
+class StoredBrainDump(NamedTuple):
+    """A saved brain dump whose items are saved one at a time (streaming)"""
+
+    id: int
+    raw_input: str
+
+
+async def save_processed_brain_dump(
+    session: AsyncSession,
+    user_id: int,
+    raw_input: str,
+    processed: ProcessedBrainDump,
+    source: Optional[str] = "sync",
+) -> BrainDumpResponse:
+    """Save a processed brain dump and all its items in bulk"""
+    responses = await save_processed_brain_dumps(
+        session, [BrainDumpToSave(user_id, raw_input, processed)], source
+    )
+    return responses[0]
+
+
+async def save_processed_brain_dumps(
+    session: AsyncSession, dumps: List[BrainDumpToSave], source: Optional[str] = "batch"
+) -> List[BrainDumpResponse]:
+    """
+    Save many processed brain dumps using multi-row INSERT ... RETURNING
+
+    Issues one statement per table (brain dumps, tasks, subtasks, shopping
+    items, calendar events) for the whole list instead of one flush per item.
+    Each brain dump's text is stored once, in brain_dumps, and its items
+    reference it. Brain dump, task, shopping item and calendar event rows are
+    matched back to their brain dump positionally, so those inserts return
+    their rows in parameter order; on SQLite that ordering is emulated row by
+    row, on Postgres it stays a single statement.
+
+    Returns one BrainDumpResponse per brain dump, in the same order; its items
+    include the raw input.
+    """
+    # Time outside the statement spans is spent building rows and responses
+    with tracer.span("brain_dump.save", **{"klara.brain_dumps": len(dumps)}):
+        return await _save_processed_brain_dumps(session, dumps, source)
+
+
+async def _save_processed_brain_dumps(
+    session: AsyncSession, dumps: List[BrainDumpToSave], source: Optional[str]
+) -> List[BrainDumpResponse]:
+    brain_dump_ids = await raw_input_access.create_brain_dumps(
+        session, [(dump.user_id, dump.raw_input) for dump in dumps], source
+    )
+    responses = [
+        BrainDumpResponse(brain_dump_id=brain_dump_id)
+        for brain_dump_id in brain_dump_ids
+    ]
+
+    # Save all tasks
+    task_owners = [
+        (index, task)
+        for index, dump in enumerate(dumps)
+        for task in dump.processed.tasks
+    ]
+    tasks: List[Task] = []
+    if task_owners:
+        task_result = await session.scalars(
+            insert(Task).returning(Task, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": dumps[index].user_id,
+                    "description": task.description,
+                    "due_date": parse_date(task.due_date),
+                    "estimated_time_minutes": task.estimated_time_minutes,
+                    "brain_dump_id": brain_dump_ids[index],
+                }
+                for index, task in task_owners
+            ],
+        )
+        tasks = list(task_result)
+
+    # Save subtasks of all decomposed tasks in one pass, linked by parent ID
+    subtask_rows = [
+        {
+            "parent_task_id": task.id,
+            "description": subtask.description,
+            "order": subtask.order,
+            "estimated_time_minutes": subtask.estimated_time_minutes,
+            "due_date": parse_date(subtask.due_date),
+        }
+        for task, (_, processed_task) in zip(tasks, task_owners)
+        if processed_task.should_decompose
+        for subtask in processed_task.subtasks
+    ]
+    subtasks_by_parent: Dict[int, List[SubTaskResponse]] = {}
+    if subtask_rows:
+        subtask_result = await session.scalars(
+            insert(SubTask).returning(SubTask), subtask_rows
+        )
+        for subtask in sorted(
+            subtask_result, key=lambda s: (s.parent_task_id, s.order)
+        ):
+            subtasks_by_parent.setdefault(subtask.parent_task_id, []).append(
+                task_access.subtask_response(subtask)
+            )
+
+    for task, (index, _) in zip(tasks, task_owners):
+        responses[index].tasks.append(
+            task_access.task_response(
+                task, subtasks_by_parent.get(task.id), dumps[index].raw_input
+            )
+        )
+
+    # Save all shopping items
+    item_owners = [
+        (index, item)
+        for index, dump in enumerate(dumps)
+        for item in dump.processed.shopping_items
+    ]
+    if item_owners:
+        shopping_result = await session.scalars(
+            insert(ShoppingItem).returning(ShoppingItem, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": dumps[index].user_id,
+                    "description": item.description,
+                    "brain_dump_id": brain_dump_ids[index],
+                }
+                for index, item in item_owners
+            ],
+        )
+        for shopping_item, (index, _) in zip(shopping_result, item_owners):
+            responses[index].shopping_items.append(
+                shopping_item_access.shopping_item_response(
+                    shopping_item, dumps[index].raw_input
+                )
+            )
+
+    # Save all calendar events
+    event_owners = [
+        (index, event)
+        for index, dump in enumerate(dumps)
+        for event in dump.processed.calendar_events
+    ]
+    if event_owners:
+        event_result = await session.scalars(
+            insert(CalendarEvent).returning(
+                CalendarEvent, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "user_id": dumps[index].user_id,
+                    "description": event.description,
+                    "event_date": parse_date(event.event_date),
+                    "event_time": parse_time(event.event_time),
+                    "brain_dump_id": brain_dump_ids[index],
+                }
+                for index, event in event_owners
+            ],
+        )
+        for calendar_event, (index, _) in zip(event_result, event_owners):
+            responses[index].calendar_events.append(
+                calendar_event_access.calendar_event_response(
+                    calendar_event, dumps[index].raw_input
+                )
+            )
+
+    return responses
+
+
+async def save_processed_task(
+    session: AsyncSession,
+    user_id: int,
+    brain_dump: StoredBrainDump,
+    task: ProcessedTask,
+) -> TaskResponse:
+    """Save a single processed task and its subtasks (used when streaming)"""
+    saved_task = await task_access.create_task(
+        session=session,
+        user_id=user_id,
+        description=task.description,
+        due_date=parse_date(task.due_date),
+        estimated_time_minutes=task.estimated_time_minutes,
+        brain_dump_id=brain_dump.id,
+    )
+    saved_task.raw_input = brain_dump.raw_input
+    if task.should_decompose and task.subtasks:
+        saved_task.subtasks = await task_access.create_subtasks(
+            session=session,
+            parent_task_id=saved_task.id,
+            subtasks=[
+                {
+                    "description": subtask.description,
+                    "order": subtask.order,
+                    "estimated_time_minutes": subtask.estimated_time_minutes,
+                    "due_date": parse_date(subtask.due_date),
+                }
+                for subtask in task.subtasks
+            ],
+        )
+    return saved_task
+
+
+async def save_processed_shopping_item(
+    session: AsyncSession,
+    user_id: int,
+    brain_dump: StoredBrainDump,
+    item: ProcessedShoppingItem,
+) -> ShoppingItemResponse:
+    """Save a single processed shopping item (used when streaming)"""
+    saved_item = await shopping_item_access.create_shopping_item(
+        session=session,
+        user_id=user_id,
+        description=item.description,
+        brain_dump_id=brain_dump.id,
+    )
+    saved_item.raw_input = brain_dump.raw_input
+    return saved_item
+
+
+async def save_processed_calendar_event(
+    session: AsyncSession,
+    user_id: int,
+    brain_dump: StoredBrainDump,
+    event: ProcessedCalendarEvent,
+) -> CalendarEventResponse:
+    """Save a single processed calendar event (used when streaming)"""
+    saved_event = await calendar_event_access.create_calendar_event(
+        session=session,
+        user_id=user_id,
+        description=event.description,
+        event_date=parse_date(event.event_date),
+        event_time=parse_time(event.event_time),
+        brain_dump_id=brain_dump.id,
+    )
+    saved_event.raw_input = brain_dump.raw_input
+    return saved_event
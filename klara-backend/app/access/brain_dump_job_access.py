@@ -0,0 +1,164 @@
+"""
+Brain dump job database access functions - the database-backed job queue
+"""
+
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db_models import BrainDumpJob
+from app.models import BrainDumpJobResponse, BrainDumpResponse
+
+
+class ClaimedJob(NamedTuple):
+    """A job a worker has started and must finish"""
+
+    id: int
+    user_id: int
+    text: str
+    callback_url: Optional[str]
+
+
+def job_response(job: BrainDumpJob) -> BrainDumpJobResponse:
+    return BrainDumpJobResponse(
+        id=job.id,
+        user_id=job.user_id,
+        status=job.status,  # type: ignore[arg-type]
+        priority=job.priority,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=BrainDumpResponse.model_validate_json(job.result)
+        if job.result
+        else None,
+        error=job.error,
+    )
+
+
+async def create_job(
+    session: AsyncSession,
+    user_id: int,
+    text: str,
+    priority: int = 0,
+    callback_url: Optional[str] = None,
+) -> BrainDumpJobResponse:
+    """Queue a brain dump (flushed, not committed)"""
+    job = BrainDumpJob(
+        user_id=user_id,
+        text=text,
+        priority=priority,
+        status="queued",
+        callback_url=callback_url,
+        attempts=0,
+    )
+    session.add(job)
+    await session.flush()
+    return job_response(job)
+
+
+async def get_job(
+    session: AsyncSession, job_id: int, user_id: int
+) -> Optional[BrainDumpJobResponse]:
+    """A user's job, or None if it doesn't exist or belongs to someone else"""
+    job = await session.scalar(
+        select(BrainDumpJob).where(
+            BrainDumpJob.id == job_id, BrainDumpJob.user_id == user_id
+        )
+    )
+    return job_response(job) if job is not None else None
+
+
+async def claim_next_job(
+    session: AsyncSession, max_running_per_user: int
+) -> Optional[ClaimedJob]:
+    """
+    Mark the next queued job as running and return it
+
+    Picks the highest-priority, oldest queued job of a user with fewer than
+    max_running_per_user running jobs. The claim is a conditional UPDATE, so
+    when workers in several processes race for the same job only one gets it;
+    the others try the next one. Flushed, not committed.
+
+    Args:
+        session: Database session
+        max_running_per_user: Per-user concurrency limit
+
+    Returns:
+        The claimed job, or None if nothing can run now
+    """
+    users_at_limit = (
+        select(BrainDumpJob.user_id)
+        .where(BrainDumpJob.status == "running")
+        .group_by(BrainDumpJob.user_id)
+        .having(func.count() >= max_running_per_user)
+    )
+    while True:
+        candidate = (
+            await session.execute(
+                select(
+                    BrainDumpJob.id,
+                    BrainDumpJob.user_id,
+                    BrainDumpJob.text,
+                    BrainDumpJob.callback_url,
+                )
+                .where(
+                    BrainDumpJob.status == "queued",
+                    BrainDumpJob.user_id.not_in(users_at_limit),
+                )
+                .order_by(BrainDumpJob.priority.desc(), BrainDumpJob.id)
+                .limit(1)
+            )
+        ).one_or_none()
+        if candidate is None:
+            return None
+
+        claimed = await session.execute(
+            update(BrainDumpJob)
+            .where(BrainDumpJob.id == candidate.id, BrainDumpJob.status == "queued")
+            .values(
+                status="running",
+                started_at=datetime.now(timezone.utc),
+                attempts=BrainDumpJob.attempts + 1,
+            )
+        )
+        if claimed.rowcount == 1:  # type: ignore[attr-defined]
+            return ClaimedJob(*candidate)
+
+
+async def finish_job(
+    session: AsyncSession,
+    job_id: int,
+    result: Optional[BrainDumpResponse] = None,
+    error: Optional[str] = None,
+) -> Optional[BrainDumpJobResponse]:
+    """Record a job's result or error (flushed, not committed)"""
+    job = await session.get(BrainDumpJob, job_id)
+    if job is None:
+        return None
+    job.status = "failed" if error is not None else "succeeded"
+    job.result = result.model_dump_json() if result is not None else None
+    job.error = error
+    job.finished_at = datetime.now(timezone.utc)
+    await session.flush()
+    return job_response(job)
+
+
+async def requeue_stale_jobs(session: AsyncSession, started_before: datetime) -> int:
+    """
+    Queue running jobs again whose worker has presumably died
+
+    Returns:
+        The number of jobs queued again (flushed, not committed)
+    """
+    requeued = await session.execute(
+        update(BrainDumpJob)
+        .where(
+            BrainDumpJob.status == "running",
+            BrainDumpJob.started_at < started_before,
+        )
+        .values(status="queued", started_at=None)
+    )
+    await session.flush()
+    return requeued.rowcount  # type: ignore[attr-defined]
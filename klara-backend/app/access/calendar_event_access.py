@@ -2,19 +2,22 @@
 Calendar event database access functions
 """
 
-from typing import Optional
+from typing import Dict, Optional
 from datetime import date, time
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db_models import CalendarEvent
-from app.models import CalendarEventResponse
+from app.models import CalendarEventResponse, CalendarEventPage
+from app.access.pagination import decode_date_id_cursor, next_cursor, split_page
+from app.access.raw_input_access import load_raw_inputs
 
 
-def create_calendar_event(
-    session: Session,
+async def create_calendar_event(
+    session: AsyncSession,
     user_id: int,
     description: str,
     event_date: date,
-    raw_input: str,
+    brain_dump_id: Optional[int] = None,
     event_time: Optional[time] = None,
 ) -> CalendarEventResponse:
     """Create a new calendar event"""
@@ -23,11 +26,76 @@ def create_calendar_event(
         description=description,
         event_date=event_date,
         event_time=event_time,
-        raw_input=raw_input,
+        brain_dump_id=brain_dump_id,
     )
     session.add(calendar_event)
-    session.flush()
+    await session.flush()
+
+    return calendar_event_response(calendar_event)
+
+
+async def list_calendar_events(
+    session: AsyncSession,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+) -> CalendarEventPage:
+    """
+    List one page of a user's calendar events in date order
+
+    Args:
+        session: Database session
+        user_id: Owner of the events
+        date_from: Only events on or after this date
+        date_to: Only events on or before this date
+        limit: Page size
+        cursor: next_cursor of the previous page
+        include_raw_input: Also load the text of each event's brain dump
+
+    Returns:
+        CalendarEventPage with the events and the cursor of the next page
 
+    Raises:
+        InvalidCursorError: If the cursor is malformed or from another ordering
+    """
+    ordering = "calendar_events:event_date"
+    query = select(CalendarEvent).where(CalendarEvent.user_id == user_id)
+    if date_from is not None:
+        query = query.where(CalendarEvent.event_date >= date_from)
+    if date_to is not None:
+        query = query.where(CalendarEvent.event_date <= date_to)
+    if cursor:
+        query = query.where(
+            tuple_(CalendarEvent.event_date, CalendarEvent.id)
+            > decode_date_id_cursor(cursor, ordering)
+        )
+    query = query.order_by(CalendarEvent.event_date, CalendarEvent.id)
+
+    rows = (await session.scalars(query.limit(limit + 1))).all()
+    page, has_more = split_page(rows, limit)
+    raw_inputs: Dict[Optional[int], str] = {}
+    if include_raw_input:
+        raw_inputs = await load_raw_inputs(
+            session, [event.brain_dump_id for event in page]
+        )
+    return CalendarEventPage(
+        items=[
+            calendar_event_response(event, raw_inputs.get(event.brain_dump_id))
+            for event in page
+        ],
+        next_cursor=next_cursor(
+            ordering, page, has_more, lambda event: (event.event_date, event.id)
+        ),
+    )
+
+
+def calendar_event_response(
+    calendar_event: CalendarEvent, raw_input: Optional[str] = None
+) -> CalendarEventResponse:
+    """Convert a CalendarEvent row to its response model"""
     return CalendarEventResponse(
         id=calendar_event.id,
         user_id=calendar_event.user_id,
@@ -36,6 +104,7 @@ def create_calendar_event(
         event_time=str(calendar_event.event_time)
         if calendar_event.event_time
         else None,
-        raw_input=calendar_event.raw_input,
+        brain_dump_id=calendar_event.brain_dump_id,
+        raw_input=raw_input,
         created_at=calendar_event.created_at,
     )
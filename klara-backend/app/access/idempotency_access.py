@@ -0,0 +1,106 @@
+"""
+Idempotency key database access functions
+
+A client sends the same Idempotency-Key header when it retries a brain dump;
+the retry gets the stored response instead of processing the text again. For
+a brain dump queued with Prefer: respond-async the stored response is its job.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db_models import IdempotencyKey
+from app.models import BrainDumpJobResponse, BrainDumpResponse
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """The key was already used for a request with different content"""
+
+
+def key_ttl() -> timedelta:
+    """How long a key is remembered (IDEMPOTENCY_KEY_TTL_SECONDS)"""
+    return timedelta(seconds=int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", 86400)))
+
+
+def request_hash(text: str) -> str:
+    """Fingerprint of the request a key was first used with"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def get_response(
+    session: AsyncSession, user_id: int, key: str, text: str
+) -> Optional[Union[BrainDumpResponse, BrainDumpJobResponse]]:
+    """
+    The stored response for a user's idempotency key
+
+    An expired key is deleted (flushed, not committed) and treated as unused.
+
+    Args:
+        session: Database session
+        user_id: Owner of the key
+        key: Idempotency-Key header value
+        text: Brain dump text of the current request
+
+    Returns:
+        The response of the first request with this key (its job, if it was
+        queued), or None if unused
+
+    Raises:
+        IdempotencyKeyReusedError: The key was used with a different text
+    """
+    stored = await session.scalar(
+        select(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+        )
+    )
+    if stored is None:
+        return None
+
+    created_at = stored.created_at
+    # SQLite returns naive UTC timestamps
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - created_at > key_ttl():
+        await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id == stored.id)
+        )
+        await session.flush()
+        return None
+
+    if stored.request_hash != request_hash(text):
+        raise IdempotencyKeyReusedError(
+            "Idempotency-Key was already used for a different brain dump"
+        )
+    if stored.job_id is not None:
+        return BrainDumpJobResponse.model_validate_json(stored.response)
+    return BrainDumpResponse.model_validate_json(stored.response)
+
+
+def store_response(
+    session: AsyncSession,
+    user_id: int,
+    key: str,
+    text: str,
+    response: Union[BrainDumpResponse, BrainDumpJobResponse],
+) -> None:
+    """
+    Remember the response for a user's idempotency key
+
+    Added to the session only; commit it together with the brain dump's items
+    so a concurrent request with the same key fails on the unique constraint
+    instead of saving the items twice. A queued request's response is its job.
+    """
+    session.add(
+        IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash(text),
+            response=response.model_dump_json(),
+            job_id=response.id if isinstance(response, BrainDumpJobResponse) else None,
+        )
+    )
@@ -0,0 +1,76 @@
+"""
+Keyset (cursor) pagination helpers
+
+A cursor holds the sort key of the last row of a page, so the next page
+starts with a `WHERE (sort key) > (cursor)` range scan on an index instead
+of an OFFSET that reads and discards every earlier row.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed or belongs to a different ordering"""
+
+
+def encode_cursor(ordering: str, key: Sequence[Any]) -> str:
+    """Opaque cursor for a sort key (ints, strings and dates)"""
+    values = [value.isoformat() if isinstance(value, date) else value for value in key]
+    payload = json.dumps({"o": ordering, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ordering: str) -> List[Any]:
+    """The sort key stored in a cursor created for the same ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = payload["k"]
+        cursor_ordering = payload["o"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+    if cursor_ordering != ordering or not isinstance(key, list):
+        raise InvalidCursorError("Cursor does not match this query's ordering")
+    return key
+
+
+def decode_date_id_cursor(cursor: str, ordering: str) -> Tuple[date, int]:
+    """Decode a cursor whose sort key is (date, id)"""
+    key = decode_cursor(cursor, ordering)
+    try:
+        return date.fromisoformat(key[0]), int(key[1])
+    except (IndexError, TypeError, ValueError):
+        raise InvalidCursorError("Malformed cursor")
+
+
+def decode_id_cursor(cursor: str, ordering: str) -> int:
+    """Decode a cursor whose sort key is (id,)"""
+    key = decode_cursor(cursor, ordering)
+    try:
+        return int(key[0])
+    except (IndexError, TypeError, ValueError):
+        raise InvalidCursorError("Malformed cursor")
+
+
+def split_page(rows: Sequence[T], limit: int) -> Tuple[List[T], bool]:
+    """
+    Trim rows fetched with LIMIT limit + 1 to one page
+
+    Returns the page and whether there are more rows after it.
+    """
+    return list(rows[:limit]), len(rows) > limit
+
+
+def next_cursor(
+    ordering: str, page: Sequence[Any], has_more: bool, key_of
+) -> Optional[str]:
+    """Cursor for the page after `page`, or None on the last page"""
+    if not has_more or not page:
+        return None
+    return encode_cursor(ordering, key_of(page[-1]))
@@ -0,0 +1,62 @@
+"""
+Raw input database access functions - the brain_dumps table, which stores the
+text of each brain dump once for all the items it produced
+"""
+
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db_models import BrainDump
+
+
+async def create_brain_dump(
+    session: AsyncSession, user_id: int, raw_input: str, source: Optional[str] = None
+) -> int:
+    """Store a brain dump's text and return its ID (flushed, not committed)"""
+    return (await create_brain_dumps(session, [(user_id, raw_input)], source))[0]
+
+
+async def create_brain_dumps(
+    session: AsyncSession,
+    dumps: List[Tuple[int, str]],
+    source: Optional[str] = None,
+) -> List[int]:
+    """
+    Store the text of many brain dumps in one INSERT ... RETURNING
+
+    Args:
+        session: Database session
+        dumps: (user_id, raw_input) per brain dump
+        source: How they were submitted: sync, stream, batch or job
+
+    Returns:
+        The new brain dump IDs, in the order of dumps
+    """
+    if not dumps:
+        return []
+    ids = await session.scalars(
+        insert(BrainDump).returning(BrainDump.id, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "raw_input": raw_input, "source": source}
+            for user_id, raw_input in dumps
+        ],
+    )
+    return list(ids)
+
+
+async def load_raw_inputs(
+    session: AsyncSession, brain_dump_ids: List[Optional[int]]
+) -> Dict[Optional[int], str]:
+    """
+    Text of many brain dumps in one query, by brain dump ID
+
+    Keyed by Optional[int] so items without a brain dump can look themselves
+    up; they are never found.
+    """
+    wanted = {brain_dump_id for brain_dump_id in brain_dump_ids if brain_dump_id}
+    if not wanted:
+        return {}
+    rows = await session.execute(
+        select(BrainDump.id, BrainDump.raw_input).where(BrainDump.id.in_(wanted))
+    )
+    return {row.id: row.raw_input for row in rows}
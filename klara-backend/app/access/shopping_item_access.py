@@ -2,25 +2,90 @@
 Shopping item database access functions
 """
 
-from sqlalchemy.orm import Session
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db_models import ShoppingItem
-from app.models import ShoppingItemResponse
+from app.models import ShoppingItemResponse, ShoppingItemPage
+from app.access.pagination import decode_id_cursor, next_cursor, split_page
+from app.access.raw_input_access import load_raw_inputs
 
 
-def create_shopping_item(
-    session: Session, user_id: int, description: str, raw_input: str
+async def create_shopping_item(
+    session: AsyncSession,
+    user_id: int,
+    description: str,
+    brain_dump_id: Optional[int] = None,
 ) -> ShoppingItemResponse:
     """Create a new shopping item"""
     shopping_item = ShoppingItem(
-        user_id=user_id, description=description, raw_input=raw_input
+        user_id=user_id, description=description, brain_dump_id=brain_dump_id
     )
     session.add(shopping_item)
-    session.flush()
+    await session.flush()
 
+    return shopping_item_response(shopping_item)
+
+
+async def list_shopping_items(
+    session: AsyncSession,
+    user_id: int,
+    completed: Optional[bool] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+) -> ShoppingItemPage:
+    """
+    List one page of a user's shopping items, newest first
+
+    Args:
+        session: Database session
+        user_id: Owner of the shopping items
+        completed: Only purchased (True) or still needed (False) items
+        limit: Page size
+        cursor: next_cursor of the previous page
+        include_raw_input: Also load the text of each item's brain dump
+
+    Returns:
+        ShoppingItemPage with the items and the cursor of the next page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or from another ordering
+    """
+    ordering = "shopping_items:newest"
+    query = select(ShoppingItem).where(ShoppingItem.user_id == user_id)
+    if completed is not None:
+        query = query.where(ShoppingItem.completed == completed)
+    if cursor:
+        query = query.where(ShoppingItem.id < decode_id_cursor(cursor, ordering))
+    query = query.order_by(ShoppingItem.id.desc()).limit(limit + 1)
+
+    rows = (await session.scalars(query)).all()
+    page, has_more = split_page(rows, limit)
+    raw_inputs: Dict[Optional[int], str] = {}
+    if include_raw_input:
+        raw_inputs = await load_raw_inputs(
+            session, [item.brain_dump_id for item in page]
+        )
+    return ShoppingItemPage(
+        items=[
+            shopping_item_response(item, raw_inputs.get(item.brain_dump_id))
+            for item in page
+        ],
+        next_cursor=next_cursor(ordering, page, has_more, lambda item: (item.id,)),
+    )
+
+
+def shopping_item_response(
+    shopping_item: ShoppingItem, raw_input: Optional[str] = None
+) -> ShoppingItemResponse:
+    """Convert a ShoppingItem row to its response model"""
     return ShoppingItemResponse(
         id=shopping_item.id,
         user_id=shopping_item.user_id,
         description=shopping_item.description,
-        raw_input=shopping_item.raw_input,
+        completed=shopping_item.completed,
+        brain_dump_id=shopping_item.brain_dump_id,
+        raw_input=raw_input,
         created_at=shopping_item.created_at,
     )
@@ -2,18 +2,26 @@
 Task database access functions
 """
 
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db_models import Task, SubTask
-from app.models import TaskResponse, SubTaskResponse
+from app.models import TaskResponse, SubTaskResponse, TaskPage
+from app.access.raw_input_access import load_raw_inputs
+from app.access.pagination import (
+    decode_date_id_cursor,
+    decode_id_cursor,
+    next_cursor,
+    split_page,
+)
 
 
-def create_task(
-    session: Session,
+async def create_task(
+    session: AsyncSession,
     user_id: int,
     description: str,
-    raw_input: str,
+    brain_dump_id: Optional[int] = None,
     due_date: Optional[date] = None,
     estimated_time_minutes: Optional[int] = None,
 ) -> TaskResponse:
@@ -23,11 +31,99 @@ def create_task(
         description=description,
         due_date=due_date,
         estimated_time_minutes=estimated_time_minutes,
-        raw_input=raw_input,
+        brain_dump_id=brain_dump_id,
     )
     session.add(task)
-    session.flush()
+    await session.flush()
+
+    return task_response(task)
+
+
+async def list_tasks(
+    session: AsyncSession,
+    user_id: int,
+    completed: Optional[bool] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+) -> TaskPage:
+    """
+    List one page of a user's tasks, with their subtasks
+
+    Tasks are ordered newest first, or by due date (then ID) when a due date
+    range is given. Each page is a range scan on an index starting after the
+    cursor, so it costs the same no matter how deep into the list it is.
+
+    Args:
+        session: Database session
+        user_id: Owner of the tasks
+        completed: Only completed (True) or open (False) tasks
+        due_from: Only tasks due on or after this date
+        due_to: Only tasks due on or before this date
+        limit: Page size
+        cursor: next_cursor of the previous page
+        include_raw_input: Also load the text of each task's brain dump
+
+    Returns:
+        TaskPage with the tasks and the cursor of the next page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or from another ordering
+    """
+    query = select(Task).where(Task.user_id == user_id)
+    if completed is not None:
+        query = query.where(Task.completed == completed)
 
+    if due_from is None and due_to is None:
+        ordering = "tasks:newest"
+        if cursor:
+            query = query.where(Task.id < decode_id_cursor(cursor, ordering))
+        query = query.order_by(Task.id.desc())
+
+        def key_of(task: Task) -> tuple:
+            return (task.id,)
+    else:
+        ordering = "tasks:due_date"
+        if due_from is not None:
+            query = query.where(Task.due_date >= due_from)
+        if due_to is not None:
+            query = query.where(Task.due_date <= due_to)
+        if cursor:
+            query = query.where(
+                tuple_(Task.due_date, Task.id) > decode_date_id_cursor(cursor, ordering)
+            )
+        query = query.order_by(Task.due_date, Task.id)
+
+        def key_of(task: Task) -> tuple:
+            return (task.due_date, task.id)
+
+    rows = (await session.scalars(query.limit(limit + 1))).all()
+    page, has_more = split_page(rows, limit)
+    subtasks = await load_subtasks(session, [task.id for task in page])
+    raw_inputs: Dict[Optional[int], str] = {}
+    if include_raw_input:
+        raw_inputs = await load_raw_inputs(
+            session, [task.brain_dump_id for task in page]
+        )
+    return TaskPage(
+        items=[
+            task_response(
+                task, subtasks.get(task.id), raw_inputs.get(task.brain_dump_id)
+            )
+            for task in page
+        ],
+        next_cursor=next_cursor(ordering, page, has_more, key_of),
+    )
+
+
+def task_response(
+    task: Task,
+    subtasks: Optional[List[SubTaskResponse]] = None,
+    raw_input: Optional[str] = None,
+) -> TaskResponse:
+    """Convert a Task row to its response model"""
     return TaskResponse(
         id=task.id,
         user_id=task.user_id,
@@ -35,14 +131,15 @@ def create_task(
         due_date=str(task.due_date) if task.due_date else None,
         estimated_time_minutes=task.estimated_time_minutes,
         completed=task.completed,
-        raw_input=task.raw_input,
-        subtasks=None,
+        brain_dump_id=task.brain_dump_id,
+        raw_input=raw_input,
+        subtasks=subtasks,
         created_at=task.created_at,
     )
 
 
-def create_subtasks(
-    session: Session,
+async def create_subtasks(
+    session: AsyncSession,
     parent_task_id: int,
     subtasks: List[dict],
 ) -> List[SubTaskResponse]:
@@ -59,20 +156,66 @@ def create_subtasks(
     ]
 
     session.add_all(subtask_objects)
-    session.flush()
-
-    # Convert to response models
-    # TODO: use pydantic's model_validate
-    return [
-        SubTaskResponse(
-            id=subtask.id,
-            parent_task_id=subtask.parent_task_id,
-            description=subtask.description,
-            order=subtask.order,
-            estimated_time_minutes=subtask.estimated_time_minutes,
-            due_date=str(subtask.due_date) if subtask.due_date else None,
-            completed=subtask.completed,
-            created_at=subtask.created_at,
-        )
-        for subtask in subtask_objects
-    ]
+    await session.flush()
+
+    return [subtask_response(subtask) for subtask in subtask_objects]
+
+
+async def get_tasks(
+    session: AsyncSession, user_id: int, task_ids: Optional[List[int]] = None
+) -> List[TaskResponse]:
+    """
+    Load a user's tasks with their subtasks in two queries
+
+    Args:
+        session: Database session
+        user_id: Owner of the tasks
+        task_ids: Only these tasks (all of the user's tasks if None)
+
+    Returns:
+        TaskResponse per task (oldest first), subtasks ordered by `order`
+    """
+    query = select(Task).where(Task.user_id == user_id).order_by(Task.id)
+    if task_ids is not None:
+        query = query.where(Task.id.in_(task_ids))
+    tasks = (await session.scalars(query)).all()
+
+    subtasks = await load_subtasks(session, [task.id for task in tasks])
+    return [task_response(task, subtasks.get(task.id)) for task in tasks]
+
+
+async def load_subtasks(
+    session: AsyncSession, task_ids: List[int]
+) -> Dict[int, List[SubTaskResponse]]:
+    """
+    Subtasks of many tasks in one query, grouped by parent task ID
+
+    Use this instead of the lazy Task.subtasks relationship, which issues
+    one query per task (and can't lazy-load on an AsyncSession at all).
+    Tasks without subtasks are missing from the result.
+    """
+    if not task_ids:
+        return {}
+    subtasks = await session.scalars(
+        select(SubTask)
+        .where(SubTask.parent_task_id.in_(task_ids))
+        .order_by(SubTask.parent_task_id, SubTask.order)
+    )
+    grouped: Dict[int, List[SubTaskResponse]] = {}
+    for subtask in subtasks:
+        grouped.setdefault(subtask.parent_task_id, []).append(subtask_response(subtask))
+    return grouped
+
+
+def subtask_response(subtask: SubTask) -> SubTaskResponse:
+    """Convert a SubTask row to its response model"""
+    return SubTaskResponse(
+        id=subtask.id,
+        parent_task_id=subtask.parent_task_id,
+        description=subtask.description,
+        order=subtask.order,
+        estimated_time_minutes=subtask.estimated_time_minutes,
+        due_date=str(subtask.due_date) if subtask.due_date else None,
+        completed=subtask.completed,
+        created_at=subtask.created_at,
+    )
@@ -1,23 +1,125 @@
 """
 User database access functions
+
+Logins look users up by email: from an optional in-process cache, else with
+one SELECT. New users are created with INSERT ... ON CONFLICT DO NOTHING, so
+two first logins racing for the same email both succeed instead of one
+failing on the unique constraint.
 """
 
-from sqlalchemy.orm import Session
+import os
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db_models import User
+from app.llm_cache import LRUTTLCache
+from app.metrics import registry
 from app.models import UserResponse
 
+UserCache = LRUTTLCache[str, UserResponse]
+
+
+class UserNotFoundError(LookupError):
+    """The user's INSERT conflicted, but no user with the email exists"""
+
+
+user_cache_lookups = registry.counter(
+    "user_cache_lookups_total", "Login lookups in the user cache", ("result",)
+)
 
-def get_or_create_user(session: Session, email: str) -> UserResponse:
-    """Get existing user or create new one by email"""
-    # Check if user exists
-    user = session.query(User).filter(User.email == email).first()
 
-    if user:
-        return UserResponse(id=user.id, email=user.email, first_name=user.first_name)
+def user_cache_from_env() -> Optional[UserCache]:
+    """The email -> user cache from USER_CACHE_* settings, or None when disabled"""
+    if os.getenv("USER_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return LRUTTLCache(
+        max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000)),
+        ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", 300)),
+    )
 
-    # Create new user
-    user = User(email=email)
-    session.add(user)
-    session.flush()
 
+def default_first_name(email: str) -> str:
+    """First name for a new user, from their email (anna.smith@... becomes Anna)"""
+    local_part = email.split("@", 1)[0]
+    for separator in ".+_-":
+        local_part = local_part.split(separator, 1)[0] or local_part
+    return local_part.capitalize()
+
+
+def user_response(user) -> UserResponse:
     return UserResponse(id=user.id, email=user.email, first_name=user.first_name)
+
+
+async def get_user_by_email(
+    session: AsyncSession, email: str
+) -> Optional[UserResponse]:
+    """The user with this email, or None"""
+    result = await session.execute(
+        select(User.id, User.email, User.first_name).where(User.email == email)
+    )
+    row = result.first()
+    return user_response(row) if row is not None else None
+
+
+async def create_user(session: AsyncSession, email: str) -> Optional[UserResponse]:
+    """
+    Create a user in one INSERT ... ON CONFLICT DO NOTHING RETURNING statement
+
+    Returns:
+        The new user, or None if a user with this email already exists
+    """
+    dialect = session.get_bind().dialect.name
+    insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+    result = await session.execute(
+        insert(User)
+        .values(email=email, first_name=default_first_name(email))
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.email, User.first_name)
+    )
+    row = result.first()
+    return user_response(row) if row is not None else None
+
+
+async def get_or_create_user(
+    session: AsyncSession, email: str, cache: Optional[UserCache] = None
+) -> UserResponse:
+    """
+    Get existing user or create new one by email
+
+    A cached user needs no query and an existing one a single SELECT. The
+    new user's INSERT is not committed here, so only users found by SELECT
+    are cached.
+
+    Args:
+        session: Database session
+        email: The user's email
+        cache: Recently logged in users by email
+
+    Returns:
+        The user
+
+    Raises:
+        UserNotFoundError: The email conflicted on INSERT, but the user was
+            deleted before it could be read back
+    """
+    if cache is not None:
+        cached = cache.get(email)
+        user_cache_lookups.inc(result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+    user = await get_user_by_email(session, email)
+    if user is not None:
+        if cache is not None:
+            cache.set(email, user)
+        return user
+
+    user = await create_user(session, email)
+    if user is None:
+        # A concurrent login created the user after our SELECT
+        user = await get_user_by_email(session, email)
+        if user is None:
+            raise UserNotFoundError(f"User {email} neither created nor found")
+    return user
@@ -0,0 +1,305 @@
+"""
+Admission control for LLM-backed requests: per-user and global token buckets
+
+Every brain dump is charged an estimated number of LLM tokens (the prompt
+plus its text) before it is processed:
+
+1. The user's bucket must cover it, or the request is rejected at once, so
+   one user or script cannot use up the provider's rate limit.
+2. The global bucket (this worker's share of the provider's limit) must
+   cover it. When it can't, the request waits in a fair queue: users are
+   served round-robin, so a user with many waiting requests does not delay
+   the others. A request that would wait longer than max_wait_seconds is
+   rejected straight away instead of timing out later.
+
+A batch is charged the summed cost of each user's brain dumps, and is
+admitted whole or not at all. A request costing more than a full bucket could
+never be admitted, so it is rejected with the largest size that fits.
+
+Rejections carry the time until the request would be admitted, for a 429
+response with Retry-After.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from app.llm_cache import LRUTTLCache
+from app.metrics import registry
+
+# Rough characters per token for English text
+CHARS_PER_TOKEN = 4
+
+admission_requests = registry.counter(
+    "admission_requests_total",
+    "LLM-backed requests by admission outcome (admitted, shed_user, shed_global, "
+    "shed_too_large)",
+    ("outcome",),
+)
+admission_tokens = registry.counter(
+    "admission_tokens_total",
+    "Estimated LLM tokens of admitted and shed requests",
+    ("outcome",),
+)
+admission_wait_seconds = registry.counter(
+    "admission_queue_wait_seconds_total",
+    "Time admitted requests spent waiting for the global bucket",
+)
+admission_waiting = registry.gauge(
+    "admission_queue_waiting", "Requests waiting for the global bucket"
+)
+
+
+class AdmissionRejected(Exception):
+    """The request is over a rate limit; retry after retry_after seconds"""
+
+    def __init__(self, scope: str, retry_after: float, message: Optional[str] = None):
+        super().__init__(
+            message or f"Rate limit exceeded ({scope}); retry in {retry_after:.1f}s"
+        )
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Holds up to capacity tokens and refills at rate tokens per second"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def available(self) -> float:
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        return self.tokens
+
+    def seconds_until(self, cost: float) -> float:
+        """How long until cost tokens are available (0 if they are now)"""
+        missing = cost - self.available()
+        return max(0.0, missing / self.rate)
+
+    def try_take(self, cost: float) -> bool:
+        """Take cost tokens if available (never, for a cost above capacity)"""
+        if self.available() < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def give_back(self, cost: float) -> None:
+        """Return tokens taken for a request that was not sent"""
+        self.tokens = min(self.capacity, self.available() + cost)
+
+
+class AdmissionController:
+    """Per-user and global token buckets with a fair queue for the global one"""
+
+    def __init__(
+        self,
+        user_tokens_per_minute: float,
+        global_tokens_per_minute: float,
+        user_burst_tokens: Optional[float] = None,
+        global_burst_tokens: Optional[float] = None,
+        max_wait_seconds: float = 5.0,
+        base_tokens: int = 1500,
+        max_users: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            user_tokens_per_minute: Sustained rate for each user
+            global_tokens_per_minute: Sustained rate for this worker process
+            user_burst_tokens: User bucket size (default one minute's worth)
+            global_burst_tokens: Global bucket size (default one minute's worth)
+            max_wait_seconds: Longest a request may queue for the global bucket
+            base_tokens: Estimated tokens of a request besides its text
+                (system prompt and tool schema)
+            max_users: Users whose buckets are remembered (least recently
+                seen are dropped, which refills them)
+        """
+        self.user_rate = user_tokens_per_minute / 60
+        self.user_capacity = user_burst_tokens or user_tokens_per_minute
+        self.max_wait_seconds = max_wait_seconds
+        self.base_tokens = base_tokens
+        self.clock = clock
+        self.global_bucket = TokenBucket(
+            global_tokens_per_minute / 60,
+            global_burst_tokens or global_tokens_per_minute,
+            clock,
+        )
+        # A bucket left alone for capacity / rate seconds is full again, the
+        # same as a new one, so it can expire then
+        self.user_buckets: LRUTTLCache[int, TokenBucket] = LRUTTLCache(
+            max_users, self.user_capacity / self.user_rate, clock
+        )
+        # Waiting requests per user, in the order users are served
+        self._waiting: "OrderedDict[int, Deque[tuple[float, asyncio.Future[None]]]]" = (
+            OrderedDict()
+        )
+        self._waiting_tokens = 0.0
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionController"]:
+        """Build a controller from ADMISSION_* settings, or None when disabled"""
+        if os.getenv("ADMISSION_ENABLED", "true").lower() in ("0", "false", "no"):
+            return None
+        user_burst = os.getenv("ADMISSION_USER_BURST_TOKENS")
+        return cls(
+            user_tokens_per_minute=float(
+                os.getenv("ADMISSION_USER_TOKENS_PER_MINUTE", 30000)
+            ),
+            global_tokens_per_minute=float(
+                os.getenv("ADMISSION_GLOBAL_TOKENS_PER_MINUTE", 200000)
+            ),
+            user_burst_tokens=float(user_burst) if user_burst else None,
+            max_wait_seconds=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", 5)),
+            base_tokens=int(os.getenv("ADMISSION_BASE_TOKENS", 1500)),
+        )
+
+    def estimate_tokens(self, text: str) -> int:
+        """Estimated LLM tokens for processing a brain dump"""
+        return self.base_tokens + math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    async def admit(self, user_id: int, text: str) -> None:
+        """
+        Wait until a brain dump may call the LLM
+
+        Raises:
+            AdmissionRejected: The user's or the global limit is exceeded
+        """
+        cost = self.estimate_tokens(text)
+        self._check_size(cost, 1)
+        await self._admit_cost(user_id, cost)
+
+    async def admit_batch(self, items: Sequence[Tuple[int, str]]) -> None:
+        """
+        Wait until a batch of (user ID, text) brain dumps may call the LLM
+
+        Each user is charged the summed cost of their brain dumps. If one
+        user's share is rejected, the tokens taken for the others are given
+        back.
+
+        Raises:
+            AdmissionRejected: A user's or the global limit is exceeded
+        """
+        costs: Dict[int, int] = {}
+        counts: Dict[int, int] = {}
+        for user_id, text in items:
+            costs[user_id] = costs.get(user_id, 0) + self.estimate_tokens(text)
+            counts[user_id] = counts.get(user_id, 0) + 1
+        for user_id, cost in costs.items():
+            self._check_size(cost, counts[user_id])
+
+        admitted: List[Tuple[int, int]] = []
+        try:
+            for user_id, cost in costs.items():
+                await self._admit_cost(user_id, cost)
+                admitted.append((user_id, cost))
+        except BaseException:
+            for user_id, cost in admitted:
+                self.global_bucket.give_back(cost)
+                bucket = self.user_buckets.get(user_id)
+                if bucket is not None:
+                    bucket.give_back(cost)
+            raise
+
+    def _check_size(self, cost: int, count: int) -> None:
+        """Reject count brain dumps costing more than a full bucket"""
+        capacity = min(self.user_capacity, self.global_bucket.capacity)
+        if cost <= capacity:
+            return
+        self._shed("shed_too_large", cost)
+        if count == 1:
+            message = (
+                f"Brain dump needs about {cost} tokens, more than the "
+                f"{capacity:.0f} allowed at once"
+            )
+        else:
+            largest = max(1, math.floor(capacity * count / cost))
+            message = (
+                f"Batch needs about {cost} tokens, more than the {capacity:.0f} "
+                f"allowed at once; send at most {largest} brain dumps per batch"
+            )
+        raise AdmissionRejected("size", self.user_capacity / self.user_rate, message)
+
+    async def _admit_cost(self, user_id: int, cost: int) -> None:
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_capacity, self.clock)
+        self.user_buckets.set(user_id, bucket)
+        if not bucket.try_take(cost):
+            self._shed("shed_user", cost)
+            raise AdmissionRejected("user", bucket.seconds_until(cost))
+
+        if not self._waiting and self.global_bucket.try_take(cost):
+            admission_requests.inc(outcome="admitted")
+            admission_tokens.inc(cost, outcome="admitted")
+            return
+
+        # Everyone queued ahead needs their tokens first
+        missing = self._waiting_tokens + cost - self.global_bucket.available()
+        wait = max(0.0, missing / self.global_bucket.rate)
+        if wait > self.max_wait_seconds:
+            # Not charged to the user, since nothing was sent
+            bucket.give_back(cost)
+            self._shed("shed_global", cost)
+            raise AdmissionRejected("global", wait)
+
+        started = self.clock()
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append((cost, future))
+        self._waiting_tokens += cost
+        admission_waiting.inc()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await future
+        except BaseException:
+            # Cancelled while queued: nothing is sent, so nothing is charged
+            bucket.give_back(cost)
+            if future.done() and not future.cancelled():
+                self.global_bucket.give_back(cost)
+            raise
+        finally:
+            admission_waiting.dec()
+        admission_wait_seconds.inc(self.clock() - started)
+        admission_requests.inc(outcome="admitted")
+        admission_tokens.inc(cost, outcome="admitted")
+
+    def _shed(self, outcome: str, cost: int) -> None:
+        admission_requests.inc(outcome=outcome)
+        admission_tokens.inc(cost, outcome=outcome)
+
+    async def _dispatch(self) -> None:
+        """Admit waiting requests as tokens refill, one user at a time"""
+        while self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            cost, future = queue[0]
+            if not future.done():
+                await asyncio.sleep(self.global_bucket.seconds_until(cost))
+                # A request cancelled while we slept (its client went away)
+                # is dropped without using up tokens
+                if not future.done() and not self.global_bucket.try_take(cost):
+                    continue
+            queue.popleft()
+            self._waiting_tokens -= cost
+            if not future.done():
+                future.set_result(None)
+            # Next user's turn; this user goes to the back of the line
+            del self._waiting[user_id]
+            if queue:
+                self._waiting[user_id] = queue
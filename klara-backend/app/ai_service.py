@@ -1,29 +1,155 @@
+import asyncio
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from langchain_anthropic import ChatAnthropic
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
+from typing import Any, AsyncIterator, Awaitable, Optional, Tuple, Union
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import Runnable
+from pydantic import ValidationError
 from app.models import (
     ProcessedTask,
+    ProcessedShoppingItem,
+    ProcessedCalendarEvent,
     ProcessedBrainDump,
 )
+from app.llm_cache import LLMResponseCache, cache_key
+from app import fast_path
+from app.model_routing import Hedger, ModelRouter
+from app.resilience import CircuitOpenError, ResilientCaller
+from app.server_timing import timed
+from app.tracing import SPAN_KIND_CLIENT, Span, tracer
+from app.prompts import BRAIN_DUMP_PROMPT, BRAIN_DUMP_TOOL_PROMPT
+from app.llm_metrics import (
+    usage_counts,
+    record_call,
+    record_processing,
+    parse_failures,
+    llm_fallbacks,
+    llm_calls_in_flight,
+)
+
+logger = logging.getLogger(__name__)
+
+# Name of the tool the model is forced to call in "tool" extraction mode
+EXTRACTION_TOOL = ProcessedBrainDump.__name__
+
+# How often drain() checks whether the in-flight LLM calls have finished
+DRAIN_POLL_SECONDS = 0.05
+
+ProcessedItem = Union[ProcessedTask, ProcessedShoppingItem, ProcessedCalendarEvent]
+
+# Item model for each list field of ProcessedBrainDump, in output order
+ITEM_MODELS: dict[str, type[ProcessedItem]] = {
+    "tasks": ProcessedTask,
+    "shopping_items": ProcessedShoppingItem,
+    "calendar_events": ProcessedCalendarEvent,
+}
+
+
+class BrainDumpExtractionError(Exception):
+    """The LLM output could not be turned into a ProcessedBrainDump"""
+
+
+def completed_items(
+    partial: dict, emitted: dict[str, int], final: bool = False
+) -> list[Tuple[str, ProcessedItem]]:
+    """
+    Items of a partially parsed ProcessedBrainDump that are complete and new
+
+    An item is complete once the LLM has started the next item of the same
+    list or moved on to a later list (or the stream has ended). `emitted`
+    tracks how many items of each list were already returned and is updated.
+    """
+    completed = []
+    categories = [category for category in partial if category in ITEM_MODELS]
+    for position, category in enumerate(categories):
+        items = partial[category] or []
+        list_closed = final or position < len(categories) - 1
+        ready = len(items) if list_closed else len(items) - 1
+        for item in items[emitted[category] : ready]:
+            completed.append((category, ITEM_MODELS[category].model_validate(item)))
+        emitted[category] = max(emitted[category], ready)
+    return completed
 
 
 class AIService:
     """Service for processing brain dumps using two-step categorization with Anthropic"""
 
-    def __init__(self):
-        self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not self.anthropic_api_key:
-            raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
+    def __init__(self, llm=None, fast_llm=None):
+        """
+        Args:
+            llm: BaseChatModel to use instead of ChatAnthropic (e.g. the fake
+                model in benchmarks/fake_llm.py); no API key is needed then
+            fast_llm: Model for short brain dumps when llm is given (used
+                with LLM_ROUTING_ENABLED)
+        """
+        # Timeouts, retries and the circuit breaker for LLM calls
+        self.resilience = ResilientCaller.from_env()
+
+        if llm is not None:
+            self.model = getattr(llm, "model", type(llm).__name__)
+            self.llm = llm
+            fast_model = (
+                getattr(fast_llm, "model", type(fast_llm).__name__)
+                if fast_llm is not None
+                else None
+            )
+        else:
+            self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not self.anthropic_api_key:
+                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
-        # Initialize ChatAnthropic model
-        self.llm = ChatAnthropic(
-            model="claude-sonnet-4-20250514",
-            anthropic_api_key=self.anthropic_api_key,
-            temperature=0.3,
-            max_tokens=2048,
+            self.model = os.getenv("LLM_MODEL", "claude-sonnet-4-20250514")
+            self.llm = self._chat_anthropic(self.model)
+            fast_model = os.getenv("LLM_FAST_MODEL", "claude-3-5-haiku-20241022")
+
+        # Short, simple dumps may go to the fast model; slow calls may be hedged
+        self.router = ModelRouter.from_env(self.model, fast_model)
+        self.hedger = Hedger.from_env()
+
+        # "tool" forces a ProcessedBrainDump tool call (schema-constrained
+        # output); "json" asks for free-form JSON and parses it
+        self.extraction_mode = os.getenv("LLM_EXTRACTION_MODE", "tool")
+        if self.extraction_mode not in ("tool", "json"):
+            raise ValueError(f"Unknown LLM_EXTRACTION_MODE: {self.extraction_mode}")
+        # Extra LLM calls allowed to repair unparseable output
+        self.repair_attempts = int(os.getenv("LLM_REPAIR_ATTEMPTS", 1))
+
+        # Prompt, model bindings and parsers are built once; only today and
+        # the input vary per request
+        if self.extraction_mode == "tool":
+            self.prompt = BRAIN_DUMP_TOOL_PROMPT
+            self.stream_parser = JsonOutputKeyToolsParser(
+                key_name=EXTRACTION_TOOL, first_tool_only=True
+            )
+        else:
+            self.prompt = BRAIN_DUMP_PROMPT
+            self.stream_parser = JsonOutputParser()
+        self.extraction_llm = self._extraction_binding(self.llm)
+        self.fast_extraction_llm: Optional[Runnable] = None
+        if self.router.fast_model is not None:
+            self.fast_extraction_llm = self._extraction_binding(
+                fast_llm or self._chat_anthropic(self.router.fast_model)
+            )
+
+        # Cache of processed results for repeated brain dumps (None if disabled)
+        self.cache = LLMResponseCache.from_env()
+
+        # Rule-based handling of trivial dumps (None if disabled); results
+        # below this confidence go to the LLM
+        self.fast_path_min_confidence: Optional[float] = float(
+            os.getenv("FAST_PATH_MIN_CONFIDENCE", 0.8)
         )
+        if os.getenv("FAST_PATH_ENABLED", "true").lower() in ("0", "false", "no"):
+            self.fast_path_min_confidence = None
+
+        # LLM calls not yet finished, so shutdown can wait for them (drain)
+        self.in_flight = 0
 
     async def process_brain_dump(self, text: str) -> ProcessedBrainDump:
         """
@@ -35,131 +161,407 @@ class AIService:
         Returns:
             ProcessedBrainDump containing lists of tasks, shopping items, and calendar events
         """
-        parser = PydanticOutputParser(pydantic_object=ProcessedBrainDump)
-        today = datetime.now().strftime("%Y-%m-%d")
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """You are an AI assistant helping busy parents organize their mental load.
-
-Your job is to extract ALL items from the user's brain dump and categorize them into:
-1. **Tasks** - Things to do, actions to complete
-2. **Shopping Items** - Things to buy, groceries
-3. **Calendar Events** - Time-specific appointments, scheduled activities
-
-IMPORTANT: A single brain dump can contain MULTIPLE categories and MULTIPLE items.
-
-BRAIN DUMP EXAMPLES:
-- "Call the babysitter and buy milk" → 1 task + 1 shopping item
-- "Buy eggs, milk, and bread" → 3 shopping items
-- "Call dentist, schedule car appointment, and pick up dry cleaning" → 3 tasks
-- "Soccer practice Thursday at 4pm and dentist appointment Friday at 2pm" → 2 calendar events
-
-TASK PROCESSING:
-For each task:
-1. Extract a clear, concise description (5-10 words max)
-2. Extract due date if mentioned (YYYY-MM-DD format)
-3. Decide whether to decompose into subtasks
-4. If decomposing, create 3-7 concrete subtasks
-5. Estimate time for the task (or sum of subtasks if decomposed)
-
-TASK DECOMPOSITION CRITERIA:
-- Decompose if the task is complex and involves multiple distinct steps
-- Decompose if the task would take more than 30 minutes to complete
-- Decompose if breaking it down would make it less overwhelming
-- DO NOT decompose simple, straightforward tasks that can be done in one action
-- DO NOT decompose if the task is already specific and clear
-
-TASK DECOMPOSITION EXAMPLES:
-
-Simple tasks (DO NOT decompose):
-- "Call the dentist to reschedule appointment" → Single 5-minute action
-- "Update emergency contact form for school" → Already specific
-- "Send email to teacher about field trip" → Single action
-- "Pick up dry cleaning" → Simple errand
-- "Call the babysitter" → Single phone call
-
-Complex tasks (SHOULD decompose):
-- "Plan Noah's birthday party" → Multiple steps:
-  * Create guest list
-  * Book venue or plan location
-  * Order birthday cake
-  * Buy decorations
-  * Send invitations
-  * Plan activities/games
-
-- "Organize garage for spring cleaning" → Multiple steps:
-  * Sort items into keep/donate/trash
-  * Take donation items to charity
-  * Clean garage floor and walls
-  * Reorganize remaining items
-  * Install new storage solutions
-
-- "Prepare for Mae's school presentation" → Multiple steps:
-  * Research presentation topic
-  * Create slides or poster
-  * Practice presentation
-  * Prepare materials needed
-
-SUBTASK GUIDELINES (if decomposing):
-- Create 3-7 subtasks (not too many, not too few)
-- Order subtasks logically (what needs to happen first)
-- Each subtask should be a concrete, actionable step
-- Estimate time for each subtask realistically
-- Distribute parent task's due_date across subtasks if provided
-
-TIME ESTIMATION GUIDELINES:
-- Simple phone calls: 5-15 minutes
-- Quick errands: 15-30 minutes
-- Planning tasks: 30-120 minutes
-- Research tasks: 30-90 minutes
-- Organization tasks: 60-180 minutes
-
-SHOPPING ITEMS:
-- Extract each item separately
-- Include quantities if specified
-- Keep descriptions concise
-
-CALENDAR EVENTS:
-- Extract description (5-10 words max)
-- Event date (YYYY-MM-DD format) - REQUIRED
-- Event time (HH:MM 24-hour format) if mentioned
-
-Current date: {today}
-
-{format_instructions}""",
-                ),
-                ("human", "{input}"),
-            ]
+        started = time.perf_counter()
+        try:
+            return await self.extract_brain_dump(text)
+        except CircuitOpenError:
+            llm_fallbacks.inc(reason="circuit_open")
+            record_processing("circuit_open", time.perf_counter() - started)
+            return self._degraded(text)
+        except Exception as e:
+            logger.warning(
+                "Brain dump processing failed, using the fallback",
+                extra={"reason": type(e).__name__, "error": str(e)},
+            )
+            llm_fallbacks.inc(reason=type(e).__name__)
+            record_processing("fallback", time.perf_counter() - started)
+            return self._fallback(text)
+
+    async def extract_brain_dump(
+        self, text: str, retry: bool = True
+    ) -> ProcessedBrainDump:
+        """
+        Like process_brain_dump, but raises LLM and parsing errors instead of
+        falling back, so callers (e.g. batch processing) can retry or report them
+
+        Args:
+            text: The user's brain dump text
+            retry: Retry failed LLM calls (False for callers with their own
+                retry loop)
+
+        Raises:
+            CircuitOpenError: The LLM provider is unhealthy; no call was made
+        """
+        started = time.perf_counter()
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+
+        # Obvious shopping lists and events don't need the LLM
+        quick = self._fast_path(text, now)
+        if quick is not None:
+            record_processing("fast_path", time.perf_counter() - started)
+            return quick
+
+        # Serve repeated brain dumps from the cache without an LLM call
+        model = self.router.choose(text)
+        key = cache_key(text, today, model, self.prompt.version)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                record_processing("cache", time.perf_counter() - started)
+                return cached
+
+        self.router.record(model)
+        with tracer.span(
+            "prompt.build", **{"klara.prompt_version": self.prompt.version}
+        ):
+            messages = self.prompt.messages(text, today)
+        for attempt in range(self.repair_attempts + 1):
+            call_started = time.perf_counter()
+            message = await self._call(model, messages, retry)
+            call_seconds = time.perf_counter() - call_started
+            counts = usage_counts(message.usage_metadata)
+            try:
+                with (
+                    tracer.span(
+                        "llm.parse", **{"klara.extraction_mode": self.extraction_mode}
+                    ),
+                    timed("parse"),
+                ):
+                    result = self._parse(message)
+                record_call(
+                    model, self.prompt.version, "invoke", call_seconds, "ok", counts
+                )
+                break
+            except (
+                BrainDumpExtractionError,
+                OutputParserException,
+                ValidationError,
+            ) as e:
+                record_call(
+                    model,
+                    self.prompt.version,
+                    "invoke",
+                    call_seconds,
+                    "parse_error",
+                    counts,
+                    error=e,
+                )
+                parse_failures.inc(mode=self.extraction_mode)
+                if attempt == self.repair_attempts:
+                    raise BrainDumpExtractionError(
+                        f"Unparseable LLM output after {attempt + 1} attempts: {e}"
+                    ) from e
+                # Show the model its output and the error, and ask again
+                messages = messages + self._repair_messages(message, e)
+
+        # Only successful results are cached, never the fallback
+        if self.cache is not None:
+            await self.cache.set(key, result)
+        record_processing("llm", time.perf_counter() - started)
+        return result
+
+    async def stream_brain_dump(
+        self, text: str
+    ) -> AsyncIterator[Tuple[str, ProcessedItem]]:
+        """
+        Process a brain dump, yielding each item as soon as the LLM has finished it
+
+        Args:
+            text: The user's brain dump text
+
+        Yields:
+            (category, item) pairs where category is "tasks", "shopping_items"
+            or "calendar_events"
+        """
+        started = time.perf_counter()
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+
+        quick = self._fast_path(text, now)
+        if quick is not None:
+            record_processing("fast_path", time.perf_counter() - started)
+            for category in ITEM_MODELS:
+                for item in getattr(quick, category):
+                    yield category, item
+            return
+
+        model = self.router.choose(text)
+        key = cache_key(text, today, model, self.prompt.version)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                record_processing("cache", time.perf_counter() - started)
+                for category in ITEM_MODELS:
+                    for item in getattr(cached, category):
+                        yield category, item
+                return
+
+        self.router.record(model)
+        emitted = {category: 0 for category in ITEM_MODELS}
+        partial: dict = {}
+        # Anthropic reports usage on several stream events (input tokens on
+        # message_start and again on message_delta), so keep the largest value
+        # seen for each count instead of adding chunks together
+        usage = usage_counts(None)
+        stream_started = time.perf_counter()
+        first_token_seconds: Optional[float] = None
+        # Not made the current span: the route runs between the yields
+        span = tracer.start_span(
+            "llm.stream", kind=SPAN_KIND_CLIENT, **self._span_attributes(model)
         )
 
         try:
-            chain = prompt | self.llm | parser
-            result = await chain.ainvoke(
-                {
-                    "input": text,
-                    "today": today,
-                    "format_instructions": parser.get_format_instructions(),
-                }
-            )
-            return result
 
+            async def chunks():
+                nonlocal first_token_seconds
+                messages = self.prompt.messages(text, today)
+                async with self._tracked_call(), self.resilience.guarded():
+                    # Streams aren't hedged: items already sent can't be
+                    # taken back if the other stream wins
+                    async for chunk in self._extraction_llm(model).astream(messages):
+                        if first_token_seconds is None:
+                            first_token_seconds = time.perf_counter() - stream_started
+                        for token_type, count in usage_counts(
+                            chunk.usage_metadata
+                        ).items():
+                            usage[token_type] = max(usage[token_type], count)
+                        yield chunk
+
+            async for partial in self.stream_parser.atransform(chunks()):
+                for category, item in completed_items(partial, emitted):
+                    yield category, item
+
+            # The stream is over, so the last item of every list is complete
+            final_items = completed_items(partial, emitted, final=True)
+            if span is not None:
+                self._set_usage_attributes(span, usage, first_token_seconds)
+                span.end()
+            record_call(
+                model,
+                self.prompt.version,
+                "stream",
+                time.perf_counter() - stream_started,
+                "ok",
+                usage,
+                first_token_seconds,
+            )
+            for category, item in final_items:
+                yield category, item
+        except CircuitOpenError as e:
+            if span is not None:
+                span.end(error=e)
+            llm_fallbacks.inc(reason="circuit_open")
+            record_processing("circuit_open", time.perf_counter() - started)
+            degraded = self._degraded(text)
+            for category in ITEM_MODELS:
+                for item in getattr(degraded, category):
+                    yield category, item
+            return
         except Exception as e:
-            print(f"Error processing brain dump: {e}")
-            # Fallback: treat as simple task
-            return ProcessedBrainDump(
-                tasks=[
-                    ProcessedTask(
-                        description=text[:100] + ("..." if len(text) > 100 else ""),
-                        due_date=None,
-                        estimated_time_minutes=15,
-                        should_decompose=False,
-                        reasoning="Error occurred during processing",
-                        subtasks=[],
+            if span is not None:
+                self._set_usage_attributes(span, usage, first_token_seconds)
+                span.end(error=e)
+            parse_error = isinstance(e, (OutputParserException, ValidationError))
+            record_call(
+                model,
+                self.prompt.version,
+                "stream",
+                time.perf_counter() - stream_started,
+                "parse_error" if parse_error else "error",
+                usage,
+                first_token_seconds,
+                error=e,
+            )
+            llm_fallbacks.inc(reason=type(e).__name__)
+            record_processing("fallback", time.perf_counter() - started)
+            if not any(emitted.values()):
+                for task in self._fallback(text).tasks:
+                    yield "tasks", task
+            return
+
+        record_processing("llm", time.perf_counter() - started)
+        if self.cache is not None:
+            await self.cache.set(key, ProcessedBrainDump.model_validate(partial))
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Wait for in-flight LLM calls to finish, e.g. before a worker exits
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            True if no call is left running
+        """
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(DRAIN_POLL_SECONDS)
+        return self.in_flight == 0
+
+    @asynccontextmanager
+    async def _tracked_call(self) -> AsyncIterator[None]:
+        """Count an LLM call (or stream) as in flight while the block runs"""
+        self.in_flight += 1
+        llm_calls_in_flight.inc()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            llm_calls_in_flight.dec()
+
+    def _chat_anthropic(self, model: str) -> Any:
+        # Imported here: langchain_anthropic (and the anthropic SDK) take
+        # most of the app's import time and aren't needed until now
+        from langchain_anthropic import ChatAnthropic
+
+        # The stubs don't know ChatAnthropic's field aliases
+        return ChatAnthropic(  # type: ignore[call-arg]
+            model=model,
+            anthropic_api_key=self.anthropic_api_key,
+            temperature=0.3,
+            max_tokens=2048,
+            # self.resilience retries and times out calls instead
+            max_retries=0,
+            default_request_timeout=self.resilience.call_timeout_seconds,
+        )
+
+    def _extraction_binding(self, llm: Any) -> Runnable:
+        """The model bound for the extraction mode (forced tool call in "tool")"""
+        if self.extraction_mode == "tool":
+            return llm.bind_tools([ProcessedBrainDump], tool_choice=EXTRACTION_TOOL)
+        return llm
+
+    def _extraction_llm(self, model: str) -> Runnable:
+        if model == self.router.fast_model and self.fast_extraction_llm is not None:
+            return self.fast_extraction_llm
+        return self.extraction_llm
+
+    async def _call(
+        self, model: str, messages: list[BaseMessage], retry: bool
+    ) -> AIMessage:
+        """One extraction call with retries and timeouts; failures are recorded"""
+        started = time.perf_counter()
+        try:
+            with (
+                tracer.span(
+                    "llm.call", kind=SPAN_KIND_CLIENT, **self._span_attributes(model)
+                ) as span,
+                timed("llm"),
+            ):
+                async with self._tracked_call():
+                    message = await self.resilience.call(
+                        lambda: self._invoke(model, messages), retry=retry
+                    )
+                if span is not None:
+                    self._set_usage_attributes(
+                        span, usage_counts(message.usage_metadata)
                     )
-                ],
-                shopping_items=[],
-                calendar_events=[],
+                return message
+        except CircuitOpenError:
+            # No call was made
+            raise
+        except Exception as e:
+            record_call(
+                model,
+                self.prompt.version,
+                "invoke",
+                time.perf_counter() - started,
+                "error",
+                error=e,
+            )
+            raise
+
+    def _span_attributes(self, model: str) -> dict[str, Any]:
+        """Trace attributes of an LLM call, named after OpenTelemetry's GenAI conventions"""
+        return {
+            "gen_ai.operation.name": "chat",
+            "gen_ai.request.model": model,
+            "klara.prompt_version": self.prompt.version,
+        }
+
+    def _set_usage_attributes(
+        self,
+        span: Span,
+        counts: dict[str, int],
+        first_token_seconds: Optional[float] = None,
+    ) -> None:
+        span.set_attribute("gen_ai.usage.input_tokens", counts["input"])
+        span.set_attribute("gen_ai.usage.output_tokens", counts["output"])
+        span.set_attribute("klara.usage.cache_read_tokens", counts["cache_read"])
+        if first_token_seconds is not None:
+            span.set_attribute(
+                "klara.time_to_first_token_ms", round(first_token_seconds * 1000)
             )
+
+    def _invoke(self, model: str, messages: list[BaseMessage]) -> Awaitable[AIMessage]:
+        """One extraction call to model, hedged if enabled"""
+        extraction_llm = self._extraction_llm(model)
+        if self.hedger is None:
+            return extraction_llm.ainvoke(messages)
+        return self.hedger.run(model, lambda: extraction_llm.ainvoke(messages))
+
+    def _fast_path(self, text: str, now: datetime) -> Optional[ProcessedBrainDump]:
+        """The rule-based result for a trivial brain dump, if confident enough"""
+        if self.fast_path_min_confidence is None:
+            return None
+        result = fast_path.handle(text, now.date(), self.fast_path_min_confidence)
+        return result.processed if result is not None else None
+
+    def _parse(self, message: AIMessage) -> ProcessedBrainDump:
+        """Parse the model's reply according to the extraction mode"""
+        if self.extraction_mode == "json":
+            return self.prompt.parser.invoke(message)
+        tool_calls = [
+            call for call in message.tool_calls if call["name"] == EXTRACTION_TOOL
+        ]
+        if not tool_calls:
+            raise BrainDumpExtractionError(f"Model did not call {EXTRACTION_TOOL}")
+        return ProcessedBrainDump.model_validate(tool_calls[0]["args"])
+
+    def _repair_messages(
+        self, message: AIMessage, error: Exception
+    ) -> list[BaseMessage]:
+        """Follow-up messages asking the model to correct unparseable output"""
+        if self.extraction_mode == "tool" and message.tool_calls:
+            return [
+                message,
+                ToolMessage(
+                    content=f"Error: {error}\nCall {EXTRACTION_TOOL} again with "
+                    "corrected arguments.",
+                    tool_call_id=message.tool_calls[0]["id"],
+                    status="error",
+                ),
+            ]
+        return [
+            message,
+            HumanMessage(
+                content=f"Your previous response could not be parsed: {error}\n"
+                "Respond again with the corrected output only."
+            ),
+        ]
+
+    def _degraded(self, text: str) -> ProcessedBrainDump:
+        """
+        Result while the LLM provider is unhealthy: whatever the rule-based
+        fast path recognizes at any confidence, else the single-task fallback
+        """
+        result = fast_path.classify(text, datetime.now().date())
+        return result.processed if result is not None else self._fallback(text)
+
+    def _fallback(self, text: str) -> ProcessedBrainDump:
+        """Fallback when the LLM call fails: treat the whole dump as a simple task"""
+        return ProcessedBrainDump(
+            tasks=[
+                ProcessedTask(
+                    description=text[:100] + ("..." if len(text) > 100 else ""),
+                    due_date=None,
+                    estimated_time_minutes=15,
+                    should_decompose=False,
+                    reasoning="Error occurred during processing",
+                    subtasks=[],
+                )
+            ],
+            shopping_items=[],
+            calendar_events=[],
+        )
@@ -0,0 +1,119 @@
+"""
+Concurrent processing of many brain dumps with rate-limit-aware backoff
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import List, Optional, Union
+
+from app.ai_service import AIService
+from app.metrics import registry
+from app.models import ProcessedBrainDump
+from app.resilience import is_rate_limited, retry_after_seconds
+
+batch_items = registry.counter(
+    "brain_dump_batch_items_total", "Brain dumps processed in batches", ("outcome",)
+)
+batch_backoffs = registry.counter(
+    "brain_dump_batch_backoffs_total",
+    "Batch LLM calls retried after a rate limit or overload response",
+)
+
+
+class BrainDumpBatchProcessor:
+    """
+    Runs AIService.extract_brain_dump for many brain dumps concurrently
+
+    A process-wide semaphore bounds in-flight LLM calls across all batches.
+    When the provider rate limits a call, every worker pauses until the
+    backoff (or the provider's Retry-After) has passed, so throughput settles
+    at the provider's rate limit instead of hammering it with retries.
+    """
+
+    def __init__(
+        self,
+        ai_service: AIService,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0,
+    ):
+        self.ai_service = ai_service
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._resume_at = 0.0
+
+    @classmethod
+    def from_env(cls, ai_service: AIService) -> "BrainDumpBatchProcessor":
+        """Build a processor from BATCH_* settings"""
+        return cls(
+            ai_service,
+            max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", 8)),
+            max_retries=int(os.getenv("BATCH_MAX_RETRIES", 5)),
+            backoff_base_seconds=float(os.getenv("BATCH_BACKOFF_BASE_SECONDS", 1.0)),
+            backoff_max_seconds=float(os.getenv("BATCH_BACKOFF_MAX_SECONDS", 30.0)),
+        )
+
+    async def process(
+        self, texts: List[str], max_concurrency: Optional[int] = None
+    ) -> List[Union[ProcessedBrainDump, Exception]]:
+        """
+        Process brain dumps concurrently
+
+        Args:
+            texts: The brain dump texts
+            max_concurrency: Optional lower concurrency limit for this batch
+
+        Returns:
+            One ProcessedBrainDump or the final exception per text, in order
+        """
+        limit = min(max_concurrency or self.max_concurrency, self.max_concurrency)
+        batch_semaphore = asyncio.Semaphore(limit)
+
+        async def run(text: str) -> Union[ProcessedBrainDump, Exception]:
+            async with batch_semaphore:
+                try:
+                    result = await self._process_one(text)
+                except Exception as e:
+                    batch_items.inc(outcome="error")
+                    return e
+                batch_items.inc(outcome="success")
+                return result
+
+        return await asyncio.gather(*(run(text) for text in texts))
+
+    async def _process_one(self, text: str) -> ProcessedBrainDump:
+        attempt = 0
+        while True:
+            await self._wait_for_backoff()
+            try:
+                async with self._semaphore:
+                    # Rate limits are retried here, pausing the whole batch
+                    return await self.ai_service.extract_brain_dump(text, retry=False)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                batch_backoffs.inc()
+                self._back_off(attempt, retry_after_seconds(e))
+
+    async def _wait_for_backoff(self) -> None:
+        # Another worker may extend the pause while we sleep
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def _back_off(self, attempt: int, retry_after: Optional[float]) -> None:
+        """Pause all workers: honor Retry-After, else jittered exponential backoff"""
+        if retry_after is not None:
+            delay = min(retry_after, self.backoff_max_seconds)
+        else:
+            ceiling = min(
+                self.backoff_base_seconds * 2 ** (attempt - 1), self.backoff_max_seconds
+            )
+            delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
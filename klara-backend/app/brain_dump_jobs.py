@@ -0,0 +1,494 @@
+"""
+Background processing of brain dumps: a job queue with a worker pool
+
+POST /brain-dumps/ with `Prefer: respond-async` queues the brain dump and
+returns 202 with the job at once. Workers run AIService.process_brain_dump,
+save the items, and optionally POST the finished job to its callback URL.
+GET /brain-dumps/jobs/{id} reports the status and result.
+
+Jobs with a higher priority run first, and a user never has more than
+JOB_MAX_RUNNING_PER_USER jobs running at once. No broker is needed. The
+"database" backend keeps jobs in the brain_dump_jobs table, so every worker
+process can report on and pick up any job and queued jobs survive restarts.
+The "memory" backend keeps them in the process, for a single worker process.
+
+Callback URLs are limited to the hosts in JOB_CALLBACK_ALLOWED_HOSTS, and a
+callback is only sent if the host resolves to public addresses, so it can't
+be used to reach internal services or the cloud metadata endpoint.
+"""
+
+import asyncio
+import ipaddress
+import itertools
+import logging
+import os
+import socket
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.access import brain_dump_access, brain_dump_job_access
+from app.access.brain_dump_job_access import ClaimedJob
+from app.ai_service import AIService
+from app.metrics import registry
+from app.models import BrainDumpJobResponse, BrainDumpResponse
+from app.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+jobs_total = registry.counter(
+    "brain_dump_jobs_total",
+    "Background brain dump jobs by the status they reached",
+    ("status",),
+)
+jobs_running = registry.gauge(
+    "brain_dump_jobs_running", "Background brain dump jobs running in this process"
+)
+job_callbacks = registry.counter(
+    "brain_dump_job_callbacks_total",
+    "Finished jobs POSTed to their callback URL (delivered, failed or rejected)",
+    ("outcome",),
+)
+
+
+class CallbackURLNotAllowedError(ValueError):
+    """The callback URL's host is not in JOB_CALLBACK_ALLOWED_HOSTS"""
+
+
+def host_allowed(host: str, allowed_hosts: Sequence[str]) -> bool:
+    """Whether host is one of allowed_hosts or under a "*.example.com" entry"""
+    host = host.lower().rstrip(".")
+    for allowed in allowed_hosts:
+        if allowed.startswith("*."):
+            if host.endswith(allowed[1:]):
+                return True
+        elif host == allowed:
+            return True
+    return False
+
+
+def is_public_address(address: str) -> bool:
+    """
+    False for private, loopback, link-local (including the cloud metadata
+    endpoint 169.254.169.254), reserved and multicast addresses
+    """
+    ip = ipaddress.ip_address(address)
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    """The addresses a host name resolves to"""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    return [str(info[4][0]) for info in infos]
+
+
+class JobBackend(Protocol):
+    """
+    Where jobs are stored
+
+    Every method gets a database session; the database backend flushes its
+    changes to it and the queue commits, so a job's result is committed
+    together with the brain dump's items.
+    """
+
+    async def create(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        text: str,
+        priority: int,
+        callback_url: Optional[str],
+    ) -> BrainDumpJobResponse: ...
+
+    async def get(
+        self, session: AsyncSession, job_id: int, user_id: int
+    ) -> Optional[BrainDumpJobResponse]: ...
+
+    async def claim(
+        self, session: AsyncSession, max_running_per_user: int
+    ) -> Optional[ClaimedJob]: ...
+
+    async def finish(
+        self,
+        session: AsyncSession,
+        job_id: int,
+        result: Optional[BrainDumpResponse] = None,
+        error: Optional[str] = None,
+    ) -> Optional[BrainDumpJobResponse]: ...
+
+    async def requeue_stale(
+        self, session: AsyncSession, started_before: datetime
+    ) -> int: ...
+
+
+class DatabaseJobBackend:
+    """Jobs in the brain_dump_jobs table"""
+
+    async def create(self, session, user_id, text, priority, callback_url):
+        return await brain_dump_job_access.create_job(
+            session, user_id, text, priority, callback_url
+        )
+
+    async def get(self, session, job_id, user_id):
+        return await brain_dump_job_access.get_job(session, job_id, user_id)
+
+    async def claim(self, session, max_running_per_user):
+        return await brain_dump_job_access.claim_next_job(session, max_running_per_user)
+
+    async def finish(self, session, job_id, result=None, error=None):
+        return await brain_dump_job_access.finish_job(session, job_id, result, error)
+
+    async def requeue_stale(self, session, started_before):
+        return await brain_dump_job_access.requeue_stale_jobs(session, started_before)
+
+
+class MemoryJobBackend:
+    """Jobs in this process; the most recent max_finished finished jobs are kept"""
+
+    def __init__(self, max_finished: int = 10000):
+        self.max_finished = max_finished
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, BrainDumpJobResponse] = {}
+        self._queued: Dict[int, ClaimedJob] = {}
+        self._finished: "OrderedDict[int, None]" = OrderedDict()
+
+    async def create(self, session, user_id, text, priority, callback_url):
+        job = BrainDumpJobResponse(
+            id=next(self._ids),
+            user_id=user_id,
+            status="queued",
+            priority=priority,
+            created_at=datetime.now(timezone.utc),
+        )
+        self._jobs[job.id] = job
+        self._queued[job.id] = ClaimedJob(job.id, user_id, text, callback_url)
+        return job
+
+    async def get(self, session, job_id, user_id):
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.user_id == user_id else None
+
+    async def claim(self, session, max_running_per_user):
+        running: Dict[int, int] = {}
+        for job in self._jobs.values():
+            if job.status == "running":
+                running[job.user_id] = running.get(job.user_id, 0) + 1
+
+        candidates = [
+            self._jobs[job_id]
+            for job_id, queued in self._queued.items()
+            if running.get(queued.user_id, 0) < max_running_per_user
+        ]
+        if not candidates:
+            return None
+        job = min(candidates, key=lambda job: (-job.priority, job.id))
+        self._jobs[job.id] = job.model_copy(
+            update={"status": "running", "started_at": datetime.now(timezone.utc)}
+        )
+        return self._queued.pop(job.id)
+
+    async def finish(self, session, job_id, result=None, error=None):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job = job.model_copy(
+            update={
+                "status": "failed" if error is not None else "succeeded",
+                "result": result,
+                "error": error,
+                "finished_at": datetime.now(timezone.utc),
+            }
+        )
+        self._jobs[job_id] = job
+        self._finished[job_id] = None
+        while len(self._finished) > self.max_finished:
+            expired, _ = self._finished.popitem(last=False)
+            del self._jobs[expired]
+        return job
+
+    async def requeue_stale(self, session, started_before):
+        # Jobs in memory end with the process that ran them
+        return 0
+
+
+class BrainDumpJobQueue:
+    """Queues brain dumps and processes them with a pool of worker tasks"""
+
+    def __init__(
+        self,
+        backend: JobBackend,
+        ai_service: AIService,
+        sessions: Callable[[], AsyncContextManager[AsyncSession]],
+        workers: int = 4,
+        max_running_per_user: int = 2,
+        poll_seconds: float = 5.0,
+        stale_after_seconds: float = 600.0,
+        callback_timeout_seconds: float = 10.0,
+        callback_allowed_hosts: Sequence[str] = (),
+    ):
+        """
+        Args:
+            backend: Job storage
+            ai_service: Processes the brain dumps
+            sessions: Opens a database session (used as `async with sessions()`)
+            workers: Jobs this process runs at the same time
+            max_running_per_user: Jobs one user may have running at once
+            poll_seconds: How often idle workers look for jobs queued elsewhere
+            stale_after_seconds: Running jobs older than this at startup are
+                assumed to belong to a dead worker and are queued again
+            callback_timeout_seconds: Timeout for the callback POST
+            callback_allowed_hosts: Hosts callback URLs may point to, exactly
+                or as "*.example.com" (none: callbacks are rejected)
+        """
+        self.backend = backend
+        self.ai_service = ai_service
+        self.sessions = sessions
+        self.workers = workers
+        self.max_running_per_user = max_running_per_user
+        self.poll_seconds = poll_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.callback_timeout_seconds = callback_timeout_seconds
+        self.callback_allowed_hosts = [host.lower() for host in callback_allowed_hosts]
+        self.resolve: Callable[[str, int], Awaitable[List[str]]] = resolve_host
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._work_available: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        ai_service: AIService,
+        sessions: Callable[[], AsyncContextManager[AsyncSession]],
+    ) -> "BrainDumpJobQueue":
+        """Build a queue from JOB_* settings"""
+        backend_name = os.getenv("JOB_QUEUE_BACKEND", "database")
+        backends: Dict[str, Callable[[], Any]] = {
+            "database": DatabaseJobBackend,
+            "memory": MemoryJobBackend,
+        }
+        if backend_name not in backends:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {backend_name}")
+        return cls(
+            backends[backend_name](),
+            ai_service,
+            sessions,
+            workers=int(os.getenv("JOB_WORKERS", 4)),
+            max_running_per_user=int(os.getenv("JOB_MAX_RUNNING_PER_USER", 2)),
+            poll_seconds=float(os.getenv("JOB_POLL_SECONDS", 5.0)),
+            stale_after_seconds=float(os.getenv("JOB_STALE_AFTER_SECONDS", 600)),
+            callback_timeout_seconds=float(
+                os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", 10)
+            ),
+            callback_allowed_hosts=[
+                host.strip()
+                for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",")
+                if host.strip()
+            ],
+        )
+
+    async def start(self) -> None:
+        """Queue abandoned jobs again and start the workers"""
+        self._stopping = False
+        self._work_available = asyncio.Event()
+        self._http = httpx.AsyncClient(timeout=self.callback_timeout_seconds)
+        started_before = datetime.now(timezone.utc) - timedelta(
+            seconds=self.stale_after_seconds
+        )
+        try:
+            async with self.sessions() as session:
+                requeued = await self.backend.requeue_stale(session, started_before)
+                await session.commit()
+            if requeued:
+                logger.info("Requeued abandoned jobs", extra={"jobs": requeued})
+        except Exception:
+            logger.exception("Could not requeue abandoned jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float) -> None:
+        """
+        Stop taking jobs and wait for running ones to finish
+
+        Jobs still running after the timeout are cancelled; with the database
+        backend they stay "running" and are queued again once they are stale.
+        """
+        self._stopping = True
+        if self._work_available is not None:
+            self._work_available.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def submit(
+        self,
+        user_id: int,
+        text: str,
+        priority: int = 0,
+        callback_url: Optional[str] = None,
+    ) -> BrainDumpJobResponse:
+        """
+        Queue a brain dump and return the job
+
+        Raises:
+            CallbackURLNotAllowedError: callback_url's host is not allowed
+        """
+        if callback_url is not None:
+            self.check_callback_url(callback_url)
+        async with self.sessions() as session:
+            job = await self.backend.create(
+                session, user_id, text, priority, callback_url
+            )
+            await session.commit()
+        jobs_total.inc(status="queued")
+        self._notify_workers()
+        return job
+
+    async def get(self, job_id: int, user_id: int) -> Optional[BrainDumpJobResponse]:
+        """A user's job, or None"""
+        async with self.sessions() as session:
+            return await self.backend.get(session, job_id, user_id)
+
+    def _notify_workers(self) -> None:
+        if self._work_available is not None:
+            self._work_available.set()
+
+    async def _worker(self) -> None:
+        assert self._work_available is not None
+        while not self._stopping:
+            # Cleared before looking, so a job queued meanwhile wakes us again
+            self._work_available.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(
+                        self._work_available.wait(), self.poll_seconds
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+            # The user's slot is free again; their next job may be waiting
+            self._notify_workers()
+
+    async def _claim(self) -> Optional[ClaimedJob]:
+        async with self.sessions() as session:
+            job = await self.backend.claim(session, self.max_running_per_user)
+            await session.commit()
+        return job
+
+    async def _run(self, job: ClaimedJob) -> None:
+        with tracer.start_trace("brain_dump_job", attributes={"klara.job_id": job.id}):
+            await self._process(job)
+
+    async def _process(self, job: ClaimedJob) -> None:
+        jobs_running.inc()
+        try:
+            processed = await self.ai_service.process_brain_dump(job.text)
+            async with self.sessions() as session:
+                response = await brain_dump_access.save_processed_brain_dump(
+                    session=session,
+                    user_id=job.user_id,
+                    raw_input=job.text,
+                    processed=processed,
+                    source="job",
+                )
+                finished = await self.backend.finish(session, job.id, result=response)
+                await session.commit()
+        except Exception as e:
+            logger.warning(
+                "Job failed", extra={"job_id": job.id, "error": str(e)}, exc_info=True
+            )
+            try:
+                async with self.sessions() as session:
+                    finished = await self.backend.finish(
+                        session, job.id, error=f"Processing failed: {e}"
+                    )
+                    await session.commit()
+            except Exception:
+                logger.exception(
+                    "Could not record a job failure", extra={"job_id": job.id}
+                )
+                return
+        finally:
+            jobs_running.dec()
+
+        if finished is not None:
+            jobs_total.inc(status=finished.status)
+            if job.callback_url:
+                await self._send_callback(job.callback_url, finished)
+
+    def check_callback_url(self, url: str) -> None:
+        """Raise CallbackURLNotAllowedError unless url's host is allowed"""
+        host = httpx.URL(url).host
+        if not host_allowed(host, self.callback_allowed_hosts):
+            raise CallbackURLNotAllowedError(
+                f"callback_url host {host!r} is not allowed"
+            )
+
+    async def _send_callback(self, url: str, job: BrainDumpJobResponse) -> None:
+        """POST the finished job to its callback URL (once, not retried)"""
+        assert self._http is not None
+        try:
+            # Checked again: the job may have been queued under other settings
+            self.check_callback_url(url)
+            target = httpx.URL(url)
+            port = target.port or (443 if target.scheme == "https" else 80)
+            addresses = await self.resolve(target.host, port)
+            if not addresses or not all(map(is_public_address, addresses)):
+                raise CallbackURLNotAllowedError(
+                    f"callback_url host {target.host!r} resolves to {addresses}"
+                )
+        except (CallbackURLNotAllowedError, OSError) as e:
+            job_callbacks.inc(outcome="rejected")
+            logger.warning(
+                "Job callback rejected",
+                extra={"job_id": job.id, "url": url, "error": str(e)},
+            )
+            return
+
+        try:
+            # Connect to the address just checked rather than resolving the
+            # name again, which could then return an internal address
+            response = await self._http.post(
+                target.copy_with(host=addresses[0]),
+                json=job.model_dump(mode="json"),
+                headers={"Host": target.netloc.decode("ascii")},
+                extensions={"sni_hostname": target.host},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            job_callbacks.inc(outcome="failed")
+            logger.warning(
+                "Job callback failed",
+                extra={"job_id": job.id, "url": url, "error": str(e)},
+            )
+            return
+        job_callbacks.inc(outcome="delivered")
@@ -1,22 +1,75 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.db_models import Base
+from functools import lru_cache
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from app.db_pool import pool_options_from_env
+from app import server_timing, tracing
+from app.server_timing import timed
+from app.tracing import SPAN_KIND_CLIENT, tracer
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL not found in environment variables")
+# Async drivers for each supported backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Tables are created when this module is imported
-Base.metadata.create_all(bind=engine)
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use the matching async driver"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+# The engine is created on first use (one per worker process) and never
+# connects at import time. The schema is managed by Alembic
+# (`alembic upgrade head`), not created by the app.
+@lru_cache
+def get_engine() -> AsyncEngine:
+    """The process-wide database engine"""
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise ValueError("DATABASE_URL not found in environment variables")
+
+    # Pool size, overflow, timeout, recycling and pre-ping come from DB_POOL_*
+    engine = create_async_engine(
+        to_async_url(database_url), echo=False, **pool_options_from_env()
+    )
+    server_timing.instrument_engine(engine.sync_engine)
+    if tracer.enabled:
+        tracing.instrument_engine(engine.sync_engine)
+    return engine
+
+
+class TracedSession(AsyncSession):
+    """AsyncSession whose commits show up in request traces and Server-Timing"""
+
+    async def commit(self) -> None:
+        with tracer.span("COMMIT", kind=SPAN_KIND_CLIENT), timed("db"):
+            await super().commit()
+
+
+@lru_cache
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=get_engine(), autoflush=False, expire_on_commit=False, class_=TracedSession
+    )
+
+
+async def dispose_engine() -> None:
+    """Close all pooled connections (on shutdown)"""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+        get_session_factory.cache_clear()
+        get_engine.cache_clear()
+
+
+async def get_db():
+    async with get_session_factory()() as db:
         yield db
-    finally:
-        db.close()
@@ -2,7 +2,16 @@
 SQLAlchemy ORM models for database tables
 """
 
-from sqlalchemy import String, Text, Date, Time, ForeignKey, TIMESTAMP
+from sqlalchemy import (
+    String,
+    Text,
+    Date,
+    Time,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    TIMESTAMP,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from datetime import datetime, date, time
@@ -10,7 +19,9 @@ from typing import Optional
 
 
 class Base(DeclarativeBase):
-    pass
+    # Fetch server-generated columns (e.g. created_at) in the INSERT itself,
+    # since AsyncSession can't lazy-load expired attributes afterwards
+    __mapper_args__ = {"eager_defaults": True}
 
 
 class User(Base):
@@ -35,8 +46,37 @@ class User(Base):
     )
 
 
+class BrainDump(Base):
+    """The text of a brain dump, stored once for all the items it produced"""
+
+    __tablename__ = "brain_dumps"
+    __table_args__ = (Index("ix_brain_dumps_user_id_id", "user_id", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    raw_input: Mapped[str] = mapped_column(Text)
+    # How it was submitted: sync, stream, batch or job (None for backfilled rows)
+    source: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+
+
 class Task(Base):
     __tablename__ = "tasks"
+    # Keyset pagination: newest first or by due date, optionally by completion
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_id_completed_id", "user_id", "completed", "id"),
+        Index("ix_tasks_user_id_due_date_id", "user_id", "due_date", "id"),
+        Index(
+            "ix_tasks_user_id_completed_due_date",
+            "user_id",
+            "completed",
+            "due_date",
+            "id",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -44,7 +84,9 @@ class Task(Base):
     due_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
     estimated_time_minutes: Mapped[Optional[int]] = mapped_column(nullable=True)
     completed: Mapped[bool] = mapped_column(default=False, server_default="false")
-    raw_input: Mapped[str] = mapped_column(Text)
+    brain_dump_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("brain_dumps.id", ondelete="SET NULL"), nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -58,12 +100,19 @@ class Task(Base):
 
 class ShoppingItem(Base):
     __tablename__ = "shopping_items"
+    # Keyset pagination: newest first, optionally by completion
+    __table_args__ = (
+        Index("ix_shopping_items_user_id_id", "user_id", "id"),
+        Index("ix_shopping_items_user_id_completed_id", "user_id", "completed", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     description: Mapped[str] = mapped_column(Text)
     completed: Mapped[bool] = mapped_column(default=False, server_default="false")
-    raw_input: Mapped[str] = mapped_column(Text)
+    brain_dump_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("brain_dumps.id", ondelete="SET NULL"), nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -74,13 +123,19 @@ class ShoppingItem(Base):
 
 class CalendarEvent(Base):
     __tablename__ = "calendar_events"
+    # Keyset pagination in date order
+    __table_args__ = (
+        Index("ix_calendar_events_user_id_event_date", "user_id", "event_date", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     description: Mapped[str] = mapped_column(Text)
     event_date: Mapped[date] = mapped_column(Date)
     event_time: Mapped[Optional[time]] = mapped_column(Time, nullable=True)
-    raw_input: Mapped[str] = mapped_column(Text)
+    brain_dump_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("brain_dumps.id", ondelete="SET NULL"), nullable=True
+    )
     created_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now()
     )
@@ -107,3 +162,59 @@ class SubTask(Base):
 
     # Relationships
     parent_task: Mapped["Task"] = relationship(back_populates="subtasks")
+
+
+class IdempotencyKey(Base):
+    """The response a brain dump request with an Idempotency-Key header produced"""
+
+    __tablename__ = "idempotency_keys"
+    # Also the lookup index: keys are scoped to their user
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    key: Mapped[str] = mapped_column(String(255))
+    # SHA-256 of the request text, to reject a key reused for another request
+    request_hash: Mapped[str] = mapped_column(String(64))
+    # BrainDumpResponse JSON, or BrainDumpJobResponse JSON for a queued request
+    response: Mapped[str] = mapped_column(Text)
+    # Job of a request queued with Prefer: respond-async
+    job_id: Mapped[Optional[int]] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+
+
+class BrainDumpJob(Base):
+    """A brain dump queued for background processing (Prefer: respond-async)"""
+
+    __tablename__ = "brain_dump_jobs"
+    __table_args__ = (
+        # Workers claim the highest-priority, oldest queued job
+        Index("ix_brain_dump_jobs_status_priority_id", "status", "priority", "id"),
+        # Per-user concurrency limit: running jobs per user
+        Index("ix_brain_dump_jobs_user_id_status", "user_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    text: Mapped[str] = mapped_column(Text)
+    priority: Mapped[int] = mapped_column(default=0, server_default="0")
+    # queued, running, succeeded or failed
+    status: Mapped[str] = mapped_column(String(16), default="queued")
+    callback_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # BrainDumpResponse JSON once succeeded
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
@@ -0,0 +1,90 @@
+"""
+Database connection pool settings and telemetry
+"""
+
+import os
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.metrics import registry
+
+pool_checkouts = registry.counter(
+    "db_pool_checkouts_total", "Connections handed out by the pool"
+)
+pool_wait_seconds = registry.counter(
+    "db_pool_checkout_seconds_total",
+    "Time spent waiting for a pooled connection (including connecting and "
+    "pre-ping); divide by db_pool_checkouts_total for the average",
+)
+pool_overflow_checkouts = registry.counter(
+    "db_pool_overflow_checkouts_total",
+    "Checkouts that had to open a connection beyond pool_size (max_overflow)",
+)
+pool_timeouts = registry.counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS with every connection in use",
+)
+pool_invalidations = registry.counter(
+    "db_pool_invalidations_total",
+    "Connections discarded as broken (e.g. failed pre-ping after a failover)",
+)
+pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool"
+)
+pool_overflow = registry.gauge("db_pool_overflow", "Open connections beyond pool_size")
+
+
+def pool_options_from_env() -> Dict[str, Any]:
+    """create_async_engine pool arguments from DB_POOL_* settings"""
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        # Connections kept open per worker process
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        # Extra connections opened under bursts and closed when returned
+        "max_overflow": int(os.getenv("DB_POOL_MAX_OVERFLOW", 10)),
+        # How long a request waits for a free connection before failing
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30)),
+        # Replace connections older than this, before the server or a proxy
+        # drops them
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800)),
+        # Test each connection on checkout so stale ones (after a failover)
+        # are replaced instead of failing the request
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower()
+        not in ("0", "false", "no"),
+    }
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkouts, wait time and overflow"""
+
+    def connect(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait_seconds.inc(time.perf_counter() - started)
+
+        pool_checkouts.inc()
+        if self._overflow > max(overflow_before, 0):
+            pool_overflow_checkouts.inc()
+        self._update_gauges()
+        return connection
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def _invalidate(self, connection, exception=None, _checkin=True) -> None:
+        pool_invalidations.inc()
+        super()._invalidate(connection, exception, _checkin)
+
+    def _update_gauges(self) -> None:
+        pool_checked_out.set(self.checkedout())
+        pool_overflow.set(max(self.overflow(), 0))
@@ -0,0 +1,476 @@
+"""
+Rule-based fast path for trivial brain dumps
+
+Recognizes obvious shopping lists ("milk, eggs, bread") and single dated
+events ("dentist tuesday 3pm") and builds the ProcessedBrainDump directly,
+without an LLM call. Every match comes with a confidence score; callers
+only use the result when it clears their threshold and otherwise fall back
+to the LLM.
+"""
+
+import re
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.metrics import registry
+from app.models import (
+    ProcessedBrainDump,
+    ProcessedShoppingItem,
+    ProcessedCalendarEvent,
+)
+
+fast_path_requests = registry.counter(
+    "fast_path_requests_total",
+    "Brain dumps checked by the rule-based fast path, by outcome",
+    ("outcome",),
+)
+
+
+class FastPathResult(NamedTuple):
+    """A brain dump handled without the LLM"""
+
+    processed: ProcessedBrainDump
+    confidence: float
+    kind: str  # "shopping" or "event"
+
+
+# Leading phrases that announce a shopping list (longest first)
+SHOPPING_CUES = [
+    "shopping list:",
+    "grocery list:",
+    "buy groceries:",
+    "get groceries:",
+    "groceries:",
+    "need to buy",
+    "need to get",
+    "we need",
+    "we're out of",
+    "out of",
+    "pick up",
+    "buy",
+    "get",
+    "grab",
+    "need",
+]
+
+SHOPPING_SUFFIX = re.compile(
+    r"\s+(?:from|at) the (?:store|supermarket|grocery store|market)$"
+)
+
+# Words that make a segment an action (task) rather than something to buy
+ACTION_VERBS = {
+    "call",
+    "email",
+    "text",
+    "phone",
+    "schedule",
+    "book",
+    "plan",
+    "send",
+    "make",
+    "clean",
+    "fix",
+    "pay",
+    "remember",
+    "remind",
+    "sign",
+    "fill",
+    "drop",
+    "take",
+    "return",
+    "cancel",
+    "organize",
+    "prepare",
+    "write",
+    "finish",
+    "check",
+    "ask",
+    "tell",
+    "wash",
+    "cook",
+    "order",
+    "register",
+    "renew",
+    "update",
+    "find",
+    "research",
+    "print",
+    "mail",
+    "visit",
+    "meet",
+}
+
+# Words that imply a deadline, recurrence or timing we don't model here
+TIMING_WORDS = {
+    "by",
+    "before",
+    "after",
+    "until",
+    "due",
+    "every",
+    "each",
+    "weekly",
+    "daily",
+    "monthly",
+    "weekend",
+}
+
+GROCERIES = {
+    "milk",
+    "egg",
+    "bread",
+    "butter",
+    "cheese",
+    "yogurt",
+    "cream",
+    "juice",
+    "coffee",
+    "tea",
+    "water",
+    "soda",
+    "beer",
+    "wine",
+    "cereal",
+    "oatmeal",
+    "oat",
+    "flour",
+    "sugar",
+    "salt",
+    "pepper",
+    "oil",
+    "vinegar",
+    "rice",
+    "pasta",
+    "noodle",
+    "sauce",
+    "ketchup",
+    "mustard",
+    "mayo",
+    "honey",
+    "jam",
+    "peanut",
+    "chicken",
+    "beef",
+    "pork",
+    "turkey",
+    "ham",
+    "bacon",
+    "sausage",
+    "fish",
+    "salmon",
+    "tuna",
+    "shrimp",
+    "tofu",
+    "bean",
+    "lentil",
+    "apple",
+    "banana",
+    "orange",
+    "lemon",
+    "lime",
+    "grape",
+    "berry",
+    "strawberry",
+    "blueberry",
+    "raspberry",
+    "avocado",
+    "tomato",
+    "potato",
+    "onion",
+    "garlic",
+    "carrot",
+    "celery",
+    "lettuce",
+    "spinach",
+    "kale",
+    "broccoli",
+    "cucumber",
+    "zucchini",
+    "mushroom",
+    "corn",
+    "pea",
+    "fruit",
+    "vegetable",
+    "veggie",
+    "snack",
+    "chip",
+    "cracker",
+    "cookie",
+    "chocolate",
+    "candy",
+    "granola",
+    "bar",
+    "nut",
+    "almond",
+    "popcorn",
+    "ice",
+    "pizza",
+    "tortilla",
+    "bagel",
+    "muffin",
+    "diaper",
+    "wipe",
+    "formula",
+    "shampoo",
+    "soap",
+    "toothpaste",
+    "toothbrush",
+    "deodorant",
+    "detergent",
+    "towel",
+    "tissue",
+    "napkin",
+    "foil",
+    "wrap",
+    "bag",
+    "battery",
+    "lightbulb",
+    "sponge",
+    "dog food",
+    "cat food",
+    "toilet paper",
+    "paper towel",
+    "trash bag",
+}
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2, "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4, "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}  # fmt: skip
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9,
+    "october": 10, "oct": 10, "november": 11, "nov": 11, "december": 12,
+    "dec": 12,
+}  # fmt: skip
+
+WEEKDAY_PATTERN = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+DATE_RE = re.compile(
+    rf"\b(?:on\s+)?(?:"
+    rf"(?P<relative>today|tonight|tomorrow)"
+    rf"|(?P<modifier>next|this)?\s*(?P<weekday>{WEEKDAY_PATTERN})\.?"
+    rf"|(?P<month>{MONTH_PATTERN})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?"
+    rf"|(?P<num_month>\d{{1,2}})/(?P<num_day>\d{{1,2}})"
+    rf")\b",
+    re.IGNORECASE,
+)
+TIME_RE = re.compile(
+    r"\b(?:at\s+|@\s*)?(?:"
+    r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm|a\.m\.|p\.m\.)"
+    r"|(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)"
+    r"|(?P<noon>noon)"
+    r")(?!\w)",
+    re.IGNORECASE,
+)
+SPLIT_RE = re.compile(r"\s*(?:,|;|\n|&|\band\b|^\s*[-*•])\s*", re.IGNORECASE)
+
+
+def handle(text: str, today: date, min_confidence: float) -> Optional[FastPathResult]:
+    """
+    The fast-path result for a brain dump if it is confident enough
+
+    Args:
+        text: The user's brain dump text
+        today: The date relative dates are resolved against
+        min_confidence: Results below this confidence go to the LLM instead
+
+    Returns:
+        FastPathResult, or None when the LLM should handle the brain dump
+    """
+    result = classify(text, today)
+    if result is None:
+        fast_path_requests.inc(outcome="no_match")
+        return None
+    if result.confidence < min_confidence:
+        fast_path_requests.inc(outcome="low_confidence")
+        return None
+    fast_path_requests.inc(outcome="hit")
+    return result
+
+
+def classify(text: str, today: date) -> Optional[FastPathResult]:
+    """Handle a trivial brain dump without the LLM, if it is one"""
+    cleaned = " ".join(text.split()).strip(" .!")
+    if not cleaned or len(cleaned) > 200:
+        return None
+    return classify_event(cleaned, today) or classify_shopping_list(cleaned)
+
+
+def classify_shopping_list(text: str) -> Optional[FastPathResult]:
+    """Recognize a plain list of things to buy"""
+    if DATE_RE.search(text) or TIME_RE.search(text):
+        return None
+
+    lowered = text.lower()
+    cue = next((cue for cue in SHOPPING_CUES if lowered.startswith(cue + " ")), None)
+    if cue is None:
+        cue = next((cue for cue in SHOPPING_CUES if lowered.startswith(cue)), None)
+        cue = cue if cue and cue.endswith(":") else None
+    body = text[len(cue) :] if cue else text
+    body = SHOPPING_SUFFIX.sub("", body.strip(" :"))
+
+    items = [segment.strip(" .") for segment in SPLIT_RE.split(body)]
+    items = [item for item in items if item]
+    if not items or len(items) > 30:
+        return None
+
+    known = 0
+    for item in items:
+        words = item.lower().split()
+        if len(words) > 5 or words[0] in ACTION_VERBS:
+            return None
+        if TIMING_WORDS.intersection(words) or any(
+            word in SHOPPING_CUES for word in words[:1]
+        ):
+            return None
+        if is_grocery(words):
+            known += 1
+
+    known_share = known / len(items)
+    if cue:
+        confidence = 0.75 + 0.2 * known_share
+    else:
+        # Without a cue, only lists made entirely of known groceries qualify
+        confidence = 0.9 * known_share if len(items) > 1 else 0.6 * known_share
+
+    return FastPathResult(
+        processed=ProcessedBrainDump(
+            shopping_items=[
+                ProcessedShoppingItem(description=capitalize(item)) for item in items
+            ]
+        ),
+        confidence=round(confidence, 2),
+        kind="shopping",
+    )
+
+
+def classify_event(text: str, today: date) -> Optional[FastPathResult]:
+    """Recognize a single short event with a date and optional time"""
+    date_match = DATE_RE.search(text)
+    if date_match is None:
+        return None
+    resolved = resolve_date(date_match, today)
+    if resolved is None:
+        return None
+    event_date, confidence = resolved
+
+    remainder = remove_span(text, date_match.span())
+    time_match = TIME_RE.search(remainder)
+    event_time = None
+    if time_match:
+        event_time = resolve_time(time_match)
+        if event_time is None:
+            return None
+        remainder = remove_span(remainder, time_match.span())
+    else:
+        confidence -= 0.05
+
+    description = re.sub(r"\s+(?:on|at)$", "", remainder.strip(" ,.-")).strip()
+    words = description.lower().split()
+    if not words or len(words) > 5:
+        return None
+    if (
+        words[0] in ACTION_VERBS
+        or words[0] in SHOPPING_CUES
+        or TIMING_WORDS.intersection(words)
+        or SPLIT_RE.search(description)
+        or DATE_RE.search(description)
+    ):
+        return None
+
+    return FastPathResult(
+        processed=ProcessedBrainDump(
+            calendar_events=[
+                ProcessedCalendarEvent(
+                    description=capitalize(description),
+                    event_date=event_date.isoformat(),
+                    event_time=event_time,
+                )
+            ]
+        ),
+        confidence=round(confidence, 2),
+        kind="event",
+    )
+
+
+def resolve_date(match: re.Match, today: date) -> Optional[Tuple[date, float]]:
+    """Resolve a date expression against today, with a confidence score"""
+    if match["relative"]:
+        offset = 1 if match["relative"].lower() == "tomorrow" else 0
+        return today + timedelta(days=offset), 0.95
+
+    if match["weekday"]:
+        weekday = WEEKDAYS[match["weekday"].lower()]
+        days_ahead = (weekday - today.weekday()) % 7
+        confidence = 0.9
+        if days_ahead == 0:
+            # "tuesday" said on a Tuesday most likely means next week
+            days_ahead = 7
+            confidence -= 0.1
+        if match["modifier"] and match["modifier"].lower() == "next":
+            # "next thursday" is ambiguous (this coming or the one after)
+            confidence -= 0.2
+        return today + timedelta(days=days_ahead), confidence
+
+    if match["month"]:
+        month, day = MONTHS[match["month"].lower()], int(match["day"])
+    else:
+        month, day = int(match["num_month"]), int(match["num_day"])
+    try:
+        resolved = date(today.year, month, day)
+        if resolved < today:
+            resolved = date(today.year + 1, month, day)
+    except ValueError:
+        return None
+    return resolved, 0.95
+
+
+def resolve_time(match: re.Match) -> Optional[str]:
+    """Convert a time expression to HH:MM (24-hour)"""
+    if match["noon"]:
+        return "12:00"
+    if match["hour24"] is not None:
+        return f"{int(match['hour24']):02d}:{match['minute24']}"
+    hour, minute = int(match["hour"]), int(match["minute"] or 0)
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    if match["ampm"].lower().startswith("p") and hour != 12:
+        hour += 12
+    elif match["ampm"].lower().startswith("a") and hour == 12:
+        hour = 0
+    return f"{hour:02d}:{minute:02d}"
+
+
+def is_grocery(words: List[str]) -> bool:
+    """Whether an item (e.g. "2 gallons of milk") names a known grocery"""
+    if "of" in words:
+        words = words[words.index("of") + 1 :]
+    if " ".join(words[-2:]) in GROCERIES:
+        return True
+    return bool(words) and singular(words[-1]) in GROCERIES
+
+
+def singular(word: str) -> str:
+    if word in GROCERIES:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def capitalize(text: str) -> str:
+    return text[0].upper() + text[1:]
+
+
+def remove_span(text: str, span: Tuple[int, int]) -> str:
+    start, end = span
+    return " ".join((text[:start] + " " + text[end:]).split())
@@ -0,0 +1,79 @@
+"""
+Request latency by route, and the route of the request being handled
+
+HTTPMetricsMiddleware times every HTTP request into
+http_request_duration_seconds, labeled with the route's path template (e.g.
+/brain-dumps/jobs/{job_id}) rather than the raw path, so IDs don't create
+new series. current_route() lets code called from a request, like the LLM
+metrics, label what it records with the route too.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, MutableMapping, Optional
+
+from app.metrics import registry
+
+# Streams and LLM-backed routes run for many seconds
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Outside a request, e.g. background jobs
+NO_ROUTE = "background"
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response is complete, by route",
+    ("method", "route", "status"),
+    HTTP_BUCKETS,
+)
+
+# Scope of the request being handled; FastAPI adds the matched route to it
+request_scope: ContextVar[Optional[MutableMapping[str, Any]]] = ContextVar(
+    "request_scope", default=None
+)
+
+
+def current_route() -> str:
+    """Path template of the route handling the current request"""
+    scope = request_scope.get()
+    if scope is None:
+        return NO_ROUTE
+    return route_template(scope)
+
+
+def route_template(scope: MutableMapping[str, Any]) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware timing each request until its last body chunk is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        token = request_scope.set(scope)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_scope.reset(token)
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route_template(scope),
+                status=str(status),
+            )
@@ -0,0 +1,180 @@
+"""
+Content-addressed cache for processed brain dumps
+
+Identical brain dumps (after normalization) processed on the same day with
+the same model and prompt version return the cached ProcessedBrainDump
+instead of calling the LLM again. There is an in-process LRU tier with a
+TTL and an optional shared SQLite tier so several workers can reuse results.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.metrics import registry
+from app.models import ProcessedBrainDump
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+cache_hits = registry.counter(
+    "llm_cache_hits_total", "Brain dumps served from the LLM cache", ("tier",)
+)
+cache_misses = registry.counter(
+    "llm_cache_misses_total", "Brain dump cache lookups that needed an LLM call"
+)
+cache_entries = registry.gauge(
+    "llm_cache_entries", "Entries in the in-process LLM cache tier"
+)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a brain dump so trivial differences share a cache entry"""
+    return " ".join(text.lower().split())
+
+
+def cache_key(text: str, today: str, model: str, prompt_version: str) -> str:
+    """Hash of everything that determines the LLM output for a brain dump"""
+    material = "\x1f".join([prompt_version, model, today, normalize_text(text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LRUTTLCache(Generic[K, V]):
+    """Bounded in-memory LRU cache whose entries expire after a TTL"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SQLiteCacheBackend:
+    """Shared cache tier stored in a SQLite file, usable by several workers"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+
+
+class LLMResponseCache:
+    """Two-tier cache of ProcessedBrainDump results keyed by cache_key()"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 60 * 60,
+        shared: Optional[SQLiteCacheBackend] = None,
+    ):
+        self.local: LRUTTLCache[str, ProcessedBrainDump] = LRUTTLCache(
+            max_entries, ttl_seconds
+        )
+        self.shared = shared
+        # The gauge reports the most recently built cache (one per process)
+        cache_entries.callback = lambda: len(self.local)
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Build the cache from LLM_CACHE_* settings, or None when disabled"""
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+            return None
+        ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 60 * 60))
+        sqlite_path = os.getenv("LLM_CACHE_SQLITE_PATH")
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024)),
+            ttl_seconds=ttl_seconds,
+            shared=SQLiteCacheBackend(sqlite_path, ttl_seconds)
+            if sqlite_path
+            else None,
+        )
+
+    async def get(self, key: str) -> Optional[ProcessedBrainDump]:
+        result = self.local.get(key)
+        if result is not None:
+            cache_hits.inc(tier="memory")
+            return result
+
+        if self.shared is not None:
+            value = await asyncio.to_thread(self.shared.get, key)
+            if value is not None:
+                result = ProcessedBrainDump.model_validate_json(value)
+                self.local.set(key, result)
+                cache_hits.inc(tier="shared")
+                return result
+
+        cache_misses.inc()
+        return None
+
+    async def set(self, key: str, result: ProcessedBrainDump) -> None:
+        self.local.set(key, result)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, key, result.model_dump_json())
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size of the in-process tier"""
+        return {
+            "memory_hits": cache_hits.value(tier="memory"),
+            "shared_hits": cache_hits.value(tier="shared"),
+            "misses": cache_misses.value(),
+            "entries": len(self.local),
+        }
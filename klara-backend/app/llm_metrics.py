@@ -0,0 +1,159 @@
+"""
+Metrics for LLM calls: latency, token usage (including prompt caching), cost
+and failures
+
+record_call() adds one LLM call to the metrics and logs it as a structured
+"llm_call" line.
+"""
+
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+from app.http_metrics import current_route
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: input, output, cache read, cache write
+MODEL_PRICES: Dict[str, tuple[float, float, float, float]] = {
+    "claude-sonnet-4-20250514": (3.00, 15.00, 0.30, 3.75),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 0.08, 1.00),
+}
+
+# LLM calls take seconds, occasionally tens of seconds
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+
+llm_tokens = registry.counter(
+    "llm_tokens_total",
+    "Tokens used by LLM calls; input includes cache_read and cache_creation",
+    ("model", "type"),
+)
+
+parse_failures = registry.counter(
+    "llm_parse_failures_total",
+    "LLM replies that could not be parsed into a ProcessedBrainDump",
+    ("mode",),
+)
+llm_fallbacks = registry.counter(
+    "llm_fallbacks_total",
+    "Brain dumps that fell back to a single unprocessed task",
+    ("reason",),
+)
+llm_calls_in_flight = registry.gauge(
+    "llm_calls_in_flight", "LLM calls (requests and streams) not yet finished"
+)
+llm_call_duration = registry.histogram(
+    "llm_call_duration_seconds",
+    "LLM call latency including retries, by route, model, kind (invoke or "
+    "stream) and outcome (ok, parse_error or error)",
+    ("route", "model", "kind", "outcome"),
+    LLM_BUCKETS,
+)
+llm_time_to_first_token = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time until a streamed LLM call sent its first chunk",
+    ("route", "model"),
+    LLM_BUCKETS,
+)
+llm_cost = registry.counter(
+    "llm_cost_usd_total",
+    "Estimated cost of LLM calls in USD, from list prices",
+    ("model",),
+)
+brain_dump_duration = registry.histogram(
+    "brain_dump_processing_seconds",
+    "Time to process a brain dump (without saving it), by route and by how it "
+    "was processed: fast_path, cache, llm, fallback or circuit_open",
+    ("route", "source"),
+    LLM_BUCKETS,
+)
+
+
+def usage_counts(usage_metadata: Optional[Mapping[str, Any]]) -> Dict[str, int]:
+    """Flatten LangChain usage metadata into input/output/cache token counts"""
+    usage = usage_metadata or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input": usage.get("input_tokens") or 0,
+        "output": usage.get("output_tokens") or 0,
+        "cache_read": details.get("cache_read") or 0,
+        "cache_creation": details.get("cache_creation") or 0,
+    }
+
+
+def usage_cost(counts: Dict[str, int], model: str) -> Optional[float]:
+    """Cost in USD of a call's token counts, or None for a model without a price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, output_price, cache_read_price, cache_write_price = prices
+    uncached = counts["input"] - counts["cache_read"] - counts["cache_creation"]
+    return (
+        uncached * input_price
+        + counts["output"] * output_price
+        + counts["cache_read"] * cache_read_price
+        + counts["cache_creation"] * cache_write_price
+    ) / 1_000_000
+
+
+def record_call(
+    model: str,
+    prompt_version: str,
+    kind: str,
+    seconds: float,
+    outcome: str,
+    counts: Optional[Dict[str, int]] = None,
+    first_token_seconds: Optional[float] = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    """
+    Record one LLM call in the metrics and log it
+
+    Args:
+        model: Model that was called
+        prompt_version: Version of the prompt it was sent
+        kind: "invoke" or "stream"
+        seconds: Latency including retries
+        outcome: "ok", "parse_error" (the reply was unusable) or "error"
+        counts: Token counts (see usage_counts), if the call returned
+        first_token_seconds: Time to the first streamed chunk
+        error: What failed, if anything
+    """
+    route = current_route()
+    llm_call_duration.observe(
+        seconds, route=route, model=model, kind=kind, outcome=outcome
+    )
+    if first_token_seconds is not None:
+        llm_time_to_first_token.observe(first_token_seconds, route=route, model=model)
+    cost = None
+    if counts is not None:
+        for token_type, count in counts.items():
+            llm_tokens.inc(count, model=model, type=token_type)
+        cost = usage_cost(counts, model)
+        if cost is not None:
+            llm_cost.inc(cost, model=model)
+
+    fields: Dict[str, Any] = {
+        "route": route,
+        "model": model,
+        "prompt_version": prompt_version,
+        "kind": kind,
+        "outcome": outcome,
+        "latency_ms": round(seconds * 1000),
+    }
+    if first_token_seconds is not None:
+        fields["ttft_ms"] = round(first_token_seconds * 1000)
+    if counts is not None:
+        fields.update({f"{token_type}_tokens": n for token_type, n in counts.items()})
+    if cost is not None:
+        fields["cost_usd"] = round(cost, 6)
+    if error is not None:
+        fields["error"] = f"{type(error).__name__}: {error}"
+    logger.log(
+        logging.INFO if outcome == "ok" else logging.WARNING, "llm_call", extra=fields
+    )
+
+
+def record_processing(source: str, seconds: float) -> None:
+    """Record how long a brain dump took to process and how it was processed"""
+    brain_dump_duration.observe(seconds, route=current_route(), source=source)
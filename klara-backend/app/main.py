@@ -1,3 +1,10 @@
+import logging
+import os
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -6,13 +13,84 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import auth, brain_dumps
+from app.brain_dump_jobs import BrainDumpJobQueue
+from app.database import get_db, get_engine, dispose_engine
+from app.http_metrics import HTTPMetricsMiddleware
+from app.metrics import registry
+from app.structured_logging import configure_logging
+from app.server_timing import ServerTimingMiddleware
+from app.tracing import TracingMiddleware
+from app.routes import (
+    auth,
+    brain_dumps,
+    tasks,
+    shopping_items,
+    calendar_events,
+    metrics,
+    debug,
+)
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+startup_seconds = registry.gauge(
+    "app_startup_seconds",
+    "Worker startup time: importing the app and initializing it in the lifespan",
+    ("phase",),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build per-worker resources once at startup and release them on shutdown"""
+    started = time.perf_counter()
+    # Neither connects: the pool opens connections on first use
+    get_engine()
+    get_ai_service = app.dependency_overrides.get(
+        brain_dumps.get_ai_service, brain_dumps.get_ai_service
+    )
+    ai_service = get_ai_service()
+    # Background jobs use the same sessions as requests
+    sessions = asynccontextmanager(app.dependency_overrides.get(get_db, get_db))
+    job_queue = BrainDumpJobQueue.from_env(ai_service, sessions)
+    await job_queue.start()
+    app.state.job_queue = job_queue
+    app.state.sessions = sessions
+    initialization_seconds = time.perf_counter() - started
+
+    startup_seconds.set(IMPORT_SECONDS, phase="import")
+    startup_seconds.set(initialization_seconds, phase="lifespan")
+    logger.info(
+        "Started",
+        extra={
+            "import_ms": round(IMPORT_SECONDS * 1000),
+            "initialization_ms": round(initialization_seconds * 1000),
+        },
+    )
+
+    yield
+
+    shutdown_timeout = float(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", 30))
+    await job_queue.stop(shutdown_timeout)
+    # The server has stopped taking requests; let LLM calls still running
+    # (e.g. streams whose client went away) finish before the pool closes
+    drained = await ai_service.drain(shutdown_timeout)
+    if not drained:
+        logger.warning(
+            "Shutting down with LLM calls still running",
+            extra={"llm_calls": ai_service.in_flight},
+        )
+    await dispose_engine()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Klara Backend",
     description="Mental load management for parents",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -25,9 +103,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(TracingMiddleware)
+# Outermost, so request latency includes the other middleware
+app.add_middleware(HTTPMetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(brain_dumps.router)
+app.include_router(tasks.router)
+app.include_router(shopping_items.router)
+app.include_router(calendar_events.router)
+app.include_router(metrics.router)
+app.include_router(debug.router)
 
 
 @app.get("/")
@@ -0,0 +1,210 @@
+"""
+In-process metrics registry rendered in the Prometheus text format
+"""
+
+import bisect
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """Base class for a named metric with optional labels"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels: str) -> float:
+        """Current value for the given label values (0 if never set)"""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        if not self.labelnames and not self._values:
+            return {(): 0.0}
+        return dict(self._values)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for label_values, value in sorted(self.samples().items()):
+            lines.append(
+                f"{self.name}{format_labels(self.labelnames, label_values)} {value:g}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback at render time"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        if self.callback is not None:
+            return {(): float(self.callback())}
+        return super().samples()
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets, with sum and count"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: observations per bucket (the last is +Inf), sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        """Number of observations for the given label values"""
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels: str) -> float:
+        """Sum of observations for the given label values"""
+        return self._sums.get(self._key(labels), 0.0)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        names = self.labelnames + ("le",)
+        for label_values, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = format_labels(names, label_values + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {self._sums[label_values]:g}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines)
+
+
+def format_labels(labelnames: Tuple[str, ...], label_values: LabelValues) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape_label_value(value)}"'
+        for name, value in zip(labelnames, label_values)
+    )
+    return "{" + pairs + "}"
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsRegistry:
+    """Collection of metrics, keyed by name"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Re-registering returns the existing metric so module reloads are safe
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()
+    ) -> Counter:
+        metric = self.register(Counter(name, documentation, labelnames))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        metric = self.register(Gauge(name, documentation, labelnames, callback))
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = self.register(Histogram(name, documentation, labelnames, buckets))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Process-wide registry used by the app and exposed at GET /metrics
+registry = MetricsRegistry()
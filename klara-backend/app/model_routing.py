@@ -0,0 +1,189 @@
+"""
+Model routing and hedged requests for brain dump extraction
+
+ModelRouter sends short, simple brain dumps to a faster, cheaper model and
+everything else to the full model. Hedger cuts the latency tail: when a call
+has taken longer than the model's recent p95, a second identical call is
+started and whichever finishes first is used. By construction that happens
+to about one call in twenty, so hedging costs about 5% more tokens.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.metrics import registry
+
+T = TypeVar("T")
+
+routed_calls = registry.counter(
+    "llm_routed_calls_total",
+    "Brain dumps sent to an LLM, by the model they were routed to",
+    ("model",),
+)
+hedged_calls = registry.counter(
+    "llm_hedged_calls_total",
+    "Hedged LLM calls: fired when the hedge was started, won when it finished first",
+    ("model", "outcome"),
+)
+
+
+class ModelRouter:
+    """Chooses the model for a brain dump"""
+
+    def __init__(
+        self,
+        model: str,
+        fast_model: Optional[str] = None,
+        fast_max_chars: int = 280,
+        fast_max_lines: int = 3,
+    ):
+        """
+        Args:
+            model: The full model
+            fast_model: Model for short dumps (None routes everything to model)
+            fast_max_chars: Longest dump sent to the fast model
+            fast_max_lines: Most non-empty lines in a dump sent to the fast model
+        """
+        self.model = model
+        self.fast_model = fast_model
+        self.fast_max_chars = fast_max_chars
+        self.fast_max_lines = fast_max_lines
+
+    @classmethod
+    def from_env(cls, model: str, fast_model: Optional[str]) -> "ModelRouter":
+        """Build a router from LLM_ROUTING_* settings; fast_model None disables it"""
+        if os.getenv("LLM_ROUTING_ENABLED", "false").lower() in ("0", "false", "no"):
+            fast_model = None
+        return cls(
+            model,
+            fast_model,
+            fast_max_chars=int(os.getenv("LLM_ROUTING_FAST_MAX_CHARS", 280)),
+            fast_max_lines=int(os.getenv("LLM_ROUTING_FAST_MAX_LINES", 3)),
+        )
+
+    def choose(self, text: str) -> str:
+        """The model that should process text"""
+        if self.fast_model is not None and self.is_simple(text):
+            return self.fast_model
+        return self.model
+
+    def record(self, model: str) -> None:
+        """Count a brain dump actually sent to model (not served from the cache)"""
+        routed_calls.inc(model=model)
+
+    def is_simple(self, text: str) -> bool:
+        lines = [line for line in text.splitlines() if line.strip()]
+        return len(text) <= self.fast_max_chars and len(lines) <= self.fast_max_lines
+
+
+class LatencyWindow:
+    """The most recent latencies of something, for percentiles"""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """Nearest-rank percentile, or None without samples"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(quantile * len(ordered)) - 1)]
+
+
+class Hedger:
+    """Starts a second call when the first is slower than the model's p95"""
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        min_delay_seconds: float = 1.0,
+        window: int = 200,
+    ):
+        """
+        Args:
+            quantile: Latency quantile after which the hedge is started
+            min_samples: Calls of a model measured before it is hedged
+            min_delay_seconds: Never hedge sooner than this
+            window: Recent calls per model the quantile is taken over
+        """
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.window = window
+        self.latencies: Dict[str, LatencyWindow] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["Hedger"]:
+        """Build a hedger from LLM_HEDGE_* settings, or None when disabled"""
+        if os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            quantile=float(os.getenv("LLM_HEDGE_QUANTILE", 0.95)),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)),
+            min_delay_seconds=float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", 1.0)),
+        )
+
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds after which a call to model is hedged, or None if not yet known"""
+        latencies = self.latencies.get(model)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay_seconds, latencies.percentile(self.quantile) or 0.0)
+
+    async def run(self, model: str, make_call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run make_call, starting it a second time if the first takes too long
+
+        The first call to succeed wins and the other is cancelled. A failure
+        before the hedge is started is raised at once; once both run, the
+        other call is waited for.
+        """
+        started = time.monotonic()
+        primary = asyncio.ensure_future(make_call())
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            delay = self.delay(model)
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+                if not primary.done():
+                    hedged_calls.inc(model=model, outcome="fired")
+                    pending.add(asyncio.ensure_future(make_call()))
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Exceptions are read first, so none goes unretrieved
+                failed = {task for task in done if task.exception() is not None}
+                for task in done - failed:
+                    if task is not primary:
+                        hedged_calls.inc(model=model, outcome="won")
+                    return task.result()
+                error = next(iter(failed)).exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            # A primary cut short by its hedge took at least this long, which
+            # keeps slow calls in the window
+            if not primary.done() or (
+                not primary.cancelled() and primary.exception() is None
+            ):
+                self._record(model, time.monotonic() - started)
+
+    def _record(self, model: str, seconds: float) -> None:
+        if model not in self.latencies:
+            self.latencies[model] = LatencyWindow(self.window)
+        self.latencies[model].add(seconds)
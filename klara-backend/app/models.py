@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, HttpUrl
 from typing import Optional, Literal, List
 from datetime import datetime
 
@@ -24,6 +24,22 @@ class BrainDumpRequest(BaseModel):
 
     text: str
     user_id: int
+    # Only used when processing in the background (Prefer: respond-async)
+    priority: int = Field(
+        0, ge=-100, le=100, description="Higher-priority jobs are processed first"
+    )
+    callback_url: Optional[HttpUrl] = Field(
+        None, description="Receives the finished job as a JSON POST"
+    )
+
+
+class BrainDumpBatchRequest(BaseModel):
+    """Many brain dumps to process in one call (e.g. an imported backlog)"""
+
+    items: List[BrainDumpRequest] = Field(min_length=1, max_length=500)
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, description="Maximum concurrent LLM calls for this batch"
+    )
 
 
 # AI Processing models
@@ -83,7 +99,9 @@ class ShoppingItemResponse(BaseModel):
     user_id: int
     description: str
     completed: bool = False
-    raw_input: str
+    brain_dump_id: Optional[int] = None
+    # Text of the brain dump; in lists only with include_raw_input=true
+    raw_input: Optional[str] = None
     created_at: datetime
 
 
@@ -95,7 +113,9 @@ class CalendarEventResponse(BaseModel):
     description: str
     event_date: str
     event_time: Optional[str] = None
-    raw_input: str
+    brain_dump_id: Optional[int] = None
+    # Text of the brain dump; in lists only with include_raw_input=true
+    raw_input: Optional[str] = None
     created_at: datetime
 
 
@@ -106,7 +126,9 @@ class TaskResponse(BaseModel):
     due_date: Optional[str] = None
     estimated_time_minutes: Optional[int] = None
     completed: bool = False
-    raw_input: str
+    brain_dump_id: Optional[int] = None
+    # Text of the brain dump; in lists only with include_raw_input=true
+    raw_input: Optional[str] = None
     subtasks: Optional[List["SubTaskResponse"]] = None
     created_at: datetime
 
@@ -139,6 +161,63 @@ class SubTaskResponse(BaseModel):
 class BrainDumpResponse(BaseModel):
     """Response after processing and saving a brain dump"""
 
+    brain_dump_id: Optional[int] = None
     tasks: List[TaskResponse] = Field(default_factory=list)
     shopping_items: List[ShoppingItemResponse] = Field(default_factory=list)
     calendar_events: List[CalendarEventResponse] = Field(default_factory=list)
+
+
+class BrainDumpBatchItemResult(BaseModel):
+    """Outcome of one brain dump in a batch - either a result or an error"""
+
+    index: int
+    result: Optional[BrainDumpResponse] = None
+    error: Optional[str] = None
+
+
+class BrainDumpBatchResponse(BaseModel):
+    """Response after processing and saving a batch of brain dumps"""
+
+    results: List[BrainDumpBatchItemResult] = Field(default_factory=list)
+
+
+class BrainDumpJobResponse(BaseModel):
+    """A brain dump processed in the background, and its result once done"""
+
+    id: int
+    user_id: int
+    status: Literal["queued", "running", "succeeded", "failed"]
+    priority: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[BrainDumpResponse] = None
+    error: Optional[str] = None
+
+
+# Paginated list responses
+class TaskPage(BaseModel):
+    """One page of a user's tasks"""
+
+    items: List[TaskResponse] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor to get the next page; null on the last page"
+    )
+
+
+class ShoppingItemPage(BaseModel):
+    """One page of a user's shopping items"""
+
+    items: List[ShoppingItemResponse] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor to get the next page; null on the last page"
+    )
+
+
+class CalendarEventPage(BaseModel):
+    """One page of a user's calendar events"""
+
+    items: List[CalendarEventResponse] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor to get the next page; null on the last page"
+    )
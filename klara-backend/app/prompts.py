@@ -0,0 +1,178 @@
+"""
+Versioned prompts for brain dump processing, compiled once per process
+
+Only `today` and `input` are bound per request; the parser, its format
+instructions (a JSON schema dump) and the static system prompt are built
+at import time.
+
+The system prompt is sent as two blocks: a large static prefix marked for
+Anthropic prompt caching, and a small dynamic suffix with the current date,
+so every request can reuse the cached prefix.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from app.models import ProcessedBrainDump
+
+# Bump whenever the system prompt changes so cached results are not reused
+BRAIN_DUMP_PROMPT_VERSION = "2025-10-20"
+
+BRAIN_DUMP_SYSTEM_PROMPT = """You are an AI assistant helping busy parents organize their mental load.
+
+Your job is to extract ALL items from the user's brain dump and categorize them into:
+1. **Tasks** - Things to do, actions to complete
+2. **Shopping Items** - Things to buy, groceries
+3. **Calendar Events** - Time-specific appointments, scheduled activities
+
+IMPORTANT: A single brain dump can contain MULTIPLE categories and MULTIPLE items.
+
+BRAIN DUMP EXAMPLES:
+- "Call the babysitter and buy milk" → 1 task + 1 shopping item
+- "Buy eggs, milk, and bread" → 3 shopping items
+- "Call dentist, schedule car appointment, and pick up dry cleaning" → 3 tasks
+- "Soccer practice Thursday at 4pm and dentist appointment Friday at 2pm" → 2 calendar events
+
+TASK PROCESSING:
+For each task:
+1. Extract a clear, concise description (5-10 words max)
+2. Extract due date if mentioned (YYYY-MM-DD format)
+3. Decide whether to decompose into subtasks
+4. If decomposing, create 3-7 concrete subtasks
+5. Estimate time for the task (or sum of subtasks if decomposed)
+
+TASK DECOMPOSITION CRITERIA:
+- Decompose if the task is complex and involves multiple distinct steps
+- Decompose if the task would take more than 30 minutes to complete
+- Decompose if breaking it down would make it less overwhelming
+- DO NOT decompose simple, straightforward tasks that can be done in one action
+- DO NOT decompose if the task is already specific and clear
+
+TASK DECOMPOSITION EXAMPLES:
+
+Simple tasks (DO NOT decompose):
+- "Call the dentist to reschedule appointment" → Single 5-minute action
+- "Update emergency contact form for school" → Already specific
+- "Send email to teacher about field trip" → Single action
+- "Pick up dry cleaning" → Simple errand
+- "Call the babysitter" → Single phone call
+
+Complex tasks (SHOULD decompose):
+- "Plan Noah's birthday party" → Multiple steps:
+  * Create guest list
+  * Book venue or plan location
+  * Order birthday cake
+  * Buy decorations
+  * Send invitations
+  * Plan activities/games
+
+- "Organize garage for spring cleaning" → Multiple steps:
+  * Sort items into keep/donate/trash
+  * Take donation items to charity
+  * Clean garage floor and walls
+  * Reorganize remaining items
+  * Install new storage solutions
+
+- "Prepare for Mae's school presentation" → Multiple steps:
+  * Research presentation topic
+  * Create slides or poster
+  * Practice presentation
+  * Prepare materials needed
+
+SUBTASK GUIDELINES (if decomposing):
+- Create 3-7 subtasks (not too many, not too few)
+- Order subtasks logically (what needs to happen first)
+- Each subtask should be a concrete, actionable step
+- Estimate time for each subtask realistically
+- Distribute parent task's due_date across subtasks if provided
+
+TIME ESTIMATION GUIDELINES:
+- Simple phone calls: 5-15 minutes
+- Quick errands: 15-30 minutes
+- Planning tasks: 30-120 minutes
+- Research tasks: 30-90 minutes
+- Organization tasks: 60-180 minutes
+
+SHOPPING ITEMS:
+- Extract each item separately
+- Include quantities if specified
+- Keep descriptions concise
+
+CALENDAR EVENTS:
+- Extract description (5-10 words max)
+- Event date (YYYY-MM-DD format) - REQUIRED
+- Event time (HH:MM 24-hour format) if mentioned
+
+{format_instructions}"""
+
+# Dynamic suffix, kept out of the cached prefix
+BRAIN_DUMP_DATE_PROMPT = "Current date: {today}"
+
+# Output instructions when the schema is enforced through tool calling
+BRAIN_DUMP_TOOL_INSTRUCTIONS = (
+    "Record ALL extracted items by calling the ProcessedBrainDump tool exactly once."
+)
+
+
+class BrainDumpPrompt:
+    """Compiled brain dump prompt: static system prompt, parser and date suffix"""
+
+    def __init__(
+        self,
+        version: str,
+        system_prompt: str,
+        date_prompt: str,
+        output_instructions: Optional[str] = None,
+        cache_static_prefix: bool = True,
+    ):
+        self.version = version
+        self.parser = PydanticOutputParser(pydantic_object=ProcessedBrainDump)
+        # JSON schema instructions for free-form output, unless told otherwise
+        self.format_instructions = (
+            output_instructions or self.parser.get_format_instructions()
+        )
+        self.static_system_prompt = system_prompt.replace(
+            "{format_instructions}", self.format_instructions
+        )
+        self.date_prompt = date_prompt
+
+        self._static_block: Dict[str, Any] = {
+            "type": "text",
+            "text": self.static_system_prompt,
+        }
+        if cache_static_prefix:
+            self._static_block["cache_control"] = {"type": "ephemeral"}
+
+    def messages(self, text: str, today: str) -> List[BaseMessage]:
+        """Messages for one request (today is YYYY-MM-DD)"""
+        return [
+            SystemMessage(
+                content=[
+                    self._static_block,
+                    {"type": "text", "text": self.date_prompt.format(today=today)},
+                ]
+            ),
+            HumanMessage(content=text),
+        ]
+
+
+# Set ANTHROPIC_PROMPT_CACHING=false to send the prompt without cache markers
+PROMPT_CACHING = os.getenv("ANTHROPIC_PROMPT_CACHING", "true").lower() != "false"
+
+# Free-form JSON output parsed with PydanticOutputParser
+BRAIN_DUMP_PROMPT = BrainDumpPrompt(
+    BRAIN_DUMP_PROMPT_VERSION,
+    BRAIN_DUMP_SYSTEM_PROMPT,
+    BRAIN_DUMP_DATE_PROMPT,
+    cache_static_prefix=PROMPT_CACHING,
+)
+
+# Schema-constrained output through a forced ProcessedBrainDump tool call
+BRAIN_DUMP_TOOL_PROMPT = BrainDumpPrompt(
+    BRAIN_DUMP_PROMPT_VERSION + "-tool",
+    BRAIN_DUMP_SYSTEM_PROMPT,
+    BRAIN_DUMP_DATE_PROMPT,
+    output_instructions=BRAIN_DUMP_TOOL_INSTRUCTIONS,
+    cache_static_prefix=PROMPT_CACHING,
+)
@@ -0,0 +1,288 @@
+"""
+Timeouts, retries and a circuit breaker for LLM calls
+
+Every call gets a per-attempt timeout and the whole call (retries included)
+a deadline. Retryable failures (connection errors, timeouts, rate limits,
+5xx and overloaded responses) are retried with jittered exponential backoff,
+honoring the provider's Retry-After. Retries draw on a budget earned by
+calls, so a failing provider sees at most a fixed share of extra traffic
+instead of a retry storm.
+
+The circuit breaker opens after consecutive provider failures, and calls
+fail fast with CircuitOpenError until it lets a probe call through.
+"""
+
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import anthropic
+
+from app.metrics import registry
+
+T = TypeVar("T")
+
+# Anthropic returns 429 when rate limited and 529 when overloaded
+RETRYABLE_STATUS_CODES = {429, 529}
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+llm_retries = registry.counter(
+    "llm_retries_total", "LLM calls retried, by the error that caused it", ("error",)
+)
+llm_timeouts = registry.counter(
+    "llm_timeouts_total", "LLM call attempts that exceeded their timeout"
+)
+llm_retry_budget_exhausted = registry.counter(
+    "llm_retry_budget_exhausted_total",
+    "Retryable failures not retried because the retry budget was used up",
+)
+circuit_state = registry.gauge(
+    "llm_circuit_state", "LLM circuit breaker state: 0 closed, 1 half open, 2 open"
+)
+circuit_transitions = registry.counter(
+    "llm_circuit_transitions_total", "LLM circuit breaker state changes", ("state",)
+)
+circuit_rejections = registry.counter(
+    "llm_circuit_rejections_total", "LLM calls failed fast by the open circuit"
+)
+
+
+class CircuitOpenError(Exception):
+    """The provider is considered unhealthy; the call was not made"""
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether the provider asked us to slow down"""
+    return (
+        isinstance(error, anthropic.APIStatusError)
+        and error.status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The provider's Retry-After hint in seconds, if it sent one"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether the error says the provider is unhealthy (counts for the breaker)"""
+    if isinstance(error, (asyncio.TimeoutError, anthropic.APIConnectionError)):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and (
+        error.status_code >= 500 or error.status_code == 529
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    return is_provider_failure(error) or is_rate_limited(error)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive provider failures
+
+    While open, allow() is False. After reset_seconds one probe call is let
+    through (half open): its success closes the circuit, its failure opens it
+    again. A probe that never reports back is replaced after reset_seconds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+        circuit_state.set(CIRCUIT_STATES["closed"])
+
+    def allow(self) -> bool:
+        """Whether a call may be made now"""
+        now = self.clock()
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if now - self.opened_at < self.reset_seconds:
+                return False
+            self._set_state("half_open")
+        if (
+            self.probe_started_at is None
+            or now - self.probe_started_at >= self.reset_seconds
+        ):
+            self.probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probe_started_at = None
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            if self.state != "open":
+                self._set_state("open")
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        circuit_state.set(CIRCUIT_STATES[state])
+        circuit_transitions.inc(state=state)
+
+
+class RetryBudget:
+    """
+    Allows retries up to ratio of calls (plus min_retries), over a window
+
+    Each call deposits ratio tokens and each retry withdraws one, so when
+    every call fails only about ratio extra calls per call are made.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.capacity = min_retries + 100 * ratio
+        self.tokens = float(min_retries)
+
+    def deposit(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class ResilientCaller:
+    """Runs LLM calls with timeouts, budgeted retries and a circuit breaker"""
+
+    def __init__(
+        self,
+        call_timeout_seconds: float = 30.0,
+        deadline_seconds: float = 60.0,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[RetryBudget] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.call_timeout_seconds = call_timeout_seconds
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.budget = budget or RetryBudget()
+        self.clock = clock
+
+    @classmethod
+    def from_env(cls) -> "ResilientCaller":
+        """Build a caller from LLM_* timeout, retry and breaker settings"""
+        return cls(
+            call_timeout_seconds=float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", 30)),
+            deadline_seconds=float(os.getenv("LLM_DEADLINE_SECONDS", 60)),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 2)),
+            backoff_base_seconds=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 0.5)),
+            backoff_max_seconds=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 8)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", 5)),
+                reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30)),
+            ),
+            budget=RetryBudget(ratio=float(os.getenv("LLM_RETRY_BUDGET_RATIO", 0.2))),
+        )
+
+    async def call(
+        self, make_call: Callable[[], Awaitable[T]], retry: bool = True
+    ) -> T:
+        """
+        Run an LLM call
+
+        Args:
+            make_call: Starts one attempt of the call
+            retry: Retry retryable failures (callers with their own retry
+                loop, like batch processing, pass False)
+
+        Raises:
+            CircuitOpenError: The circuit is open; nothing was sent
+            asyncio.TimeoutError: The last attempt timed out
+        """
+        self._check_circuit()
+        self.budget.deposit()
+        deadline = self.clock() + self.deadline_seconds
+        attempt = 0
+        while True:
+            timeout = min(self.call_timeout_seconds, deadline - self.clock())
+            try:
+                result = await asyncio.wait_for(make_call(), max(timeout, 0))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    llm_timeouts.inc()
+                self._record(e)
+                if not retry or not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt + 1, retry_after_seconds(e))
+                if self.clock() + delay >= deadline or not self.breaker.allow():
+                    raise
+                if not self.budget.withdraw():
+                    llm_retry_budget_exhausted.inc()
+                    raise
+                attempt += 1
+                llm_retries.inc(error=type(e).__name__)
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    @asynccontextmanager
+    async def guarded(self) -> AsyncIterator[None]:
+        """
+        Breaker check and outcome for a call that can't be retried or timed out
+        as a whole, such as a stream whose items were already sent
+        """
+        self._check_circuit()
+        try:
+            yield
+        except Exception as e:
+            self._record(e)
+            raise
+        self.breaker.record_success()
+
+    def _check_circuit(self) -> None:
+        if not self.breaker.allow():
+            circuit_rejections.inc()
+            raise CircuitOpenError("LLM provider circuit is open")
+
+    def _record(self, error: BaseException) -> None:
+        # Anything but a provider failure means the provider answered
+        if is_provider_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Retry-After if given, else full-jitter exponential backoff"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max_seconds)
+        ceiling = min(
+            self.backoff_base_seconds * 2 ** (attempt - 1), self.backoff_max_seconds
+        )
+        return random.uniform(0, ceiling)
@@ -1,19 +1,35 @@
+from functools import lru_cache
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import UserLoginRequest, UserResponse
 from app.access import user_access
+from app.access.user_access import UserCache
 from app.database import get_db
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
+@lru_cache
+def get_user_cache() -> Optional[UserCache]:
+    """The process-wide user cache (None if USER_CACHE_ENABLED=false)"""
+    return user_access.user_cache_from_env()
+
+
 @router.post("/login", response_model=UserResponse)
-async def login(request: UserLoginRequest, db: Session = Depends(get_db)):
+async def login(
+    request: UserLoginRequest,
+    db: AsyncSession = Depends(get_db),
+    user_cache: Optional[UserCache] = Depends(get_user_cache),
+):
     """Simple email-based login - creates user if doesn't exist"""
     try:
-        user = user_access.get_or_create_user(session=db, email=request.email)
-        db.commit()
+        user = await user_access.get_or_create_user(
+            session=db, email=request.email, cache=user_cache
+        )
+        await db.commit()
         return user
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
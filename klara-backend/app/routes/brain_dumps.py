@@ -1,112 +1,404 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
-from typing import Union, List
-from sqlalchemy.orm import Session
+import json
+import math
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    Union,
+)
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import (
     BrainDumpRequest,
     BrainDumpResponse,
+    BrainDumpBatchRequest,
+    BrainDumpBatchResponse,
+    BrainDumpBatchItemResult,
+    BrainDumpJobResponse,
+    ProcessedBrainDump,
 )
-from app.access import task_access, shopping_item_access, calendar_event_access
+from app.access import brain_dump_access, idempotency_access, raw_input_access
 from app.database import get_db
+from app.admission import AdmissionController, AdmissionRejected
 from app.ai_service import AIService
+from app.brain_dump_batch import BrainDumpBatchProcessor
+from app.brain_dump_jobs import BrainDumpJobQueue, CallbackURLNotAllowedError
+from app.llm_cache import normalize_text
+from app.single_flight import SingleFlight
 
 router = APIRouter(prefix="/brain-dumps", tags=["brain-dumps"])
 
-# Initialize AI service
-ai_service = AIService()
 
+@lru_cache
+def get_ai_service() -> AIService:
+    """The process-wide AIService, created on first use"""
+    return AIService()
 
-@router.post("/", response_model=BrainDumpResponse)
-async def process_brain_dump(request: BrainDumpRequest, db: Session = Depends(get_db)):
-    """Process a brain dump using AI and save all extracted items to database"""
-    try:
-        # Process the brain dump with AI
-        processed = await ai_service.process_brain_dump(request.text)
 
-        # Save all tasks
-        saved_tasks = []
-        for task in processed.tasks:
-            # Create the parent task
-            saved_task = task_access.create_task(
-                session=db,
+@lru_cache
+def get_admission_controller() -> Optional[AdmissionController]:
+    """The process-wide admission controller (None if ADMISSION_ENABLED=false)"""
+    return AdmissionController.from_env()
+
+
+@lru_cache
+def batch_processor_for(ai_service: AIService) -> BrainDumpBatchProcessor:
+    # One processor (and so one concurrency limit) per AIService
+    return BrainDumpBatchProcessor.from_env(ai_service)
+
+
+def get_batch_processor(
+    ai_service: AIService = Depends(get_ai_service),
+) -> BrainDumpBatchProcessor:
+    return batch_processor_for(ai_service)
+
+
+def get_job_queue(request: Request) -> BrainDumpJobQueue:
+    """The worker's job queue, started in the app's lifespan"""
+    return request.app.state.job_queue
+
+
+def get_sessions(request: Request) -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """Opens database sessions not tied to a request (set up in the app's lifespan)"""
+    return request.app.state.sessions
+
+
+# Concurrent identical brain dumps from the same user (double taps, client
+# retries) share one LLM call and one saved result. Each flight returns the
+# response and the idempotency key saved with it, if any.
+processing_flights: SingleFlight[Tuple[BrainDumpResponse, Optional[str]]] = (
+    SingleFlight("brain_dump")
+)
+
+# Event type and per-item persistence function for each streamed category
+STREAM_EVENT_TYPES = {
+    "tasks": "task",
+    "shopping_items": "shopping_item",
+    "calendar_events": "calendar_event",
+}
+STREAM_SAVERS: Dict[str, Callable[..., Awaitable[BaseModel]]] = {
+    "tasks": brain_dump_access.save_processed_task,
+    "shopping_items": brain_dump_access.save_processed_shopping_item,
+    "calendar_events": brain_dump_access.save_processed_calendar_event,
+}
+
+
+@router.post(
+    "/",
+    response_model=BrainDumpResponse,
+    responses={202: {"model": BrainDumpJobResponse}},
+)
+async def process_brain_dump(
+    request: BrainDumpRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    prefer: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
+    job_queue: BrainDumpJobQueue = Depends(get_job_queue),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+    sessions: Callable[[], AsyncContextManager[AsyncSession]] = Depends(get_sessions),
+):
+    """
+    Process a brain dump using AI and save all extracted items to database
+
+    An identical brain dump from the same user that is already being
+    processed is not processed or saved again; both get the same response.
+
+    With an Idempotency-Key header, a retry with the same key returns the
+    saved response (or, for a queued brain dump, its job) instead of
+    processing the brain dump again.
+
+    With `Prefer: respond-async` the brain dump is queued instead: the
+    response is 202 with the job, whose status and result are at the URL in
+    the Location header (and are POSTed to callback_url when finished). A
+    callback_url whose host is not in JOB_CALLBACK_ALLOWED_HOSTS gets 422.
+
+    Over the user's or the global LLM rate limit the response is 429 with
+    Retry-After.
+    """
+    if idempotency_key:
+        stored = await stored_response(db, request, idempotency_key, job_queue)
+        if stored is not None:
+            return stored
+        # Commit the deletion of an expired key before the key is saved again
+        # in another session
+        await db.commit()
+
+    await admit(admission, request)
+
+    if prefer is not None and "respond-async" in prefer.lower():
+        try:
+            job = await job_queue.submit(
                 user_id=request.user_id,
-                description=task.description,
-                due_date=datetime.strptime(task.due_date, "%Y-%m-%d").date()
-                if task.due_date
+                text=request.text,
+                priority=request.priority,
+                callback_url=str(request.callback_url)
+                if request.callback_url
                 else None,
-                estimated_time_minutes=task.estimated_time_minutes,
+            )
+        except CallbackURLNotAllowedError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if idempotency_key:
+            idempotency_access.store_response(
+                db, request.user_id, idempotency_key, request.text, job
+            )
+            try:
+                await db.commit()
+            except IntegrityError as e:
+                await db.rollback()
+                # A concurrent request with the same key was stored first;
+                # its response is returned (this job still runs)
+                stored = await stored_response(db, request, idempotency_key, job_queue)
+                if stored is None:
+                    raise HTTPException(
+                        status_code=500, detail=f"Queueing failed: {str(e)}"
+                    )
+                return stored
+        return job_accepted(job)
+
+    async def process_and_save() -> Tuple[BrainDumpResponse, Optional[str]]:
+        processed = await ai_service.process_brain_dump(request.text)
+
+        # The flight outlives this request if it is cancelled, so it saves
+        # in a session of its own
+        async with sessions() as session:
+            # Save all tasks, subtasks, shopping items and calendar events in bulk
+            response = await brain_dump_access.save_processed_brain_dump(
+                session=session,
+                user_id=request.user_id,
                 raw_input=request.text,
+                processed=processed,
             )
+            if idempotency_key:
+                idempotency_access.store_response(
+                    session, request.user_id, idempotency_key, request.text, response
+                )
+            await session.commit()
+        return response, idempotency_key
+
+    try:
+        # Share processing and saving with an identical request in flight
+        response, saved_key = await processing_flights.do(
+            (request.user_id, normalize_text(request.text)), process_and_save
+        )
+
+        # This request joined one with another key; remember its own too
+        if idempotency_key and idempotency_key != saved_key:
+            idempotency_access.store_response(
+                db, request.user_id, idempotency_key, request.text, response
+            )
+            await db.commit()
+
+        return response
+
+    except IntegrityError as e:
+        await db.rollback()
+        # A concurrent request with the same key committed first; its items
+        # are the ones kept
+        stored = None
+        if idempotency_key:
+            stored = await stored_response(db, request, idempotency_key, job_queue)
+        if stored is None:
+            raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+        return stored
 
-            # If task was decomposed, create subtasks
-            if task.should_decompose and task.subtasks:
-                subtasks_data = [
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=BrainDumpJobResponse)
+async def get_brain_dump_job(
+    job_id: int,
+    user_id: int,
+    job_queue: BrainDumpJobQueue = Depends(get_job_queue),
+):
+    """Status of a brain dump queued with Prefer: respond-async, and its result once done"""
+    job = await job_queue.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/stream")
+async def stream_brain_dump(
+    request: BrainDumpRequest,
+    persist: bool = True,
+    db: AsyncSession = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+):
+    """
+    Process a brain dump, streaming each item as NDJSON as soon as it is extracted
+
+    Every line is a JSON object with a "type" of "task", "shopping_item",
+    "calendar_event", "done" or "error". With persist=true (the default) each
+    item is saved and committed before it is sent, so it carries its database
+    fields; otherwise the raw AI-processed item is sent.
+    """
+    await admit(admission, request)
+
+    async def events():
+        counts = {category: 0 for category in STREAM_EVENT_TYPES}
+        brain_dump: Optional[brain_dump_access.StoredBrainDump] = None
+        try:
+            async for category, item in ai_service.stream_brain_dump(request.text):
+                data: BaseModel = item
+                if persist:
+                    # The text is stored with the first item, once
+                    if brain_dump is None:
+                        brain_dump = brain_dump_access.StoredBrainDump(
+                            await raw_input_access.create_brain_dump(
+                                db, request.user_id, request.text, "stream"
+                            ),
+                            request.text,
+                        )
+                    data = await STREAM_SAVERS[category](
+                        db, request.user_id, brain_dump, item
+                    )
+                    await db.commit()
+                counts[category] += 1
+                yield ndjson_line(
                     {
-                        "description": subtask.description,
-                        "order": subtask.order,
-                        "estimated_time_minutes": subtask.estimated_time_minutes,
-                        "due_date": datetime.strptime(
-                            subtask.due_date, "%Y-%m-%d"
-                        ).date()
-                        if subtask.due_date
-                        else None,
+                        "type": STREAM_EVENT_TYPES[category],
+                        "data": data.model_dump(mode="json"),
                     }
-                    for subtask in task.subtasks
-                ]
-                subtask_responses = task_access.create_subtasks(
-                    session=db,
-                    parent_task_id=saved_task.id,
-                    subtasks=subtasks_data,
                 )
-                # Update task with subtasks
-                saved_task.subtasks = subtask_responses
+            yield ndjson_line(
+                {
+                    "type": "done",
+                    "counts": counts,
+                    "brain_dump_id": brain_dump.id if brain_dump else None,
+                }
+            )
+        except Exception as e:
+            await db.rollback()
+            yield ndjson_line({"type": "error", "detail": f"Processing failed: {e}"})
 
-            saved_tasks.append(saved_task)
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
-        # Save all shopping items
-        saved_shopping_items = []
-        for item in processed.shopping_items:
-            saved_item = shopping_item_access.create_shopping_item(
-                session=db,
-                user_id=request.user_id,
-                description=item.description,
-                raw_input=request.text,
+
+@router.post("/batch", response_model=BrainDumpBatchResponse)
+async def process_brain_dump_batch(
+    request: BrainDumpBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    batch_processor: BrainDumpBatchProcessor = Depends(get_batch_processor),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+):
+    """
+    Process many brain dumps concurrently and save all results in one bulk write
+
+    Each brain dump gets its own result or error; a failed LLM call does not
+    fail the rest of the batch.
+
+    The whole batch is charged to the LLM rate limits up front: if it doesn't
+    fit, the response is 429 with Retry-After and nothing is processed.
+    """
+    if admission is not None:
+        try:
+            await admission.admit_batch(
+                [(item.user_id, item.text) for item in request.items]
             )
-            saved_shopping_items.append(saved_item)
-
-        # Save all calendar events
-        saved_calendar_events = []
-        for event in processed.calendar_events:
-            # Convert event_date string to date object
-            event_date_obj = datetime.strptime(event.event_date, "%Y-%m-%d").date()
-
-            # Convert event_time string to time object if provided
-            event_time_obj = None
-            if event.event_time:
-                # Handle both HH:MM and HH:MM:SS formats
-                time_format = (
-                    "%H:%M:%S" if event.event_time.count(":") == 2 else "%H:%M"
-                )
-                event_time_obj = datetime.strptime(event.event_time, time_format).time()
+        except AdmissionRejected as e:
+            raise rate_limited(e)
 
-            saved_event = calendar_event_access.create_calendar_event(
-                session=db,
-                user_id=request.user_id,
-                description=event.description,
-                event_date=event_date_obj,
-                event_time=event_time_obj,
-                raw_input=request.text,
+    outcomes = await batch_processor.process(
+        [item.text for item in request.items],
+        max_concurrency=request.max_concurrency,
+    )
+
+    results = [BrainDumpBatchItemResult(index=index) for index in range(len(outcomes))]
+    to_save = []
+    for index, (item, outcome) in enumerate(zip(request.items, outcomes)):
+        if isinstance(outcome, ProcessedBrainDump):
+            to_save.append(
+                (
+                    index,
+                    brain_dump_access.BrainDumpToSave(item.user_id, item.text, outcome),
+                )
             )
-            saved_calendar_events.append(saved_event)
+        else:
+            results[index].error = f"Processing failed: {outcome}"
+
+    try:
+        saved = await brain_dump_access.save_processed_brain_dumps(
+            session=db, dumps=[dump for _, dump in to_save]
+        )
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Saving batch failed: {str(e)}")
+
+    for (index, _), response in zip(to_save, saved):
+        results[index].result = response
+
+    return BrainDumpBatchResponse(results=results)
+
+
+async def admit(
+    admission: Optional[AdmissionController], request: BrainDumpRequest
+) -> None:
+    """Wait for the LLM rate limits to admit a brain dump; 429 if they won't"""
+    if admission is None:
+        return
+    try:
+        await admission.admit(request.user_id, request.text)
+    except AdmissionRejected as e:
+        raise rate_limited(e)
 
-        db.commit()
 
-        return BrainDumpResponse(
-            tasks=saved_tasks,
-            shopping_items=saved_shopping_items,
-            calendar_events=saved_calendar_events,
+def rate_limited(rejected: AdmissionRejected) -> HTTPException:
+    """429 with Retry-After for a request the rate limits rejected"""
+    return HTTPException(
+        status_code=429,
+        detail=str(rejected),
+        headers={"Retry-After": str(max(1, math.ceil(rejected.retry_after)))},
+    )
+
+
+def job_accepted(job: BrainDumpJobResponse) -> JSONResponse:
+    """202 with the job of a brain dump queued with Prefer: respond-async"""
+    return JSONResponse(
+        status_code=202,
+        content=job.model_dump(mode="json"),
+        headers={
+            "Location": f"/brain-dumps/jobs/{job.id}",
+            "Preference-Applied": "respond-async",
+        },
+    )
+
+
+async def stored_response(
+    db: AsyncSession,
+    request: BrainDumpRequest,
+    idempotency_key: str,
+    job_queue: BrainDumpJobQueue,
+) -> Optional[Union[BrainDumpResponse, JSONResponse]]:
+    """
+    The saved response for an idempotency key; 422 if it was used for other text
+
+    A queued brain dump's key gives 202 with its job as it is now (or as it
+    was queued, if the job is no longer known).
+    """
+    try:
+        stored = await idempotency_access.get_response(
+            db, request.user_id, idempotency_key, request.text
         )
+    except idempotency_access.IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if isinstance(stored, BrainDumpJobResponse):
+        job = await job_queue.get(stored.id, request.user_id)
+        return job_accepted(job or stored)
+    return stored
 
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+def ndjson_line(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload) + "\n"
@@ -0,0 +1,40 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import CalendarEventPage
+from app.access import calendar_event_access
+from app.access.pagination import InvalidCursorError
+from app.database import get_db
+
+router = APIRouter(prefix="/calendar-events", tags=["calendar-events"])
+
+
+@router.get("/", response_model=CalendarEventPage)
+async def list_calendar_events(
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List a user's calendar events by date, earliest first
+
+    Pass the returned next_cursor as cursor to get the next page.
+    With include_raw_input=true each item carries the text of its brain dump.
+    """
+    try:
+        return await calendar_event_access.list_calendar_events(
+            session=db,
+            user_id=user_id,
+            date_from=date_from,
+            date_to=date_to,
+            limit=limit,
+            cursor=cursor,
+            include_raw_input=include_raw_input,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from app.server_timing import route_latencies
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/latency")
+def get_latency():
+    """
+    Recent latency percentiles (in ms) of each route, in total and per phase
+
+    Kept in memory per worker process over the last ROUTE_LATENCY_WINDOW
+    requests of each route.
+    """
+    return route_latencies.summary()
@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ShoppingItemPage
+from app.access import shopping_item_access
+from app.access.pagination import InvalidCursorError
+from app.database import get_db
+
+router = APIRouter(prefix="/shopping-items", tags=["shopping-items"])
+
+
+@router.get("/", response_model=ShoppingItemPage)
+async def list_shopping_items(
+    user_id: int,
+    completed: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List a user's shopping items, newest first
+
+    Pass the returned next_cursor as cursor to get the next page.
+    With include_raw_input=true each item carries the text of its brain dump.
+    """
+    try:
+        return await shopping_item_access.list_shopping_items(
+            session=db,
+            user_id=user_id,
+            completed=completed,
+            limit=limit,
+            cursor=cursor,
+            include_raw_input=include_raw_input,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,42 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import TaskPage
+from app.access import task_access
+from app.access.pagination import InvalidCursorError
+from app.database import get_db
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+
+@router.get("/", response_model=TaskPage)
+async def list_tasks(
+    user_id: int,
+    completed: Optional[bool] = None,
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_raw_input: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List a user's tasks, newest first (or by due date when filtering on it)
+
+    Pass the returned next_cursor as cursor to get the next page.
+    With include_raw_input=true each item carries the text of its brain dump.
+    """
+    try:
+        return await task_access.list_tasks(
+            session=db,
+            user_id=user_id,
+            completed=completed,
+            due_from=due_from,
+            due_to=due_to,
+            limit=limit,
+            cursor=cursor,
+            include_raw_input=include_raw_input,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
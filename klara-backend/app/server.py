@@ -0,0 +1,55 @@
+"""
+Production server: uvicorn with several worker processes
+
+Each worker is a separate process with its own event loop, DB pool and LLM
+client, so throughput scales with cores. uvloop and httptools are used when
+installed (see requirements.txt), the asyncio loop and h11 otherwise.
+
+On SIGTERM the server stops accepting connections and lets in-flight
+requests finish for up to GRACEFUL_SHUTDOWN_SECONDS; the app's lifespan then
+waits for LLM calls still running before closing the DB pool.
+
+Usage:
+    python -m app.server
+    WEB_CONCURRENCY=4 PORT=8080 python -m app.server
+"""
+
+import os
+from typing import Any, Dict
+
+import uvicorn
+
+
+def server_options_from_env() -> Dict[str, Any]:
+    """uvicorn.run arguments from the server settings"""
+    return {
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", 8000)),
+        # One worker per core; requests mostly wait on the LLM, so a worker
+        # handles many at once and more workers than cores only adds memory
+        "workers": int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # uvloop and httptools if installed
+        "loop": "auto",
+        "http": "auto",
+        # Keep idle connections open longer than the load balancer does, so
+        # it never sends a request on a connection we are closing
+        "timeout_keep_alive": int(os.getenv("KEEPALIVE_SECONDS", 75)),
+        # Connections the kernel queues while every worker is busy
+        "backlog": int(os.getenv("BACKLOG", 2048)),
+        # How long in-flight requests may run after SIGTERM
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", 30)),
+        # Trust X-Forwarded-* only from the proxy in front of us
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        "access_log": os.getenv("ACCESS_LOG", "false").lower()
+        not in ("0", "false", "no"),
+    }
+
+
+def main() -> None:
+    # APP_MODULE lets benchmarks serve the app with a fake LLM
+    uvicorn.run(os.getenv("APP_MODULE", "app.main:app"), **server_options_from_env())
+
+
+if __name__ == "__main__":
+    main()
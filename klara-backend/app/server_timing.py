@@ -0,0 +1,180 @@
+"""
+Always-on per-request phase timing
+
+ServerTimingMiddleware measures every HTTP request. Code called from the
+request adds the time it spends in a phase with `timed(phase)`: the LLM call
+and parsing in AIService, and (through engine events and TracedSession) SQL
+statements and commits as "db". The response gets a Server-Timing header
+with each phase and the total, so the breakdown shows up in the browser's
+devtools, and one structured "request" log line is written per request.
+Recent latencies per route and phase are kept for GET /debug/latency.
+
+Unlike tracing, this costs a few perf_counter() calls per phase and is
+always on.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+
+from app.http_metrics import route_template
+from app.model_routing import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Percentiles reported by GET /debug/latency
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class PhaseTimings:
+    """Seconds a request spent in each phase so far"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def header(self, total_seconds: float) -> str:
+        """Server-Timing header value: each phase and the total, in ms"""
+        phases = {**self.phases, "total": total_seconds}
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in phases.items()
+        )
+
+
+# Timings of the request being handled
+request_timings: ContextVar[Optional[PhaseTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the time the block takes to the current request's phase"""
+    timings = request_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+class RouteLatencies:
+    """The most recent latencies of each route, in total and per phase"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._windows: Dict[str, Dict[str, LatencyWindow]] = {}
+
+    def add(self, route: str, phases: Dict[str, float]) -> None:
+        windows = self._windows.setdefault(route, {})
+        for phase, seconds in phases.items():
+            windows.setdefault(phase, LatencyWindow(self.window)).add(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """For each route and phase: sample count and percentiles in ms"""
+        summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for route, windows in sorted(self._windows.items()):
+            summary[route] = {}
+            for phase, window in windows.items():
+                stats: Dict[str, float] = {"count": len(window)}
+                for quantile in QUANTILES:
+                    seconds = window.percentile(quantile)
+                    if seconds is not None:
+                        stats[f"p{round(quantile * 100)}_ms"] = round(seconds * 1000, 1)
+                summary[route][phase] = stats
+        return summary
+
+
+route_latencies = RouteLatencies(int(os.getenv("ROUTE_LATENCY_WINDOW", 1000)))
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header and a log line to each request
+
+    The header's total is the time until the response headers are sent; the
+    logged total (and the percentiles) also include sending the body, which
+    for streams is most of the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = PhaseTimings()
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.header(time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode()),
+                        # Lets a frontend on another origin see the timings
+                        (b"timing-allow-origin", b"*"),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            total = time.perf_counter() - started
+            route = f"{scope['method']} {route_template(scope)}"
+            route_latencies.add(route, {"total": total, **timings.phases})
+            logger.info(
+                "request",
+                extra={
+                    "route": route,
+                    "status": status,
+                    "total_ms": round(total * 1000, 1),
+                    **{
+                        f"{phase}_ms": round(seconds * 1000, 1)
+                        for phase, seconds in timings.phases.items()
+                    },
+                },
+            )
+
+
+def instrument_engine(sync_engine) -> None:
+    """Add the time of every SQL statement run on the engine to the "db" phase"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        timings = request_timings.get()
+        if timings is not None:
+            timings.add("db", time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def fail_statement(exception_context):
+        if exception_context.connection is None:
+            return
+        started = exception_context.connection.info.get("statement_started")
+        if started:
+            started.pop()
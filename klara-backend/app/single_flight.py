@@ -0,0 +1,52 @@
+"""
+Request coalescing: concurrent identical calls share one execution
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from app.metrics import registry
+
+T = TypeVar("T")
+
+coalesced_calls = registry.counter(
+    "single_flight_coalesced_total",
+    "Calls that waited for an identical call already in flight instead of running",
+    ("name",),
+)
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs at most one call per key at a time
+
+    A caller that arrives while a call with the same key is running awaits
+    that call's result (or exception) instead of starting another. The call
+    runs as its own task, so a caller that is cancelled (e.g. the client
+    disconnected) does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Args:
+            key: Identifies equivalent calls
+            call: Starts the call; only invoked if none with this key is running
+
+        Returns:
+            The result of the call in flight for this key
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            coalesced_calls.inc(name=self.name)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
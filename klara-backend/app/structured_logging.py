@@ -0,0 +1,67 @@
+"""
+Structured logging: one JSON object per line, with the fields of each record
+
+Fields are passed as `extra`, e.g.
+
+    logger.info("llm_call", extra={"model": model, "latency_ms": 812})
+
+and become keys of the JSON line next to time, level, logger and message.
+LOG_FORMAT=text logs them as key=value pairs instead, for reading locally.
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+# Attributes every LogRecord has; anything else came from `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    """The `extra` fields of a log record"""
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in RECORD_ATTRIBUTES and not key.startswith("_")
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in record_fields(record).items()
+        )
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging() -> None:
+    """Send app logs to stderr as configured by LOG_LEVEL and LOG_FORMAT"""
+    handler = logging.StreamHandler(sys.stderr)
+    log_format = os.getenv("LOG_FORMAT", "json")
+    if log_format not in ("json", "text"):
+        raise ValueError(f"Unknown LOG_FORMAT: {log_format}")
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    logger = logging.getLogger("app")
+    logger.handlers = [handler]
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
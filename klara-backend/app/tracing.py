@@ -0,0 +1,474 @@
+"""
+Request tracing: OpenTelemetry-compatible spans for each phase of a request
+
+TracingMiddleware starts a trace for every HTTP request, and background jobs
+start one per job. Code running within a trace opens child spans with
+`tracer.span(name)`: prompt build, LLM calls, parsing and brain dump
+persistence. Engine events add a span for every SQL statement, and
+TracedSession one for every commit.
+
+A finished trace is kept when it was sampled (TRACE_SAMPLE_RATIO, or a
+sampled `traceparent` header) or when the request took at least
+TRACE_SLOW_SECONDS, so every slow request can be looked at. Kept traces are
+appended to TRACE_FILE as OTLP JSON, one trace per line: the format the
+OpenTelemetry Collector's file exporter writes and its otlpjsonfile receiver
+reads, so the file can be shipped to Jaeger, Tempo etc. as is.
+
+    python -m app.tracing                # slowest traces in TRACE_FILE
+    python -m app.tracing TRACE_ID       # one trace as a tree of spans
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol
+
+from sqlalchemy import event
+
+from app.http_metrics import route_template
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status code of a failed span
+STATUS_CODE_ERROR = 2
+
+# SQL longer than this is cut off in db.query.text
+MAX_STATEMENT_CHARS = 2000
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_id: Optional[str],
+        kind: int,
+        attributes: Dict[str, Any],
+    ):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.spans.append(self)
+
+    @property
+    def duration_seconds(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+class Trace:
+    """The spans of one request (or job), collected until it finishes"""
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List[Span] = []
+
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    """An attribute value in OTLP JSON encoding"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_trace(trace: Trace, service_name: str) -> Dict[str, Any]:
+    """A finished trace as an OTLP JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": otlp_value(service_name)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [span.to_otlp() for span in trace.spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """Trace ID, parent span ID and sampled flag of a W3C traceparent header"""
+    match = TRACEPARENT.match((header or "").strip())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Exporter(Protocol):
+    def export(self, trace: Trace) -> None: ...
+
+
+class JsonlExporter:
+    """Appends each kept trace to a file as one OTLP JSON line"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        # Traces may finish on several threads, e.g. TestClient's event loop
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        # Kept traces are few (sampled or slow), so a blocking append is fine
+        line = json.dumps(otlp_trace(trace, self.service_name))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+# The span that new spans are children of
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Starts traces and spans, and exports the traces worth keeping"""
+
+    def __init__(
+        self,
+        exporter: Optional[Exporter] = None,
+        sample_ratio: float = 0.01,
+        slow_seconds: float = 2.0,
+        random_fn: Callable[[], float] = random.random,
+    ):
+        """
+        Args:
+            exporter: Where kept traces go; None disables tracing
+            sample_ratio: Share of traces kept regardless of their duration
+            slow_seconds: Traces at least this long are always kept
+            random_fn: Source of the sampling decision (for tests)
+        """
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.slow_seconds = slow_seconds
+        self.random_fn = random_fn
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        exporter = None
+        if os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes"):
+            exporter = JsonlExporter(
+                os.getenv("TRACE_FILE", "traces.jsonl"),
+                os.getenv("OTEL_SERVICE_NAME", "klara-backend"),
+            )
+        return cls(
+            exporter=exporter,
+            sample_ratio=float(os.getenv("TRACE_SAMPLE_RATIO", 0.01)),
+            slow_seconds=float(os.getenv("TRACE_SLOW_SECONDS", 2.0)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def start_trace(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        traceparent: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Optional[Span]]:
+        """
+        Run the block as the root span of a new trace
+
+        Args:
+            name: Name of the root span
+            kind: OTLP span kind of the root span
+            traceparent: W3C traceparent header of the caller, to continue
+                its trace
+            attributes: Attributes of the root span
+
+        Yields:
+            The root span, or None if tracing is disabled
+        """
+        if self.exporter is None:
+            yield None
+            return
+
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = self.random_fn() < self.sample_ratio
+        trace = Trace(trace_id, sampled)
+        root = Span(trace, name, parent_id, kind, dict(attributes or {}))
+        token = current_span.set(root)
+        try:
+            yield root
+        except Exception as e:
+            root.end(error=e)
+            raise
+        finally:
+            current_span.reset(token)
+            root.end()
+            if trace.sampled or root.duration_seconds >= self.slow_seconds:
+                self.exporter.export(trace)
+
+    def start_span(
+        self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any
+    ) -> Optional[Span]:
+        """
+        A child of the current span, which the caller must end()
+
+        Unlike span(), it does not become the current span, e.g. for an
+        operation spanning the yields of an async generator. None outside a
+        trace.
+        """
+        parent = current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+    @contextmanager
+    def span(
+        self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any
+    ) -> Iterator[Optional[Span]]:
+        """Run the block as a child span of the current span (None outside a trace)"""
+        span = self.start_span(name, kind, **attributes)
+        if span is None:
+            yield None
+            return
+        token = current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.end(error=e)
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+
+
+tracer = Tracer.from_env()
+
+
+class TracingMiddleware:
+    """ASGI middleware running each HTTP request as the root span of a trace"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        with tracer.start_trace(
+            scope["method"],
+            kind=SPAN_KIND_SERVER,
+            traceparent=traceparent,
+            attributes={
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+            },
+        ) as root:
+            assert root is not None
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    root.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        root.error = f"HTTP {status}"
+                    # Lets a client that saw a slow response find its trace
+                    trace_id = root.trace.trace_id.encode()
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"x-trace-id", trace_id),
+                        ],
+                    }
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = route_template(scope)
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.route", route)
+
+
+def instrument_engine(sync_engine) -> None:
+    """Add a span for every SQL statement run on the engine"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        # Parameters are not recorded: they hold users' brain dumps
+        span = tracer.start_span(
+            statement.split(None, 1)[0].upper() if statement else "SQL",
+            kind=SPAN_KIND_CLIENT,
+            **{
+                "db.system.name": conn.dialect.name,
+                "db.query.text": statement[:MAX_STATEMENT_CHARS],
+                "db.operation.batch.size": len(parameters) if executemany else None,
+            },
+        )
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["trace_spans"].pop()
+        if span is not None:
+            span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def fail_statement(exception_context):
+        if exception_context.connection is None:
+            return
+        spans = exception_context.connection.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.end(error=exception_context.original_exception)
+
+
+def load_traces(path: str) -> List[Dict[str, Any]]:
+    """The spans of each trace in an OTLP JSON lines file"""
+    traces = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            spans = [
+                span
+                for resource in json.loads(line)["resourceSpans"]
+                for scope in resource["scopeSpans"]
+                for span in scope["spans"]
+            ]
+            if spans:
+                traces.append({"trace_id": spans[0]["traceId"], "spans": spans})
+    return traces
+
+
+def span_ms(span: Dict[str, Any]) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def trace_root(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    span_ids = {span["spanId"] for span in spans}
+    roots = [span for span in spans if span.get("parentSpanId") not in span_ids]
+    return min(roots, key=lambda span: int(span["startTimeUnixNano"]))
+
+
+def format_tree(spans: List[Dict[str, Any]]) -> List[str]:
+    """A trace's spans as indented lines: start offset, duration and name"""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        children.setdefault(span.get("parentSpanId"), []).append(span)
+    root = trace_root(spans)
+    trace_start = int(root["startTimeUnixNano"])
+    lines: List[str] = []
+
+    def add(span: Dict[str, Any], depth: int) -> None:
+        offset_ms = (int(span["startTimeUnixNano"]) - trace_start) / 1e6
+        status = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+        lines.append(
+            f"{offset_ms:9.1f} {span_ms(span):9.1f} ms  "
+            f"{'  ' * depth}{span['name']}{status}"
+        )
+        for child in sorted(
+            children.get(span["spanId"], []),
+            key=lambda child: int(child["startTimeUnixNano"]),
+        ):
+            add(child, depth + 1)
+
+    add(root, 0)
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Show the slowest traces in a trace file, or one trace as a tree"
+    )
+    parser.add_argument("trace_id", nargs="?", help="Trace to show")
+    parser.add_argument("--file", default=os.getenv("TRACE_FILE", "traces.jsonl"))
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    traces = load_traces(args.file)
+    if args.trace_id:
+        spans = [
+            span
+            for trace in traces
+            if trace["trace_id"] == args.trace_id
+            for span in trace["spans"]
+        ]
+        if not spans:
+            parser.exit(1, f"Trace {args.trace_id} not found in {args.file}\n")
+        print("    start  duration")
+        print("\n".join(format_tree(spans)))
+        return
+
+    roots = sorted(
+        (trace_root(trace["spans"]) for trace in traces), key=span_ms, reverse=True
+    )
+    for root in roots[: args.limit]:
+        print(f"{span_ms(root):9.1f} ms  {root['traceId']}  {root['name']}")
+
+
+if __name__ == "__main__":
+    main()
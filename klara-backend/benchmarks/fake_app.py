@@ -0,0 +1,26 @@
+"""
+The API with AIService backed by the fake LLM, for load testing real servers
+
+Configured with FAKE_LLM_LATENCY_MS (500), FAKE_LLM_ITEMS (6) and
+FAKE_LLM_FAILURE_RATE (0); no Anthropic credentials are needed.
+
+Usage:
+    WEB_CONCURRENCY=4 APP_MODULE=benchmarks.fake_app:app python -m app.server
+    python -m benchmarks.load_test --url http://localhost:8000
+"""
+
+import os
+
+from app.ai_service import AIService
+from app.main import app
+from app.routes.brain_dumps import get_ai_service
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+ai_service = AIService(
+    llm=FakeBrainDumpLLM(
+        latency_seconds=float(os.getenv("FAKE_LLM_LATENCY_MS", 500)) / 1000,
+        items=int(os.getenv("FAKE_LLM_ITEMS", 6)),
+        failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", 0)),
+    )
+)
+app.dependency_overrides[get_ai_service] = lambda: ai_service
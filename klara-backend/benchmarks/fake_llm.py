@@ -0,0 +1,177 @@
+"""
+Fake chat model standing in for ChatAnthropic in benchmarks
+
+Replies with a canned ProcessedBrainDump after a configurable latency, as a
+forced tool call when tools are bound (LLM_EXTRACTION_MODE=tool) or as JSON
+text otherwise, and fails a configurable share of calls with a provider
+error. Streaming splits the reply into chunks spread over the latency.
+
+Usage:
+    from app.ai_service import AIService
+    from benchmarks.fake_llm import FakeBrainDumpLLM
+
+    ai_service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0.8, items=9))
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import anthropic
+import httpx
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from benchmarks.persistence_round_trips import build_brain_dump
+
+FAKE_REQUEST = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+
+
+class FakeBrainDumpLLM(BaseChatModel):
+    """Chat model with configurable latency, output size and failure rate"""
+
+    model: str = "fake-brain-dump"
+    # Seconds before the reply (spread across chunks when streaming)
+    latency_seconds: float = 0.5
+    # Items in the reply, split across tasks, shopping items and events
+    items: int = 6
+    # Share of calls (0-1) that fail with an overloaded (529) error
+    failure_rate: float = 0.0
+    stream_chunks: int = 8
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+    _calls: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-brain-dump"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(
+            tools=[convert_to_openai_tool(tool) for tool in tools],
+            tool_choice=tool_choice,
+            **kwargs,
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._reply(messages, kwargs))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency_seconds)
+        return ChatResult(
+            generations=[ChatGeneration(message=self._reply(messages, kwargs))]
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        for chunk in self._chunks(self._reply(messages, kwargs)):
+            time.sleep(self.latency_seconds / self.stream_chunks)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks(self._reply(messages, kwargs)):
+            await asyncio.sleep(self.latency_seconds / self.stream_chunks)
+            yield chunk
+
+    def _reply(self, messages: List[BaseMessage], kwargs: dict) -> AIMessage:
+        """The canned reply, or a provider error for `failure_rate` of calls"""
+        self._calls += 1
+        if self._random.random() < self.failure_rate:
+            raise anthropic.InternalServerError(
+                "Overloaded",
+                response=httpx.Response(529, request=FAKE_REQUEST),
+                body=None,
+            )
+
+        payload = build_brain_dump(self.items).model_dump(mode="json")
+        serialized = json.dumps(payload)
+        usage = {
+            # Rough token counts (~4 characters per token)
+            "input_tokens": sum(len(str(m.content)) for m in messages) // 4,
+            "output_tokens": len(serialized) // 4,
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+
+        if not kwargs.get("tools"):
+            return AIMessage(content=serialized, usage_metadata=usage)
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": kwargs["tools"][0]["function"]["name"],
+                    "args": payload,
+                    "id": f"toolu_fake_{self._calls}",
+                }
+            ],
+            usage_metadata=usage,
+        )
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """Split a reply into stream chunks; usage is sent with the last one"""
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            text = json.dumps(call["args"])
+        else:
+            text = str(message.content)
+        size = max(1, -(-len(text) // self.stream_chunks))
+        pieces = [text[i : i + size] for i in range(0, len(text), size)]
+
+        for position, piece in enumerate(pieces):
+            last = position == len(pieces) - 1
+            usage = message.usage_metadata if last else None
+            if message.tool_calls:
+                chunk = AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"] if position == 0 else None,
+                            "args": piece,
+                            "id": call["id"] if position == 0 else None,
+                            "index": 0,
+                        }
+                    ],
+                    usage_metadata=usage,
+                )
+            else:
+                chunk = AIMessageChunk(content=piece, usage_metadata=usage)
+            yield ChatGenerationChunk(message=chunk)
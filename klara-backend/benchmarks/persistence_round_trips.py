@@ -0,0 +1,178 @@
+"""
+Benchmark: DB round trips needed to persist one processed brain dump
+
+Compares the per-item access functions (one flush per row) with the bulk
+persistence stage in app/access/brain_dump_access.py.
+
+Usage:
+    python -m benchmarks.persistence_round_trips
+    python -m benchmarks.persistence_round_trips --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db_models import Base, User
+from app.access import (
+    brain_dump_access,
+    task_access,
+    shopping_item_access,
+    calendar_event_access,
+    raw_input_access,
+)
+from app.models import (
+    ProcessedBrainDump,
+    ProcessedTask,
+    ProcessedShoppingItem,
+    ProcessedCalendarEvent,
+    SubTask,
+)
+
+RAW_INPUT = "benchmark brain dump"
+
+
+def build_brain_dump(items: int) -> ProcessedBrainDump:
+    """Build a dump with `items` items split across the three categories"""
+    per_category = max(1, items // 3)
+    return ProcessedBrainDump(
+        tasks=[
+            ProcessedTask(
+                description=f"Task {i}",
+                due_date="2025-11-01",
+                estimated_time_minutes=30,
+                should_decompose=i % 2 == 0,
+                subtasks=[
+                    SubTask(description=f"Step {j}", order=j, estimated_time_minutes=10)
+                    for j in range(1, 4)
+                ]
+                if i % 2 == 0
+                else [],
+            )
+            for i in range(per_category)
+        ],
+        shopping_items=[
+            ProcessedShoppingItem(description=f"Item {i}") for i in range(per_category)
+        ],
+        calendar_events=[
+            ProcessedCalendarEvent(
+                description=f"Event {i}", event_date="2025-11-02", event_time="16:00"
+            )
+            for i in range(per_category)
+        ],
+    )
+
+
+async def save_per_item(session, user_id: int, processed: ProcessedBrainDump):
+    """The original route's persistence loop: one INSERT per item"""
+    brain_dump_id = await raw_input_access.create_brain_dump(
+        session, user_id, RAW_INPUT
+    )
+    for task in processed.tasks:
+        saved_task = await task_access.create_task(
+            session=session,
+            user_id=user_id,
+            description=task.description,
+            due_date=brain_dump_access.parse_date(task.due_date),
+            estimated_time_minutes=task.estimated_time_minutes,
+            brain_dump_id=brain_dump_id,
+        )
+        if task.should_decompose and task.subtasks:
+            await task_access.create_subtasks(
+                session=session,
+                parent_task_id=saved_task.id,
+                subtasks=[
+                    {
+                        "description": subtask.description,
+                        "order": subtask.order,
+                        "estimated_time_minutes": subtask.estimated_time_minutes,
+                        "due_date": brain_dump_access.parse_date(subtask.due_date),
+                    }
+                    for subtask in task.subtasks
+                ],
+            )
+    for item in processed.shopping_items:
+        await shopping_item_access.create_shopping_item(
+            session=session,
+            user_id=user_id,
+            description=item.description,
+            brain_dump_id=brain_dump_id,
+        )
+    for event_ in processed.calendar_events:
+        await calendar_event_access.create_calendar_event(
+            session=session,
+            user_id=user_id,
+            description=event_.description,
+            event_date=brain_dump_access.parse_date(event_.event_date),
+            event_time=brain_dump_access.parse_time(event_.event_time),
+            brain_dump_id=brain_dump_id,
+        )
+
+
+async def save_bulk(session, user_id: int, processed: ProcessedBrainDump):
+    await brain_dump_access.save_processed_brain_dump(
+        session=session, user_id=user_id, raw_input=RAW_INPUT, processed=processed
+    )
+
+
+async def run(database_url: str, items: int, repeats: int) -> None:
+    engine = create_async_engine(database_url)
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        user = User(email="bench@example.com", first_name="Bench")
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+
+    processed = build_brain_dump(items)
+    item_count = (
+        len(processed.tasks)
+        + len(processed.shopping_items)
+        + len(processed.calendar_events)
+    )
+    print(f"Brain dump with {item_count} items (plus subtasks), {repeats} repeats")
+
+    for name, save in (("per-item", save_per_item), ("bulk", save_bulk)):
+        statements = 0
+        started = time.perf_counter()
+        for _ in range(repeats):
+            async with session_factory() as session:
+                await save(session, user_id, processed)
+                await session.commit()
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {name:>8}: {statements / repeats:5.1f} statements per dump, "
+            f"{elapsed / repeats * 1000:7.2f} ms per dump"
+        )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--database-url", default="sqlite+aiosqlite:///./benchmark_database.db"
+    )
+    parser.add_argument("--items", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.database_url, args.items, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
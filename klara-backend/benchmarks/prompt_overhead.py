@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: per-request CPU overhead of AIService outside the network call
+
+Compares rebuilding the parser, prompt template, format instructions and
+chain on every request (the previous behaviour) with the compiled
+BRAIN_DUMP_PROMPT. The LLM is replaced by a canned response so only local
+work (prompt formatting, chain invocation, output parsing) is measured.
+
+Usage:
+    python -m benchmarks.prompt_overhead [--iterations 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.models import ProcessedBrainDump
+from app.prompts import (
+    BRAIN_DUMP_PROMPT,
+    BRAIN_DUMP_SYSTEM_PROMPT,
+    BRAIN_DUMP_DATE_PROMPT,
+)
+
+TEXT = "Call the babysitter, buy milk and eggs, dentist Friday at 3pm"
+TODAY = "2025-10-20"
+RESPONSE = json.dumps(
+    {
+        "tasks": [
+            {
+                "description": "Call the babysitter",
+                "estimated_time_minutes": 10,
+                "should_decompose": False,
+            }
+        ],
+        "shopping_items": [{"description": "Milk"}, {"description": "Eggs"}],
+        "calendar_events": [
+            {
+                "description": "Dentist",
+                "event_date": "2025-10-24",
+                "event_time": "15:00",
+            }
+        ],
+    }
+)
+
+
+async def per_request_build(llm) -> ProcessedBrainDump:
+    """Previous behaviour: everything is rebuilt for each request"""
+    parser = PydanticOutputParser(pydantic_object=ProcessedBrainDump)
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", BRAIN_DUMP_SYSTEM_PROMPT + "\n\n" + BRAIN_DUMP_DATE_PROMPT),
+            ("human", "{input}"),
+        ]
+    )
+    chain = prompt | llm | parser
+    return await chain.ainvoke(
+        {
+            "input": TEXT,
+            "today": TODAY,
+            "format_instructions": parser.get_format_instructions(),
+        }
+    )
+
+
+def compiled(llm):
+    chain = llm | BRAIN_DUMP_PROMPT.parser
+
+    async def run() -> ProcessedBrainDump:
+        return await chain.ainvoke(BRAIN_DUMP_PROMPT.messages(TEXT, TODAY))
+
+    return run
+
+
+async def measure(name: str, run, iterations: int) -> None:
+    for _ in range(min(50, iterations)):  # warm up
+        await run()
+    started_cpu = time.process_time()
+    for _ in range(iterations):
+        await run()
+    cpu = time.process_time() - started_cpu
+    print(f"  {name:>18}: {cpu / iterations * 1e6:8.1f} us CPU per request")
+
+
+async def main(iterations: int) -> None:
+    llm = FakeListChatModel(responses=[RESPONSE])
+    print(f"{iterations} iterations, LLM replaced by a canned response")
+    await measure("per-request build", lambda: per_request_build(llm), iterations)
+    await measure("compiled prompt", compiled(llm), iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
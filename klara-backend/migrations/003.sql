@@ -0,0 +1,24 @@
+-- Klara Backend Database Schema
+-- Migration 003: Add composite indexes for paginated list endpoints
+-- Date: 2026-10-17
+-- Alembic Revision: 275b7de0269b
+
+-- Each index matches one list query: equality on user_id (and completed),
+-- then the keyset sort key, so a page is a range scan of page-size rows
+-- instead of an OFFSET scan.
+
+-- GET /tasks: newest first, optionally filtered by completion
+CREATE INDEX ix_tasks_user_id_id ON tasks(user_id, id);
+CREATE INDEX ix_tasks_user_id_completed_id ON tasks(user_id, completed, id);
+
+-- GET /tasks with a due date range: ordered by (due_date, id), optionally
+-- filtered by completion
+CREATE INDEX ix_tasks_user_id_due_date_id ON tasks(user_id, due_date, id);
+CREATE INDEX ix_tasks_user_id_completed_due_date ON tasks(user_id, completed, due_date, id);
+
+-- GET /shopping-items: newest first, optionally filtered by completion
+CREATE INDEX ix_shopping_items_user_id_id ON shopping_items(user_id, id);
+CREATE INDEX ix_shopping_items_user_id_completed_id ON shopping_items(user_id, completed, id);
+
+-- GET /calendar-events: ordered by (event_date, id), optionally a date range
+CREATE INDEX ix_calendar_events_user_id_event_date ON calendar_events(user_id, event_date, id);
@@ -0,0 +1,21 @@
+-- Klara Backend Database Schema
+-- Migration 004: Add idempotency keys for brain dump retries
+-- Date: 2026-10-17
+-- Alembic Revision: f385c4c80ee7
+
+-- POST /brain-dumps/ with an Idempotency-Key header stores its response
+-- here, in the same transaction as the items, so a retry returns it instead
+-- of processing the brain dump again. The unique constraint makes a
+-- concurrent retry fail instead of saving the items twice, and serves the
+-- lookup by (user_id, key).
+CREATE TABLE idempotency_keys (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT fk_idempotency_keys_user_id FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE,
+    CONSTRAINT uq_idempotency_keys_user_id_key UNIQUE (user_id, key)
+);
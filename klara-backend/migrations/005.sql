@@ -0,0 +1,30 @@
+-- Klara Backend Database Schema
+-- Migration 005: Add brain dump jobs for background processing
+-- Date: 2026-10-17
+-- Alembic Revision: f3b5d0ed03e3
+
+-- POST /brain-dumps/ with `Prefer: respond-async` queues a row here. Workers
+-- in every app process claim queued rows (highest priority, then oldest) with
+-- a conditional UPDATE, and store the BrainDumpResponse JSON or the error.
+CREATE TABLE brain_dump_jobs (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    priority INTEGER DEFAULT 0 NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER DEFAULT 0 NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    CONSTRAINT fk_brain_dump_jobs_user_id FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Claiming the next job
+CREATE INDEX ix_brain_dump_jobs_status_priority_id ON brain_dump_jobs(status, priority, id);
+
+-- Per-user limit on running jobs
+CREATE INDEX ix_brain_dump_jobs_user_id_status ON brain_dump_jobs(user_id, status);
@@ -0,0 +1,91 @@
+-- Klara Backend Database Schema
+-- Migration 006: Store each brain dump's text once, in brain_dumps
+-- Date: 2026-10-17
+-- Alembic Revision: e4efceb7309b
+
+-- Every item used to carry the full brain dump text in its own raw_input
+-- column, so a dump that produced 15 items was written 15 times. The text now
+-- lives in brain_dumps and items reference it.
+CREATE TABLE brain_dumps (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    raw_input TEXT NOT NULL,
+    -- sync, stream, batch or job; NULL for rows backfilled from items
+    source VARCHAR(16),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT fk_brain_dumps_user_id FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- A user's brain dumps, newest first
+CREATE INDEX ix_brain_dumps_user_id_id ON brain_dumps(user_id, id);
+
+-- Items are read by user and joined to their brain dump by its primary key,
+-- so brain_dump_id is not indexed
+ALTER TABLE tasks ADD COLUMN brain_dump_id INTEGER
+    CONSTRAINT fk_tasks_brain_dump_id REFERENCES brain_dumps(id) ON DELETE SET NULL;
+ALTER TABLE shopping_items ADD COLUMN brain_dump_id INTEGER
+    CONSTRAINT fk_shopping_items_brain_dump_id REFERENCES brain_dumps(id) ON DELETE SET NULL;
+ALTER TABLE calendar_events ADD COLUMN brain_dump_id INTEGER
+    CONSTRAINT fk_calendar_events_brain_dump_id REFERENCES brain_dumps(id) ON DELETE SET NULL;
+
+-- Backfill: one brain dump per submission, dated by its first item. Items of
+-- one submission were saved in one transaction (same created_at) or, when
+-- streamed, seconds apart; a user's items with the same text more than a
+-- minute apart start a new submission, so a list sent every week keeps one
+-- brain dump per week.
+INSERT INTO brain_dumps (user_id, raw_input, created_at)
+SELECT user_id, raw_input, created_at
+FROM (
+    SELECT user_id, raw_input, created_at,
+           LAG(created_at) OVER (
+               PARTITION BY user_id, raw_input ORDER BY created_at
+           ) AS previous_at
+    FROM (
+        SELECT user_id, raw_input, created_at FROM tasks
+        UNION
+        SELECT user_id, raw_input, created_at FROM shopping_items
+        UNION
+        SELECT user_id, raw_input, created_at FROM calendar_events
+    ) AS items
+) AS ordered
+WHERE previous_at IS NULL OR created_at - previous_at > interval '1 minute'
+ORDER BY created_at;
+
+-- Long texts don't fit in a btree entry, so match on their hash
+CREATE INDEX tmp_brain_dumps_backfill ON brain_dumps (user_id, md5(raw_input), created_at);
+
+-- Each item belongs to the latest submission started at or before it
+UPDATE tasks AS item SET brain_dump_id = (
+    SELECT brain_dumps.id FROM brain_dumps
+    WHERE brain_dumps.user_id = item.user_id
+      AND md5(brain_dumps.raw_input) = md5(item.raw_input)
+      AND brain_dumps.raw_input = item.raw_input
+      AND brain_dumps.created_at <= item.created_at
+    ORDER BY brain_dumps.created_at DESC
+    LIMIT 1
+);
+UPDATE shopping_items AS item SET brain_dump_id = (
+    SELECT brain_dumps.id FROM brain_dumps
+    WHERE brain_dumps.user_id = item.user_id
+      AND md5(brain_dumps.raw_input) = md5(item.raw_input)
+      AND brain_dumps.raw_input = item.raw_input
+      AND brain_dumps.created_at <= item.created_at
+    ORDER BY brain_dumps.created_at DESC
+    LIMIT 1
+);
+UPDATE calendar_events AS item SET brain_dump_id = (
+    SELECT brain_dumps.id FROM brain_dumps
+    WHERE brain_dumps.user_id = item.user_id
+      AND md5(brain_dumps.raw_input) = md5(item.raw_input)
+      AND brain_dumps.raw_input = item.raw_input
+      AND brain_dumps.created_at <= item.created_at
+    ORDER BY brain_dumps.created_at DESC
+    LIMIT 1
+);
+
+DROP INDEX tmp_brain_dumps_backfill;
+
+ALTER TABLE tasks DROP COLUMN raw_input;
+ALTER TABLE shopping_items DROP COLUMN raw_input;
+ALTER TABLE calendar_events DROP COLUMN raw_input;
@@ -0,0 +1,11 @@
+-- Klara Backend Database Schema
+-- Migration 007: Remember the job of a queued brain dump's idempotency key
+-- Date: 2026-10-17
+-- Alembic Revision: 346fef4bce6c
+
+-- POST /brain-dumps/ with `Prefer: respond-async` and an Idempotency-Key
+-- header stores the queued job under the key, so a retry gets the same job
+-- instead of queueing the brain dump again. response then holds the
+-- BrainDumpJobResponse JSON. No foreign key: jobs of the in-memory queue
+-- have no brain_dump_jobs row.
+ALTER TABLE idempotency_keys ADD COLUMN job_id INTEGER;
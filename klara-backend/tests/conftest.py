@@ -2,15 +2,29 @@
 Pytest configuration and fixtures for testing
 """
 
+import os
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from fastapi.testclient import TestClient
 
 from app.main import app
 from app.db_models import Base, User
-from app.database import get_db
+from app.database import get_db, to_async_url
+
 
+# Keep background jobs in memory: with the database backend, idle job workers
+# would query the test database while tests count statements. The database
+# backend is tested directly in test_brain_dump_jobs.py.
+os.environ.setdefault("JOB_QUEUE_BACKEND", "memory")
+# Tests send many brain dumps as the same user; rate limiting is tested with
+# its own controller in test_admission.py
+os.environ.setdefault("ADMISSION_ENABLED", "false")
+# Each test recreates its users, so cached users could be stale; the cache is
+# tested with its own instance in test_auth.py
+os.environ.setdefault("USER_CACHE_ENABLED", "false")
 
 # Use SQLite for testing - creates automatically, no setup needed
 # Use :memory: for in-memory database or specify a simple path
@@ -52,14 +66,23 @@ def test_db_session(test_db_engine):
 
 
 @pytest.fixture(scope="function")
-def client(test_db_session):
+def test_async_session_factory(test_db_engine):
+    """Create an async session factory (aiosqlite) on the same test database"""
+    async_engine = create_async_engine(to_async_url(TEST_DATABASE_URL), echo=False)
+
+    yield async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    # Dispose from the sync side; the engine's loop belongs to the TestClient
+    async_engine.sync_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def client(test_async_session_factory):
     """Create a test client with overridden database dependency"""
 
-    def override_get_db():
-        try:
-            yield test_db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with test_async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
 
@@ -78,3 +101,9 @@ def test_user(test_db_session):
     test_db_session.refresh(user)
 
     return user
+
+
+@pytest.fixture
+def anyio_backend():
+    """Run async tests (marked with pytest.mark.anyio) on asyncio"""
+    return "asyncio"
@@ -0,0 +1,246 @@
+"""
+Test admission control (rate limiting) in front of the LLM
+"""
+
+import asyncio
+
+import pytest
+
+from app.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    TokenBucket,
+    admission_requests,
+)
+from app.main import app
+from app.models import ProcessedBrainDump
+from app.routes import brain_dumps
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=100, clock=clock)
+
+    assert bucket.try_take(80)
+    assert not bucket.try_take(30)
+    assert bucket.seconds_until(30) == pytest.approx(1.0)
+
+    clock.now = 1.0
+    assert bucket.try_take(30)
+    clock.now = 100.0
+    assert bucket.available() == 100
+
+
+@pytest.mark.anyio
+async def test_user_over_limit_is_rejected_without_affecting_others():
+    clock = FakeClock()
+    admission = AdmissionController(
+        user_tokens_per_minute=600,
+        global_tokens_per_minute=60000,
+        base_tokens=100,
+        clock=clock,
+    )
+
+    for _ in range(6):
+        await admission.admit(1, "")
+    with pytest.raises(AdmissionRejected) as rejected:
+        await admission.admit(1, "")
+    await admission.admit(2, "")
+
+    assert rejected.value.scope == "user"
+    # 100 tokens at 10 tokens per second
+    assert rejected.value.retry_after == pytest.approx(10.0)
+
+
+@pytest.mark.anyio
+async def test_global_queue_serves_users_round_robin():
+    # One request's worth of burst, refilled 10 times a second
+    admission = AdmissionController(
+        user_tokens_per_minute=60000,
+        global_tokens_per_minute=6000,
+        global_burst_tokens=10,
+        base_tokens=10,
+    )
+    admitted = []
+
+    async def request(user_id, index):
+        await admission.admit(user_id, "")
+        admitted.append((user_id, index))
+
+    heavy = [asyncio.create_task(request(1, index)) for index in range(5)]
+    await asyncio.sleep(0)
+    light = asyncio.create_task(request(2, 0))
+    await asyncio.gather(*heavy, light)
+
+    assert admitted[:3] == [(1, 0), (1, 1), (2, 0)]
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_uses_no_tokens():
+    # One request's worth of burst, refilled in half a second
+    admission = AdmissionController(
+        user_tokens_per_minute=60000,
+        global_tokens_per_minute=1200,
+        global_burst_tokens=10,
+        base_tokens=10,
+    )
+    await admission.admit(1, "")
+
+    abandoned = asyncio.create_task(admission.admit(2, ""))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(admission.admit(3, ""))
+    await asyncio.sleep(0)
+    abandoned.cancel()
+
+    # Admitted with the first refill, not the second
+    await asyncio.wait_for(waiting, timeout=0.8)
+
+
+@pytest.mark.anyio
+async def test_rejected_batch_gives_back_tokens_of_admitted_users():
+    clock = FakeClock()
+    admission = AdmissionController(
+        user_tokens_per_minute=600,
+        global_tokens_per_minute=60000,
+        base_tokens=100,
+        clock=clock,
+    )
+    for _ in range(6):
+        await admission.admit(2, "")
+
+    with pytest.raises(AdmissionRejected):
+        await admission.admit_batch([(1, ""), (1, ""), (2, "")])
+
+    assert admission.user_buckets.get(1).available() == 600
+    assert admission.global_bucket.available() == 60000 - 600
+
+
+@pytest.mark.anyio
+async def test_batch_larger_than_the_burst_is_rejected_uncharged():
+    admission = AdmissionController(
+        user_tokens_per_minute=1000, global_tokens_per_minute=60000, base_tokens=100
+    )
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await admission.admit_batch([(1, "")] * 25)
+
+    assert rejected.value.scope == "size"
+    assert "at most 10 brain dumps" in str(rejected.value)
+    # Nothing was taken, so a batch that fits is still admitted in full
+    await admission.admit_batch([(1, "")] * 10)
+    assert admission.user_buckets.get(1).available() == pytest.approx(0, abs=1)
+
+
+@pytest.mark.anyio
+async def test_cancelled_waiter_gives_back_user_tokens():
+    admission = AdmissionController(
+        user_tokens_per_minute=60000,
+        global_tokens_per_minute=600,
+        global_burst_tokens=10,
+        base_tokens=10,
+    )
+    await admission.admit(1, "")
+
+    waiting = asyncio.create_task(admission.admit(2, ""))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert admission.user_buckets.get(2).available() == pytest.approx(60000)
+
+
+@pytest.mark.anyio
+async def test_request_that_would_wait_too_long_is_shed():
+    admission = AdmissionController(
+        user_tokens_per_minute=60000,
+        global_tokens_per_minute=600,
+        base_tokens=600,
+        max_wait_seconds=1,
+    )
+    shed_before = admission_requests.value(outcome="shed_global")
+
+    await admission.admit(1, "")
+    with pytest.raises(AdmissionRejected) as rejected:
+        await admission.admit(2, "")
+
+    assert rejected.value.scope == "global"
+    assert rejected.value.retry_after == pytest.approx(60, rel=0.01)
+    assert admission_requests.value(outcome="shed_global") - shed_before == 1
+    # Shedding doesn't use up the user's own budget
+    assert admission.user_buckets.get(2).available() == pytest.approx(60000)
+
+
+@pytest.fixture
+def strict_admission(monkeypatch):
+    """Allow each user two brain dumps; the AI returns an empty result"""
+    admission = AdmissionController(
+        user_tokens_per_minute=250, global_tokens_per_minute=60000, base_tokens=100
+    )
+    app.dependency_overrides[brain_dumps.get_admission_controller] = lambda: admission
+
+    async def fake_process_brain_dump(text):
+        return ProcessedBrainDump()
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", fake_process_brain_dump
+    )
+    yield admission
+    app.dependency_overrides.pop(brain_dumps.get_admission_controller, None)
+
+
+def test_flooding_user_gets_429_with_retry_after(client, test_user, strict_admission):
+    statuses = [
+        client.post(
+            "/brain-dumps/", json={"text": "Call mom", "user_id": test_user.id}
+        ).status_code
+        for _ in range(2)
+    ]
+    response = client.post(
+        "/brain-dumps/", json={"text": "Call mom", "user_id": test_user.id}
+    )
+
+    assert statuses == [200, 200]
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    stream = client.post(
+        "/brain-dumps/stream", json={"text": "Call mom", "user_id": test_user.id}
+    )
+    assert stream.status_code == 429
+
+
+def test_batch_is_charged_for_every_item(client, test_user, strict_admission):
+    def post(path, json):
+        return client.post(path, json=json).status_code
+
+    item = {"text": "Call mom", "user_id": test_user.id}
+    assert post("/brain-dumps/", item) == 200
+
+    # One brain dump's worth is left, so a batch of two doesn't fit
+    too_big = client.post("/brain-dumps/batch", json={"items": [item, item]})
+    assert too_big.status_code == 429
+    assert int(too_big.headers["Retry-After"]) >= 1
+
+    # The rejected batch used up none of it
+    assert post("/brain-dumps/batch", {"items": [item]}) == 200
+    assert post("/brain-dumps/", item) == 429
+
+
+def test_batch_over_the_burst_gets_429_with_largest_size(
+    client, test_user, strict_admission
+):
+    item = {"text": "Call mom", "user_id": test_user.id}
+
+    response = client.post("/brain-dumps/batch", json={"items": [item] * 3})
+
+    assert response.status_code == 429
+    assert "at most 2 brain dumps per batch" in response.json()["detail"]
+    assert "Retry-After" in response.headers
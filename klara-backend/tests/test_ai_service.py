@@ -0,0 +1,126 @@
+"""
+Test AIService structured extraction with a scripted model (no API calls)
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.ai_service import AIService, BrainDumpExtractionError
+from app.llm_metrics import llm_calls_in_flight, parse_failures
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+VALID_ARGS = {
+    "tasks": [],
+    "shopping_items": [{"description": "Milk"}],
+    "calendar_events": [],
+}
+# ProcessedTask requires estimated_time_minutes and should_decompose
+INVALID_ARGS = {"tasks": [{"description": "Call mom"}]}
+
+
+def tool_reply(args):
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "ProcessedBrainDump", "args": args, "id": "toolu_1"},
+        ],
+    )
+
+
+@pytest.fixture
+def scripted_service(monkeypatch):
+    """AIService whose model returns the given replies in order"""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("LLM_EXTRACTION_MODE", "tool")
+
+    def build(*replies):
+        service = AIService()
+        service.calls = []
+
+        async def fake_llm(messages):
+            service.calls.append(messages)
+            return replies[len(service.calls) - 1]
+
+        service.extraction_llm = RunnableLambda(fake_llm)
+        return service
+
+    return build
+
+
+@pytest.mark.anyio
+async def test_tool_output_is_repaired(scripted_service):
+    service = scripted_service(tool_reply(INVALID_ARGS), tool_reply(VALID_ARGS))
+    failures_before = parse_failures.value(mode="tool")
+
+    result = await service.extract_brain_dump("Call mom and buy milk")
+
+    assert [item.description for item in result.shopping_items] == ["Milk"]
+    assert parse_failures.value(mode="tool") == failures_before + 1
+
+    # The repair call shows the model its tool call and the validation error
+    repair_messages = service.calls[1]
+    assert repair_messages[-2] == tool_reply(INVALID_ARGS)
+    assert isinstance(repair_messages[-1], ToolMessage)
+    assert repair_messages[-1].tool_call_id == "toolu_1"
+    assert "estimated_time_minutes" in repair_messages[-1].content
+
+
+@pytest.mark.anyio
+async def test_repair_is_bounded(scripted_service):
+    service = scripted_service(
+        AIMessage(content="Sure! Here are your items."), tool_reply(INVALID_ARGS)
+    )
+
+    with pytest.raises(BrainDumpExtractionError):
+        await service.extract_brain_dump("Call mom")
+    assert len(service.calls) == 2
+
+
+@pytest.mark.anyio
+async def test_process_brain_dump_falls_back_after_failed_repair(scripted_service):
+    service = scripted_service(tool_reply(INVALID_ARGS), tool_reply(INVALID_ARGS))
+
+    result = await service.process_brain_dump("Call mom")
+
+    assert [task.description for task in result.tasks] == ["Call mom"]
+    assert result.tasks[0].reasoning == "Error occurred during processing"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", ["tool", "json"])
+async def test_injected_model_needs_no_api_key(monkeypatch, mode):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("LLM_EXTRACTION_MODE", mode)
+    service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0, items=6))
+
+    result = await service.extract_brain_dump("Call mom and buy milk")
+    streamed = [item async for item in service.stream_brain_dump("Call mom")]
+
+    assert service.model == "fake-brain-dump"
+    assert (len(result.tasks), len(result.shopping_items)) == (2, 2)
+    assert len(streamed) == 6
+
+
+@pytest.mark.anyio
+async def test_drain_waits_for_in_flight_calls(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0.3, items=3))
+
+    call = asyncio.create_task(service.extract_brain_dump("Call mom and buy milk"))
+    stream = service.stream_brain_dump("Call mom and buy milk")
+    first_item = asyncio.create_task(stream.__anext__())
+    await asyncio.sleep(0.05)
+    assert service.in_flight == 2
+    assert llm_calls_in_flight.value() == 2
+
+    assert await service.drain(timeout=0.05) is False
+    await first_item
+    await stream.aclose()
+    assert await service.drain(timeout=2) is True
+    assert call.done() and len(call.result().tasks) == 1
+    assert llm_calls_in_flight.value() == 0
@@ -0,0 +1,97 @@
+"""
+Test login: the user lookup, the race-free upsert and the user cache
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app.access import user_access
+from app.llm_cache import LRUTTLCache
+from app.main import app
+from app.routes.auth import get_user_cache
+
+
+@pytest.fixture
+def statements(test_async_session_factory):
+    """SQL statements run on the test database"""
+    executed = []
+
+    def record_statement(*args):
+        executed.append(args[2].split(None, 1)[0].upper())
+
+    engine = test_async_session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", record_statement)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record_statement)
+
+
+def test_first_login_creates_the_user(client, statements):
+    response = client.post("/auth/login", json={"email": "anna.smith@example.com"})
+
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Anna"
+    assert statements == ["SELECT", "INSERT"]
+
+    statements.clear()
+    again = client.post("/auth/login", json={"email": "anna.smith@example.com"})
+
+    assert again.json() == response.json()
+    assert statements == ["SELECT"]
+
+
+def test_cached_login_needs_no_query(client, test_user, statements):
+    cache = LRUTTLCache(max_entries=100, ttl_seconds=60)
+    app.dependency_overrides[get_user_cache] = lambda: cache
+
+    first = client.post("/auth/login", json={"email": test_user.email})
+    second = client.post("/auth/login", json={"email": test_user.email})
+
+    assert (
+        first.json()
+        == second.json()
+        == {
+            "id": test_user.id,
+            "email": test_user.email,
+            "first_name": "Test",
+        }
+    )
+    assert statements == ["SELECT"]
+
+
+def test_login_racing_another_first_login(client, test_user, monkeypatch):
+    """Another login inserts the user between our SELECT and INSERT"""
+    get_user_by_email = user_access.get_user_by_email
+    lookups = []
+
+    async def missed_first_lookup(session, email):
+        lookups.append(email)
+        if len(lookups) == 1:
+            return None
+        return await get_user_by_email(session, email)
+
+    monkeypatch.setattr(user_access, "get_user_by_email", missed_first_lookup)
+
+    response = client.post("/auth/login", json={"email": test_user.email})
+
+    assert response.status_code == 200
+    assert response.json()["id"] == test_user.id
+    assert len(lookups) == 2
+
+
+def test_default_first_name():
+    assert user_access.default_first_name("jo_ann+klara@example.com") == "Jo"
+    assert user_access.default_first_name(".x@example.com") == ".x"
+
+
+def test_login_fails_if_conflicting_user_is_gone(client, test_user, monkeypatch):
+    """The INSERT conflicts, but the user is deleted before it is read back"""
+
+    async def never_found(session, email):
+        return None
+
+    monkeypatch.setattr(user_access, "get_user_by_email", never_found)
+
+    response = client.post("/auth/login", json={"email": test_user.email})
+
+    assert response.status_code == 500
+    assert "neither created nor found" in response.json()["detail"]
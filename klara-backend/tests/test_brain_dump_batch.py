@@ -0,0 +1,65 @@
+"""
+Test the batch brain dump endpoint
+"""
+
+import httpx
+import anthropic
+import pytest
+
+from app.models import ProcessedBrainDump, ProcessedShoppingItem
+from app.routes import brain_dumps
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(429, headers={"retry-after": "0.01"}, request=request)
+    return anthropic.RateLimitError("rate limited", response=response, body=None)
+
+
+@pytest.fixture
+def fake_extraction(monkeypatch):
+    """Each text becomes one shopping item; "fail" errors, "busy" is rate limited once"""
+    calls = []
+
+    async def fake_extract_brain_dump(text, retry=True):
+        calls.append(text)
+        if text == "fail":
+            raise ValueError("model returned garbage")
+        if text == "busy" and calls.count("busy") == 1:
+            raise rate_limit_error()
+        return ProcessedBrainDump(
+            shopping_items=[ProcessedShoppingItem(description=text)]
+        )
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "extract_brain_dump", fake_extract_brain_dump
+    )
+    return calls
+
+
+def test_batch_returns_result_or_error_per_item(client, test_user, fake_extraction):
+    texts = ["milk", "fail", "busy", "eggs"]
+    response = client.post(
+        "/brain-dumps/batch",
+        json={
+            "items": [{"text": text, "user_id": test_user.id} for text in texts],
+            "max_concurrency": 2,
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+
+    # The failed item reports its error, the others are saved
+    assert results[1]["result"] is None
+    assert "model returned garbage" in results[1]["error"]
+    for index in (0, 2, 3):
+        assert results[index]["error"] is None
+        (item,) = results[index]["result"]["shopping_items"]
+        assert item["description"] == texts[index]
+        assert item["raw_input"] == texts[index]
+        assert item["id"] is not None
+
+    # The rate-limited item was retried after backing off
+    assert fake_extraction.count("busy") == 2
@@ -0,0 +1,176 @@
+"""
+Test request coalescing and Idempotency-Key handling for POST /brain-dumps/
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db_models import IdempotencyKey, ShoppingItem
+from app.models import ProcessedBrainDump, ProcessedShoppingItem
+from app.routes import brain_dumps
+from app.single_flight import SingleFlight, coalesced_calls
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Make the AI service return one shopping item after 0.3 s; lists its calls"""
+    calls = []
+
+    async def fake_process_brain_dump(text):
+        calls.append(text)
+        await asyncio.sleep(0.3)
+        return ProcessedBrainDump(
+            shopping_items=[ProcessedShoppingItem(description="Milk")]
+        )
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", fake_process_brain_dump
+    )
+    return calls
+
+
+def count_rows(test_db_session, model):
+    return test_db_session.scalar(select(func.count()).select_from(model))
+
+
+def test_retry_with_same_key_returns_saved_response(
+    client, test_user, test_db_session, llm_calls
+):
+    body = {"text": "buy milk", "user_id": test_user.id}
+    headers = {"Idempotency-Key": "submit-1"}
+
+    first = client.post("/brain-dumps/", json=body, headers=headers)
+    retry = client.post("/brain-dumps/", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert len(llm_calls) == 1
+    assert count_rows(test_db_session, ShoppingItem) == 1
+
+    # A new key is a new submission
+    client.post("/brain-dumps/", json=body, headers={"Idempotency-Key": "submit-2"})
+    assert len(llm_calls) == 2
+    assert count_rows(test_db_session, ShoppingItem) == 2
+
+
+def test_key_reused_for_other_text_is_rejected(client, test_user, llm_calls):
+    headers = {"Idempotency-Key": "submit-1"}
+    client.post(
+        "/brain-dumps/",
+        json={"text": "buy milk", "user_id": test_user.id},
+        headers=headers,
+    )
+
+    response = client.post(
+        "/brain-dumps/",
+        json={"text": "buy eggs", "user_id": test_user.id},
+        headers=headers,
+    )
+
+    assert response.status_code == 422
+    assert len(llm_calls) == 1
+
+
+def test_expired_key_is_processed_again(
+    client, test_user, test_db_session, llm_calls, monkeypatch
+):
+    body = {"text": "buy milk", "user_id": test_user.id}
+    headers = {"Idempotency-Key": "submit-1"}
+    client.post("/brain-dumps/", json=body, headers=headers)
+
+    monkeypatch.setenv("IDEMPOTENCY_KEY_TTL_SECONDS", "-1")
+    response = client.post("/brain-dumps/", json=body, headers=headers)
+
+    assert response.status_code == 200
+    assert len(llm_calls) == 2
+    assert count_rows(test_db_session, IdempotencyKey) == 1
+
+
+def test_concurrent_duplicates_are_processed_and_saved_once(
+    client, test_user, test_db_session, llm_calls
+):
+    """Double taps without a key: one LLM call and one set of rows"""
+    body = {"text": "Buy  MILK", "user_id": test_user.id}
+    before = coalesced_calls.value(name="brain_dump")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        texts = [body["text"], "buy milk", "buy milk "]
+        responses = list(
+            pool.map(
+                lambda text: client.post("/brain-dumps/", json={**body, "text": text}),
+                texts,
+            )
+        )
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len({response.text for response in responses}) == 1
+    assert len(llm_calls) == 1
+    assert coalesced_calls.value(name="brain_dump") - before == 2
+    assert count_rows(test_db_session, ShoppingItem) == 1
+
+
+def test_coalesced_requests_keep_their_own_keys(
+    client, test_user, test_db_session, llm_calls
+):
+    body = {"text": "buy milk", "user_id": test_user.id}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(
+            pool.map(
+                lambda key: client.post(
+                    "/brain-dumps/", json=body, headers={"Idempotency-Key": key}
+                ),
+                ["submit-1", "submit-2"],
+            )
+        )
+    retry = client.post(
+        "/brain-dumps/", json=body, headers={"Idempotency-Key": "submit-2"}
+    )
+
+    assert responses[0].json() == responses[1].json() == retry.json()
+    assert len(llm_calls) == 1
+    assert count_rows(test_db_session, ShoppingItem) == 1
+    assert count_rows(test_db_session, IdempotencyKey) == 2
+
+
+def test_concurrent_retries_with_same_key_save_once(
+    client, test_user, test_db_session, llm_calls
+):
+    body = {"text": "buy milk", "user_id": test_user.id}
+    headers = {"Idempotency-Key": "submit-1"}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(
+            pool.map(
+                lambda _: client.post("/brain-dumps/", json=body, headers=headers),
+                range(3),
+            )
+        )
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len({response.text for response in responses}) == 1
+    assert len(llm_calls) == 1
+    assert count_rows(test_db_session, ShoppingItem) == 1
+
+
+@pytest.mark.anyio
+async def test_single_flight_survives_cancelled_caller():
+    flights: SingleFlight[str] = SingleFlight("test")
+    started = []
+
+    async def call():
+        started.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    first = asyncio.create_task(flights.do("key", call))
+    second = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "result"
+    assert len(started) == 1
+    assert flights.in_flight() == 0
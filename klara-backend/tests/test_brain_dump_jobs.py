@@ -0,0 +1,305 @@
+"""
+Test background brain dump processing (Prefer: respond-async) and the job queue
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.brain_dump_jobs import (
+    BrainDumpJobQueue,
+    DatabaseJobBackend,
+    MemoryJobBackend,
+    is_public_address,
+    job_callbacks,
+)
+from app.db_models import User
+from app.models import BrainDumpResponse, ProcessedBrainDump, ProcessedShoppingItem
+from app.routes import brain_dumps
+
+ASYNC = {"Prefer": "respond-async"}
+
+
+def processed(text):
+    return ProcessedBrainDump(shopping_items=[ProcessedShoppingItem(description=text)])
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Make the AI service return one shopping item named after the text"""
+    calls = []
+
+    async def fake_process_brain_dump(text):
+        calls.append(text)
+        await asyncio.sleep(0.05)
+        return processed(text)
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", fake_process_brain_dump
+    )
+    return calls
+
+
+def wait_for_job(client, location, user_id):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = client.get(location, params={"user_id": user_id}).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job did not finish: {job}")
+
+
+def test_async_brain_dump_returns_job(client, test_user, llm_calls):
+    response = client.post(
+        "/brain-dumps/",
+        json={"text": "Milk", "user_id": test_user.id},
+        headers=ASYNC,
+    )
+
+    assert response.status_code == 202
+    assert response.headers["Preference-Applied"] == "respond-async"
+    job = response.json()
+    assert job["status"] in ("queued", "running")
+    assert response.headers["Location"] == f"/brain-dumps/jobs/{job['id']}"
+
+    finished = wait_for_job(client, response.headers["Location"], test_user.id)
+    assert finished["status"] == "succeeded"
+    item = finished["result"]["shopping_items"][0]
+    assert item["description"] == "Milk"
+    saved = client.get("/shopping-items/", params={"user_id": test_user.id}).json()
+    assert [saved_item["id"] for saved_item in saved["items"]] == [item["id"]]
+
+
+def test_async_retry_with_idempotency_key_gets_the_same_job(
+    client, test_user, llm_calls
+):
+    body = {"text": "Milk", "user_id": test_user.id}
+    headers = dict(ASYNC, **{"Idempotency-Key": "queue-1"})
+
+    first = client.post("/brain-dumps/", json=body, headers=headers)
+    wait_for_job(client, first.headers["Location"], test_user.id)
+    retry = client.post("/brain-dumps/", json=body, headers=headers)
+
+    assert retry.status_code == 202
+    assert retry.headers["Location"] == first.headers["Location"]
+    # The job as it is now, with its result
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.json()["status"] == "succeeded"
+    assert llm_calls == ["Milk"]
+    saved = client.get("/shopping-items/", params={"user_id": test_user.id}).json()
+    assert len(saved["items"]) == 1
+
+
+def test_job_of_another_user_is_not_found(client, test_user, llm_calls):
+    response = client.post(
+        "/brain-dumps/",
+        json={"text": "Milk", "user_id": test_user.id},
+        headers=ASYNC,
+    )
+
+    other = client.get(response.headers["Location"], params={"user_id": 999})
+
+    assert other.status_code == 404
+
+
+@pytest.fixture
+def callbacks(client):
+    """Allow callbacks to frontend.example.com, resolved to the given addresses"""
+    received = []
+    addresses = ["93.184.215.14"]
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(204)
+
+    async def resolve(host, port):
+        return addresses
+
+    job_queue = client.app.state.job_queue
+    job_queue._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    job_queue.callback_allowed_hosts = ["frontend.example.com"]
+    job_queue.resolve = resolve
+    return received, addresses
+
+
+def post_with_callback(client, user, callback_url):
+    return client.post(
+        "/brain-dumps/",
+        json={"text": "Milk", "user_id": user.id, "callback_url": callback_url},
+        headers=ASYNC,
+    )
+
+
+def test_finished_job_is_posted_to_callback(client, test_user, llm_calls, callbacks):
+    received, _ = callbacks
+
+    response = post_with_callback(
+        client, test_user, "https://frontend.example.com/jobs"
+    )
+    wait_for_job(client, response.headers["Location"], test_user.id)
+
+    deadline = time.monotonic() + 2
+    while not received and time.monotonic() < deadline:
+        time.sleep(0.02)
+    # Sent to the address that was checked, for the original host
+    assert str(received[0].url) == "https://93.184.215.14/jobs"
+    assert received[0].headers["Host"] == "frontend.example.com"
+    job = json.loads(received[0].content)
+    assert job["id"] == response.json()["id"]
+    assert job["status"] == "succeeded"
+
+
+def test_callback_url_host_must_be_allowed(client, test_user, llm_calls, callbacks):
+    response = post_with_callback(client, test_user, "http://localhost:8080/admin")
+
+    assert response.status_code == 422
+    assert "not allowed" in response.json()["detail"]
+
+
+def test_callback_to_internal_address_is_not_sent(
+    client, test_user, llm_calls, callbacks
+):
+    received, addresses = callbacks
+    # DNS for an allowed host pointing at the cloud metadata endpoint
+    addresses[:] = ["169.254.169.254"]
+    before = job_callbacks.value(outcome="rejected")
+
+    response = post_with_callback(
+        client, test_user, "https://frontend.example.com/jobs"
+    )
+    wait_for_job(client, response.headers["Location"], test_user.id)
+
+    deadline = time.monotonic() + 2
+    while job_callbacks.value(outcome="rejected") == before:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert received == []
+
+
+def test_only_public_addresses_are_callback_targets():
+    for address in ("93.184.215.14", "2606:2800:21f:cb07:6820:80da:af6b:8b2c"):
+        assert is_public_address(address)
+    for address in (
+        "127.0.0.1",
+        "10.0.0.5",
+        "172.16.0.1",
+        "192.168.1.1",
+        "169.254.169.254",
+        "100.64.0.1",
+        "0.0.0.0",
+        "224.0.0.1",
+        "::1",
+        "fe80::1",
+        "fd00:ec2::254",
+        "::ffff:127.0.0.1",
+    ):
+        assert not is_public_address(address), address
+
+
+@pytest.mark.anyio
+async def test_memory_backend_priority_and_per_user_limit():
+    backend = MemoryJobBackend()
+    first = await backend.create(None, 1, "a", 0, None)
+    urgent = await backend.create(None, 1, "b", 5, None)
+    other_user = await backend.create(None, 2, "c", 0, None)
+    await backend.create(None, 1, "d", 0, None)
+
+    claimed = [await backend.claim(None, max_running_per_user=2) for _ in range(4)]
+
+    assert [job.id if job else None for job in claimed] == [
+        urgent.id,
+        first.id,
+        other_user.id,
+        None,
+    ]
+    await backend.finish(None, urgent.id, result=BrainDumpResponse())
+    assert (await backend.claim(None, max_running_per_user=2)).text == "d"
+
+
+@pytest.fixture
+async def sessions(test_async_session_factory):
+    @asynccontextmanager
+    async def open_session():
+        async with test_async_session_factory() as session:
+            yield session
+
+    yield open_session
+    # Close the connections on this test's loop; open aiosqlite connections
+    # keep the process from exiting
+    await test_async_session_factory.kw["bind"].dispose()
+
+
+@pytest.fixture
+def second_user(test_db_session):
+    user = User(email="second@example.com", first_name="Second")
+    test_db_session.add(user)
+    test_db_session.commit()
+    return user
+
+
+@pytest.mark.anyio
+async def test_database_backend_claims_by_priority_within_user_limit(
+    sessions, test_user, second_user
+):
+    backend = DatabaseJobBackend()
+    async with sessions() as session:
+        first = await backend.create(session, test_user.id, "a", 0, None)
+        urgent = await backend.create(session, test_user.id, "b", 5, None)
+        other_user = await backend.create(session, second_user.id, "c", 0, None)
+        await backend.create(session, test_user.id, "d", 0, None)
+        await session.commit()
+
+    claimed = []
+    for _ in range(4):
+        async with sessions() as session:
+            claimed.append(await backend.claim(session, max_running_per_user=2))
+            await session.commit()
+
+    assert [job.id if job else None for job in claimed] == [
+        urgent.id,
+        first.id,
+        other_user.id,
+        None,
+    ]
+
+    # A worker died with its jobs running: they are queued again
+    async with sessions() as session:
+        later = datetime.now(timezone.utc) + timedelta(minutes=1)
+        assert await backend.requeue_stale(session, later) == 3
+        await session.commit()
+        job = await backend.get(session, urgent.id, test_user.id)
+    assert job.status == "queued"
+
+
+@pytest.mark.anyio
+async def test_database_queue_processes_and_persists(sessions, test_user):
+    class FakeAIService:
+        async def process_brain_dump(self, text):
+            return processed(text)
+
+    queue = BrainDumpJobQueue(
+        DatabaseJobBackend(), FakeAIService(), sessions, workers=2, poll_seconds=0.05
+    )
+    await queue.start()
+    jobs = [await queue.submit(test_user.id, text) for text in ("Milk", "Eggs")]
+
+    deadline = time.monotonic() + 5
+    finished = []
+    while time.monotonic() < deadline:
+        finished = [await queue.get(job.id, test_user.id) for job in jobs]
+        if all(job.status == "succeeded" for job in finished):
+            break
+        await asyncio.sleep(0.05)
+    await queue.stop(timeout=1)
+
+    assert [job.status for job in finished] == ["succeeded", "succeeded"]
+    assert [job.result.shopping_items[0].description for job in finished] == [
+        "Milk",
+        "Eggs",
+    ]
@@ -0,0 +1,123 @@
+"""
+Test bulk persistence of a processed brain dump
+
+The AI step is replaced with a canned ProcessedBrainDump so these tests
+only exercise the database layer.
+"""
+
+import pytest
+from sqlalchemy import select
+
+from app.db_models import BrainDump
+from app.models import (
+    ProcessedBrainDump,
+    ProcessedTask,
+    ProcessedShoppingItem,
+    ProcessedCalendarEvent,
+    SubTask,
+)
+from app.routes import brain_dumps
+
+
+@pytest.fixture
+def processed_brain_dump(monkeypatch):
+    """Make the AI service return a fixed brain dump with every category"""
+    processed = ProcessedBrainDump(
+        tasks=[
+            ProcessedTask(
+                description="Plan Noah's birthday party",
+                due_date="2025-11-01",
+                estimated_time_minutes=120,
+                should_decompose=True,
+                subtasks=[
+                    SubTask(description="Create guest list", order=1),
+                    SubTask(description="Order birthday cake", order=2),
+                    SubTask(description="Send invitations", order=3),
+                ],
+            ),
+            ProcessedTask(
+                description="Call the dentist",
+                estimated_time_minutes=5,
+                should_decompose=False,
+            ),
+        ],
+        shopping_items=[
+            ProcessedShoppingItem(description="Milk"),
+            ProcessedShoppingItem(description="Eggs"),
+        ],
+        calendar_events=[
+            ProcessedCalendarEvent(
+                description="Soccer practice",
+                event_date="2025-10-30",
+                event_time="16:00",
+            )
+        ],
+    )
+
+    async def fake_process_brain_dump(text):
+        return processed
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", fake_process_brain_dump
+    )
+    return processed
+
+
+def test_bulk_persistence(client, test_user, processed_brain_dump):
+    """All items are saved and subtasks are linked to their parent task"""
+    response = client.post(
+        "/brain-dumps/",
+        json={"text": "Everything on my mind", "user_id": test_user.id},
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+
+    assert [task["description"] for task in result["tasks"]] == [
+        "Plan Noah's birthday party",
+        "Call the dentist",
+    ]
+    assert [item["description"] for item in result["shopping_items"]] == [
+        "Milk",
+        "Eggs",
+    ]
+    assert len(result["calendar_events"]) == 1
+
+    party, dentist = result["tasks"]
+    assert party["due_date"] == "2025-11-01"
+    assert [subtask["order"] for subtask in party["subtasks"]] == [1, 2, 3]
+    for subtask in party["subtasks"]:
+        assert subtask["parent_task_id"] == party["id"]
+        assert subtask["created_at"] is not None
+    assert dentist["subtasks"] is None
+
+    event = result["calendar_events"][0]
+    assert event["event_date"] == "2025-10-30"
+    assert event["event_time"] == "16:00:00"
+    assert event["raw_input"] == "Everything on my mind"
+
+
+def test_raw_input_is_stored_once(
+    client, test_db_session, test_user, processed_brain_dump
+):
+    """Items reference one brain_dumps row; lists include its text only when asked"""
+    result = client.post(
+        "/brain-dumps/",
+        json={"text": "Everything on my mind", "user_id": test_user.id},
+    ).json()
+
+    stored = test_db_session.scalars(select(BrainDump)).all()
+    assert [(dump.user_id, dump.raw_input, dump.source) for dump in stored] == [
+        (test_user.id, "Everything on my mind", "sync")
+    ]
+    assert result["brain_dump_id"] == stored[0].id
+    items = result["tasks"] + result["shopping_items"] + result["calendar_events"]
+    assert {item["brain_dump_id"] for item in items} == {stored[0].id}
+
+    for path in ("/tasks/", "/shopping-items/", "/calendar-events/"):
+        params = {"user_id": test_user.id}
+        listed = client.get(path, params=params).json()["items"]
+        assert {item["raw_input"] for item in listed} == {None}
+        params["include_raw_input"] = "true"
+        listed = client.get(path, params=params).json()["items"]
+        assert {item["raw_input"] for item in listed} == {"Everything on my mind"}
@@ -0,0 +1,101 @@
+"""
+Test the streaming brain dump endpoint (NDJSON)
+"""
+
+import json
+
+import pytest
+
+from app.ai_service import completed_items
+from app.models import ProcessedShoppingItem, ProcessedCalendarEvent
+from app.routes import brain_dumps
+
+
+def test_completed_items_waits_for_next_item():
+    """The last item of the list being generated is only emitted once closed"""
+    emitted = {"tasks": 0, "shopping_items": 0, "calendar_events": 0}
+
+    partial = {"shopping_items": [{"description": "Milk"}, {"description": "Eg"}]}
+    assert completed_items(partial, emitted) == [
+        ("shopping_items", ProcessedShoppingItem(description="Milk"))
+    ]
+
+    # Moving on to calendar events closes the shopping list
+    partial = {
+        "shopping_items": [{"description": "Milk"}, {"description": "Eggs"}],
+        "calendar_events": [{"description": "Dentist"}],
+    }
+    assert completed_items(partial, emitted) == [
+        ("shopping_items", ProcessedShoppingItem(description="Eggs"))
+    ]
+
+    partial["calendar_events"] = [
+        {"description": "Dentist", "event_date": "2025-10-21", "event_time": "15:00"}
+    ]
+    assert completed_items(partial, emitted, final=True) == [
+        (
+            "calendar_events",
+            ProcessedCalendarEvent(
+                description="Dentist", event_date="2025-10-21", event_time="15:00"
+            ),
+        )
+    ]
+    assert completed_items(partial, emitted, final=True) == []
+
+
+@pytest.fixture
+def streamed_items(monkeypatch):
+    """Make the AI service stream two shopping items and an event"""
+
+    async def fake_stream_brain_dump(text):
+        yield "shopping_items", ProcessedShoppingItem(description="Milk")
+        yield "shopping_items", ProcessedShoppingItem(description="Eggs")
+        yield (
+            "calendar_events",
+            ProcessedCalendarEvent(description="Dentist", event_date="2025-10-21"),
+        )
+
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "stream_brain_dump", fake_stream_brain_dump
+    )
+
+
+def read_events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_stream_persists_each_item(client, test_user, streamed_items):
+    response = client.post(
+        "/brain-dumps/stream",
+        json={"text": "Milk, eggs, dentist tuesday", "user_id": test_user.id},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = read_events(response)
+
+    assert [event["type"] for event in events] == [
+        "shopping_item",
+        "shopping_item",
+        "calendar_event",
+        "done",
+    ]
+    for event in events[:-1]:
+        assert event["data"]["id"] is not None
+        assert event["data"]["user_id"] == test_user.id
+    assert events[-1]["counts"] == {
+        "tasks": 0,
+        "shopping_items": 2,
+        "calendar_events": 1,
+    }
+
+
+def test_stream_without_persisting(client, test_user, streamed_items):
+    response = client.post(
+        "/brain-dumps/stream?persist=false",
+        json={"text": "Milk, eggs, dentist tuesday", "user_id": test_user.id},
+    )
+
+    events = read_events(response)
+    assert events[0] == {"type": "shopping_item", "data": {"description": "Milk"}}
+    assert events[-1]["type"] == "done"
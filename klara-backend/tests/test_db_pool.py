@@ -0,0 +1,63 @@
+"""
+Test connection pool settings and telemetry
+"""
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db_pool import (
+    InstrumentedAsyncPool,
+    pool_options_from_env,
+    pool_checkouts,
+    pool_overflow_checkouts,
+    pool_timeouts,
+    pool_checked_out,
+)
+
+
+def test_pool_options_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT_SECONDS", "2.5")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+
+    options = pool_options_from_env()
+
+    assert options["poolclass"] is InstrumentedAsyncPool
+    assert (options["pool_size"], options["max_overflow"]) == (20, 0)
+    assert options["pool_timeout"] == 2.5
+    assert options["pool_recycle"] == 1800
+    assert options["pool_pre_ping"] is False
+
+
+@pytest.mark.anyio
+async def test_pool_reports_overflow_and_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncPool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    checkouts = pool_checkouts.value()
+    overflows = pool_overflow_checkouts.value()
+    timeouts = pool_timeouts.value()
+
+    first = await engine.connect()
+    second = await engine.connect()
+    await second.execute(text("SELECT 1"))
+
+    assert pool_checked_out.value() == 2
+    assert pool_checkouts.value() == checkouts + 2
+    assert pool_overflow_checkouts.value() == overflows + 1
+
+    # Pool exhausted: the next checkout times out and is counted
+    with pytest.raises(exc.TimeoutError):
+        await engine.connect()
+    assert pool_timeouts.value() == timeouts + 1
+
+    await first.close()
+    await second.close()
+    assert pool_checked_out.value() == 0
+    await engine.dispose()
@@ -0,0 +1,118 @@
+"""
+Test the rule-based fast path for trivial brain dumps (no API calls)
+"""
+
+from datetime import date, datetime
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from app.ai_service import AIService
+from app.fast_path import classify, fast_path_requests
+
+# A Monday
+TODAY = date(2025, 10, 20)
+
+
+def descriptions(items):
+    return [item.description for item in items]
+
+
+def test_comma_and_and_separated_shopping_list():
+    result = classify("Buy groceries: milk, eggs, bread, and cheese", TODAY)
+
+    assert result.kind == "shopping"
+    assert result.confidence >= 0.9
+    assert descriptions(result.processed.shopping_items) == [
+        "Milk",
+        "Eggs",
+        "Bread",
+        "Cheese",
+    ]
+    assert result.processed.tasks == []
+
+
+def test_shopping_list_without_cue_needs_known_groceries():
+    assert classify("milk, eggs, bread", TODAY).confidence >= 0.8
+    assert classify("stuff, things", TODAY).confidence < 0.8
+
+
+def test_shopping_list_with_quantities():
+    result = classify(
+        "Get 2 gallons of milk, 1 dozen eggs, and 3 pounds of cheese", TODAY
+    )
+
+    assert descriptions(result.processed.shopping_items) == [
+        "2 gallons of milk",
+        "1 dozen eggs",
+        "3 pounds of cheese",
+    ]
+
+
+@pytest.mark.parametrize(
+    "text, event_date, event_time",
+    [
+        ("dentist tuesday 3pm", "2025-10-21", "15:00"),
+        ("Doctor appointment on October 25th at 2:30pm", "2025-10-25", "14:30"),
+        ("lunch with Sam tomorrow at noon", "2025-10-21", "12:00"),
+        ("Team meeting friday 10:00", "2025-10-24", "10:00"),
+        ("Parent teacher conference 3/2 at 9am", "2026-03-02", "09:00"),
+    ],
+)
+def test_events_resolve_relative_dates(text, event_date, event_time):
+    result = classify(text, TODAY)
+
+    assert result.kind == "event"
+    [event] = result.processed.calendar_events
+    assert (event.event_date, event.event_time) == (event_date, event_time)
+
+
+def test_ambiguous_dates_have_low_confidence():
+    assert classify("Soccer practice next Thursday at 4pm", TODAY).confidence < 0.8
+    # Said on a Monday, "monday" means next week
+    result = classify("yoga monday 7am", TODAY)
+    assert result.processed.calendar_events[0].event_date == "2025-10-27"
+    assert result.confidence < 0.9
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Call the babysitter and buy milk",
+        "Remember to call mom this weekend",
+        "Call the dentist, pick up dry cleaning, and email the teacher",
+        "Buy birthday present for Noah's party by Friday",
+        "Plan Noah's birthday party next month",
+    ],
+)
+def test_tasks_and_mixed_dumps_are_left_to_the_llm(text):
+    result = classify(text, TODAY)
+    assert result is None or result.confidence < 0.8
+
+
+@pytest.mark.anyio
+async def test_ai_service_skips_llm_for_trivial_dumps(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    service = AIService()
+
+    async def no_llm(messages):
+        raise AssertionError("the LLM should not be called")
+
+    service.extraction_llm = RunnableLambda(no_llm)
+    hits_before = fast_path_requests.value(outcome="hit")
+
+    result = await service.process_brain_dump("milk, eggs and bread")
+
+    assert descriptions(result.shopping_items) == ["Milk", "Eggs", "Bread"]
+    assert fast_path_requests.value(outcome="hit") == hits_before + 1
+
+    streamed = [item async for item in service.stream_brain_dump("milk and eggs")]
+    assert [category for category, _ in streamed] == ["shopping_items"] * 2
+
+
+def test_fast_path_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+
+    assert AIService()._fast_path("milk, eggs", datetime.now()) is None
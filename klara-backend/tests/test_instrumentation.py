@@ -0,0 +1,127 @@
+"""
+Test request and LLM call instrumentation: histograms, route labels, cost
+and structured logs
+"""
+
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai_service import AIService
+from app.http_metrics import http_request_duration, request_scope
+from app.llm_metrics import (
+    brain_dump_duration,
+    llm_call_duration,
+    llm_time_to_first_token,
+    usage_cost,
+)
+from app.metrics import MetricsRegistry
+from app.structured_logging import JsonFormatter
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+ROUTE = "/brain-dumps/"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    return AIService(llm=FakeBrainDumpLLM(latency_seconds=0, items=3))
+
+
+@pytest.fixture
+def in_request():
+    """Run as if handling a request to ROUTE"""
+    token = request_scope.set({"route": SimpleNamespace(path=ROUTE)})
+    yield
+    request_scope.reset(token)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = MetricsRegistry().histogram(
+        "test_seconds", "Test latency", ("route",), buckets=(0.1, 1)
+    )
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, route="/a")
+
+    lines = histogram.render().splitlines()
+
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/a"} 4' in lines
+    assert histogram.sum(route="/a") == pytest.approx(4.25)
+
+
+def test_requests_are_timed_by_route_template(client, test_user):
+    labels = {"method": "GET", "route": "/brain-dumps/jobs/{job_id}", "status": "404"}
+    before = http_request_duration.count(**labels)
+
+    client.get(f"/brain-dumps/jobs/12345?user_id={test_user.id}")
+    client.get(f"/brain-dumps/jobs/67890?user_id={test_user.id}")
+
+    assert http_request_duration.count(**labels) == before + 2
+
+
+def test_usage_cost_counts_cache_reads_at_their_price():
+    counts = {
+        "input": 2_000_000,
+        "output": 1_000_000,
+        "cache_read": 1_000_000,
+        "cache_creation": 0,
+    }
+
+    # 1M uncached input at $3, 1M cached at $0.30 and 1M output at $15
+    assert usage_cost(counts, "claude-sonnet-4-20250514") == pytest.approx(18.30)
+    assert usage_cost(counts, "unknown-model") is None
+
+
+@pytest.mark.anyio
+async def test_llm_calls_are_recorded_by_route(service, in_request, caplog):
+    labels = {"route": ROUTE, "model": "fake-brain-dump", "kind": "invoke"}
+    before = llm_call_duration.count(**labels, outcome="ok")
+    processed_before = brain_dump_duration.count(route=ROUTE, source="llm")
+
+    with caplog.at_level(logging.INFO, logger="app.llm_metrics"):
+        await service.process_brain_dump("Plan the week")
+
+    assert llm_call_duration.count(**labels, outcome="ok") == before + 1
+    assert brain_dump_duration.count(route=ROUTE, source="llm") == processed_before + 1
+    [record] = [r for r in caplog.records if r.getMessage() == "llm_call"]
+    assert record.route == ROUTE
+    assert record.prompt_version == service.prompt.version
+    assert record.outcome == "ok"
+
+
+@pytest.mark.anyio
+async def test_streams_record_time_to_first_token(service, in_request):
+    before = llm_time_to_first_token.count(route=ROUTE, model="fake-brain-dump")
+
+    items = [item async for item in service.stream_brain_dump("Plan the week")]
+
+    assert items
+    assert (
+        llm_time_to_first_token.count(route=ROUTE, model="fake-brain-dump")
+        == before + 1
+    )
+
+
+def test_json_log_lines_include_extra_fields():
+    record = logging.makeLogRecord(
+        {
+            "name": "app.llm_metrics",
+            "levelname": "INFO",
+            "msg": "llm_call",
+            "model": "claude-sonnet-4-20250514",
+            "latency_ms": 812,
+        }
+    )
+
+    line = json.loads(JsonFormatter().format(record))
+
+    assert line["message"] == "llm_call"
+    assert line["level"] == "info"
+    assert line["model"] == "claude-sonnet-4-20250514"
+    assert line["latency_ms"] == 812
@@ -0,0 +1,181 @@
+"""
+Test the paginated list endpoints for tasks, shopping items and calendar events
+"""
+
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.db_models import Task, ShoppingItem, CalendarEvent
+
+
+def fetch_all(client, path, **params):
+    """Follow next_cursor until the last page, returning all pages"""
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get(path, params=query)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def seeded(test_db_session, test_user):
+    """25 tasks (every third completed, every other with a due date),
+    12 shopping items and 15 calendar events, plus rows of another user"""
+    start = date(2025, 11, 1)
+    test_db_session.add_all(
+        Task(
+            user_id=test_user.id,
+            description=f"Task {i}",
+            completed=i % 3 == 0,
+            due_date=start + timedelta(days=i % 7) if i % 2 == 0 else None,
+        )
+        for i in range(25)
+    )
+    test_db_session.add_all(
+        ShoppingItem(
+            user_id=test_user.id,
+            description=f"Item {i}",
+            completed=i % 4 == 0,
+        )
+        for i in range(12)
+    )
+    test_db_session.add_all(
+        CalendarEvent(
+            user_id=test_user.id,
+            description=f"Event {i}",
+            event_date=start + timedelta(days=i % 5),
+            event_time=time(9 + i % 8),
+        )
+        for i in range(15)
+    )
+    test_db_session.add(Task(user_id=test_user.id + 1, description="Not mine"))
+    test_db_session.commit()
+    return test_user
+
+
+def test_tasks_are_paged_newest_first(client, seeded):
+    pages = fetch_all(client, "/tasks/", user_id=seeded.id, limit=10)
+
+    assert [len(page["items"]) for page in pages] == [10, 10, 5]
+    ids = [task["id"] for page in pages for task in page["items"]]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 25
+
+
+def test_tasks_filtered_by_completion_and_due_date(client, seeded):
+    open_tasks = fetch_all(client, "/tasks/", user_id=seeded.id, completed=False)
+    assert all(not task["completed"] for task in open_tasks[0]["items"])
+    assert len(open_tasks[0]["items"]) == 16
+
+    pages = fetch_all(
+        client,
+        "/tasks/",
+        user_id=seeded.id,
+        due_from="2025-11-02",
+        due_to="2025-11-05",
+        limit=2,
+    )
+    tasks = [task for page in pages for task in page["items"]]
+    keys = [(task["due_date"], task["id"]) for task in tasks]
+    assert keys == sorted(keys)
+    assert all("2025-11-02" <= due <= "2025-11-05" for due, _ in keys)
+    assert len(tasks) == 8
+    # Open and completed tasks are paged together
+    assert {task["completed"] for task in tasks} == {False, True}
+
+
+def test_shopping_items_are_paged(client, seeded):
+    pages = fetch_all(
+        client, "/shopping-items/", user_id=seeded.id, completed=False, limit=4
+    )
+
+    items = [item for page in pages for item in page["items"]]
+    assert len(items) == 9
+    assert [len(page["items"]) for page in pages] == [4, 4, 1]
+
+
+def test_calendar_events_are_paged_in_date_order(client, seeded):
+    pages = fetch_all(
+        client,
+        "/calendar-events/",
+        user_id=seeded.id,
+        date_from="2025-11-02",
+        limit=5,
+    )
+
+    events = [event for page in pages for event in page["items"]]
+    keys = [(event["event_date"], event["id"]) for event in events]
+    assert keys == sorted(keys)
+    assert len(events) == 12
+
+
+def test_invalid_cursor_is_rejected(client, seeded):
+    response = client.get("/tasks/", params={"user_id": seeded.id, "cursor": "nope"})
+    assert response.status_code == 400
+
+    # A cursor from one ordering can't be used with another
+    first_page = client.get("/tasks/", params={"user_id": seeded.id, "limit": 5})
+    response = client.get(
+        "/calendar-events/",
+        params={"user_id": seeded.id, "cursor": first_page.json()["next_cursor"]},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "path, params, index",
+    [
+        ("/tasks/", {}, "ix_tasks_user_id_id"),
+        ("/tasks/", {"completed": False}, "ix_tasks_user_id_completed_id"),
+        ("/tasks/", {"due_from": "2025-11-01"}, "ix_tasks_user_id_due_date_id"),
+        (
+            "/tasks/",
+            {"completed": False, "due_from": "2025-11-01"},
+            "ix_tasks_user_id_completed_due_date",
+        ),
+        (
+            "/shopping-items/",
+            {"completed": True},
+            "ix_shopping_items_user_id_completed_id",
+        ),
+        ("/calendar-events/", {}, "ix_calendar_events_user_id_event_date"),
+    ],
+)
+def test_pages_are_index_range_scans(
+    client, seeded, test_async_session_factory, test_db_engine, path, params, index
+):
+    """Later pages seek into the index: no OFFSET, no sort step"""
+    statements = []
+    async_engine = test_async_session_factory.kw["bind"].sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(async_engine, "before_cursor_execute", capture)
+    try:
+        first = client.get(path, params=dict(params, user_id=seeded.id, limit=3))
+        client.get(
+            path,
+            params=dict(
+                params, user_id=seeded.id, limit=3, cursor=first.json()["next_cursor"]
+            ),
+        )
+    finally:
+        event.remove(async_engine, "before_cursor_execute", capture)
+
+    # The page query (a task page is followed by the query for its subtasks)
+    statement, parameters = [s for s in statements if "FROM subtasks" not in s[0]][-1]
+    with test_db_engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert index in details
+    assert "TEMP B-TREE" not in details
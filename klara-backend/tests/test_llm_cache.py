@@ -0,0 +1,87 @@
+"""
+Test the content-addressed LLM response cache
+"""
+
+import pytest
+
+from app.llm_cache import (
+    LLMResponseCache,
+    LRUTTLCache,
+    SQLiteCacheBackend,
+    cache_entries,
+    cache_key,
+)
+from app.models import ProcessedBrainDump, ProcessedShoppingItem
+
+
+def make_result(*items):
+    return ProcessedBrainDump(
+        shopping_items=[ProcessedShoppingItem(description=item) for item in items]
+    )
+
+
+def test_cache_key_normalizes_text():
+    """Case and whitespace differences share a key; date/model/prompt do not"""
+    key = cache_key("Buy milk and eggs", "2025-10-20", "model", "v1")
+
+    assert cache_key("  buy MILK\n and eggs ", "2025-10-20", "model", "v1") == key
+    assert cache_key("Buy milk and eggs", "2025-10-21", "model", "v1") != key
+    assert cache_key("Buy milk and eggs", "2025-10-20", "other", "v1") != key
+    assert cache_key("Buy milk and eggs", "2025-10-20", "model", "v2") != key
+
+
+def test_lru_ttl_cache_evicts_and_expires():
+    now = [0.0]
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None  # least recently used entry evicted
+    assert cache.get("a") == 1
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert len(cache) == 1  # "c" not yet touched, still stored
+
+
+@pytest.mark.anyio
+async def test_response_cache_counts_hits_and_misses():
+    cache = LLMResponseCache(max_entries=10, ttl_seconds=60)
+    before = cache.stats()
+
+    assert await cache.get("key") is None
+    await cache.set("key", make_result("Milk"))
+    assert await cache.get("key") == make_result("Milk")
+
+    after = cache.stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["memory_hits"] == before["memory_hits"] + 1
+
+
+@pytest.mark.anyio
+async def test_response_cache_shared_tier(tmp_path):
+    """A second worker's cache finds results stored by the first one"""
+    path = str(tmp_path / "llm_cache.db")
+    writer = LLMResponseCache(shared=SQLiteCacheBackend(path, ttl_seconds=60))
+    reader = LLMResponseCache(shared=SQLiteCacheBackend(path, ttl_seconds=60))
+    before = reader.stats()
+
+    await writer.set("key", make_result("Eggs", "Bread"))
+
+    assert await reader.get("key") == make_result("Eggs", "Bread")
+    assert reader.stats()["shared_hits"] == before["shared_hits"] + 1
+    # Promoted to the in-process tier
+    assert await reader.get("key") == make_result("Eggs", "Bread")
+    assert reader.stats()["memory_hits"] == before["memory_hits"] + 1
+
+
+@pytest.mark.anyio
+async def test_entries_gauge_follows_the_newest_cache():
+    LLMResponseCache(max_entries=10, ttl_seconds=60)
+    current = LLMResponseCache(max_entries=10, ttl_seconds=60)
+
+    await current.set("key", make_result("Milk"))
+
+    assert cache_entries.samples() == {(): 1.0}
@@ -0,0 +1,114 @@
+"""
+Test routing brain dumps between models and hedging slow LLM calls
+"""
+
+import asyncio
+
+import pytest
+
+from app.ai_service import AIService
+from app.model_routing import (
+    Hedger,
+    LatencyWindow,
+    ModelRouter,
+    hedged_calls,
+    routed_calls,
+)
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+
+def test_short_simple_dumps_go_to_the_fast_model():
+    router = ModelRouter("full", "fast", fast_max_chars=50, fast_max_lines=2)
+
+    assert router.choose("Call mom") == "fast"
+    assert router.choose("Call mom\nBook flights\nPay rent") == "full"
+    assert router.choose("Call mom " * 10) == "full"
+    assert ModelRouter("full").choose("Call mom") == "full"
+
+
+def test_latency_window_percentile():
+    window = LatencyWindow(size=100)
+    for ms in range(1, 101):
+        window.add(ms / 1000)
+
+    assert window.percentile(0.95) == 0.095
+    assert LatencyWindow().percentile(0.95) is None
+
+
+@pytest.mark.anyio
+async def test_slow_call_is_hedged_and_the_hedge_wins():
+    hedger = Hedger(min_samples=1, min_delay_seconds=0.02)
+    hedger._record("full", 0.01)
+    calls = []
+
+    async def call():
+        calls.append(None)
+        # Only the first call is slow
+        await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    fired_before = hedged_calls.value(model="full", outcome="fired")
+    won_before = hedged_calls.value(model="full", outcome="won")
+
+    assert await asyncio.wait_for(hedger.run("full", call), timeout=1) == 2
+    assert hedged_calls.value(model="full", outcome="fired") - fired_before == 1
+    assert hedged_calls.value(model="full", outcome="won") - won_before == 1
+    # The cut-short primary is counted as slow, not left out
+    assert len(hedger.latencies["full"]) == 2
+
+
+@pytest.mark.anyio
+async def test_fast_calls_are_not_hedged():
+    hedger = Hedger(min_samples=1, min_delay_seconds=0.5)
+    hedger._record("full", 0.5)
+    calls = []
+
+    async def call():
+        calls.append(None)
+        return "ok"
+
+    assert await hedger.run("full", call) == "ok"
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_ai_service_routes_by_dump_size(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    monkeypatch.setenv("LLM_ROUTING_ENABLED", "true")
+    service = AIService(
+        llm=FakeBrainDumpLLM(latency_seconds=0, items=9),
+        fast_llm=FakeBrainDumpLLM(model="fake-fast", latency_seconds=0, items=3),
+    )
+
+    short = await service.extract_brain_dump("Call mom")
+    long = await service.extract_brain_dump("Plan the trip. " * 30)
+    streamed = [item async for item in service.stream_brain_dump("Call mom")]
+
+    assert service.router.fast_model == "fake-fast"
+    assert (
+        len(short.tasks) + len(short.shopping_items) + len(short.calendar_events) == 3
+    )
+    assert len(long.tasks) + len(long.shopping_items) + len(long.calendar_events) == 9
+    assert len(streamed) == 3
+
+
+@pytest.mark.anyio
+async def test_only_dumps_sent_to_the_llm_are_counted_as_routed(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "true")
+    monkeypatch.setenv("LLM_ROUTING_ENABLED", "true")
+    service = AIService(
+        llm=FakeBrainDumpLLM(latency_seconds=0, items=9),
+        fast_llm=FakeBrainDumpLLM(model="fake-fast", latency_seconds=0, items=3),
+    )
+    before = routed_calls.value(model="fake-fast")
+
+    await service.extract_brain_dump("Call mom")
+    # Served from the cache
+    await service.extract_brain_dump("Call mom")
+    [item async for item in service.stream_brain_dump("Call mom")]
+    # Handled by the fast path
+    await service.extract_brain_dump("milk, eggs, bread")
+
+    assert routed_calls.value(model="fake-fast") - before == 1
@@ -0,0 +1,75 @@
+"""
+Test the compiled brain dump prompt and LLM token metrics
+"""
+
+import pytest
+
+from app.ai_service import AIService
+from app.llm_metrics import llm_tokens, record_call, usage_counts
+from app.prompts import BRAIN_DUMP_PROMPT
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+# Usage of each reply RepeatedUsageLLM sent
+REPORTED_USAGE = []
+
+
+class RepeatedUsageLLM(FakeBrainDumpLLM):
+    """
+    Reports the reply's usage on every chunk, as Anthropic repeats input
+    tokens on message_start and message_delta
+    """
+
+    def _chunks(self, message):
+        REPORTED_USAGE.append(message.usage_metadata)
+        for generation in super()._chunks(message):
+            generation.message.usage_metadata = message.usage_metadata
+            yield generation
+
+
+def test_static_prefix_is_cacheable_and_date_is_separate():
+    system, human = BRAIN_DUMP_PROMPT.messages("Buy milk", "2025-10-20")
+    static_block, date_block = system.content
+
+    assert static_block["cache_control"] == {"type": "ephemeral"}
+    assert "2025-10-20" not in static_block["text"]
+    assert BRAIN_DUMP_PROMPT.format_instructions in static_block["text"]
+    assert date_block == {"type": "text", "text": "Current date: 2025-10-20"}
+    assert human.content == "Buy milk"
+
+    # The static prefix is identical on every request
+    other_system, _ = BRAIN_DUMP_PROMPT.messages("Call mom", "2025-10-21")
+    assert other_system.content[0] == static_block
+
+
+def test_token_usage_counters():
+    usage = {
+        "input_tokens": 1900,
+        "output_tokens": 50,
+        "input_token_details": {"cache_read": 1800, "cache_creation": 0},
+    }
+    before = llm_tokens.value(model="test-model", type="cache_read")
+
+    record_call("test-model", "v1", "invoke", 0.5, "ok", usage_counts(usage))
+
+    assert llm_tokens.value(model="test-model", type="cache_read") == before + 1800
+
+
+@pytest.mark.anyio
+async def test_stream_usage_does_not_double_count_input(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    service = AIService(llm=RepeatedUsageLLM(latency_seconds=0, items=3))
+    before = {
+        token_type: llm_tokens.value(model="fake-brain-dump", type=token_type)
+        for token_type in ("input", "output")
+    }
+
+    items = [item async for item in service.stream_brain_dump("Plan the week")]
+
+    assert items
+    [reported] = REPORTED_USAGE
+    for token_type in ("input", "output"):
+        assert (
+            llm_tokens.value(model="fake-brain-dump", type=token_type)
+            == before[token_type] + reported[f"{token_type}_tokens"]
+        )
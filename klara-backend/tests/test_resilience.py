@@ -0,0 +1,153 @@
+"""
+Test LLM call timeouts, retries and the circuit breaker
+"""
+
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+
+from app.ai_service import AIService
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+    RetryBudget,
+    circuit_rejections,
+    llm_retries,
+    llm_timeouts,
+)
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def status_error(status_code):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status_code, request=request)
+    return anthropic.APIStatusError("failed", response=response, body=None)
+
+
+def failing_call(*errors, result="ok"):
+    """A call raising the given errors on its first attempts, then succeeding"""
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return result
+
+    return call, attempts
+
+
+def test_breaker_opens_then_probes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()  # the probe
+    assert breaker.state == "half_open" and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+@pytest.mark.anyio
+async def test_retryable_errors_are_retried():
+    caller = ResilientCaller(backoff_base_seconds=0.001)
+    call, attempts = failing_call(status_error(529), status_error(500))
+    retries_before = llm_retries.value(error="APIStatusError")
+
+    assert await caller.call(call) == "ok"
+
+    assert len(attempts) == 3
+    assert llm_retries.value(error="APIStatusError") - retries_before == 2
+    assert caller.breaker.failures == 0
+
+
+@pytest.mark.anyio
+async def test_client_errors_are_not_retried():
+    caller = ResilientCaller(backoff_base_seconds=0.001)
+    call, attempts = failing_call(status_error(400))
+
+    with pytest.raises(anthropic.APIStatusError):
+        await caller.call(call)
+
+    assert len(attempts) == 1
+    # The provider answered, so it counts as healthy
+    assert caller.breaker.failures == 0
+
+
+@pytest.mark.anyio
+async def test_slow_attempts_time_out_and_open_the_circuit():
+    caller = ResilientCaller(
+        call_timeout_seconds=0.02,
+        max_retries=1,
+        backoff_base_seconds=0.001,
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60),
+    )
+    timeouts_before = llm_timeouts.value()
+
+    async def slow_call():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await caller.call(slow_call)
+    assert llm_timeouts.value() - timeouts_before == 2
+    assert caller.breaker.state == "open"
+
+    rejections_before = circuit_rejections.value()
+    call, attempts = failing_call()
+    with pytest.raises(CircuitOpenError):
+        await caller.call(call)
+    assert attempts == []
+    assert circuit_rejections.value() - rejections_before == 1
+
+
+@pytest.mark.anyio
+async def test_retries_stop_when_the_budget_is_spent():
+    caller = ResilientCaller(
+        backoff_base_seconds=0.001, budget=RetryBudget(ratio=0, min_retries=1)
+    )
+    call, attempts = failing_call(*[status_error(503)] * 3)
+
+    with pytest.raises(anthropic.APIStatusError):
+        await caller.call(call)
+
+    assert len(attempts) == 2
+
+
+@pytest.mark.anyio
+async def test_open_circuit_uses_the_rule_based_path(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0, items=3))
+    service.resilience.breaker = CircuitBreaker(failure_threshold=1)
+    service.resilience.breaker.record_failure()
+
+    # The rules are used even with the fast path off, rather than a bare task
+    result = await service.process_brain_dump("buy milk and eggs")
+    streamed = [item async for item in service.stream_brain_dump("Call mom")]
+
+    assert service.in_flight == 0
+    assert [item.description for item in result.shopping_items] == ["Milk", "Eggs"]
+    assert [(category, item.description) for category, item in streamed] == [
+        ("tasks", "Call mom")
+    ]
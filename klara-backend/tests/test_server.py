@@ -0,0 +1,33 @@
+"""
+Test the production server settings
+"""
+
+from app.server import server_options_from_env
+
+
+def test_defaults(monkeypatch):
+    for name in ("WEB_CONCURRENCY", "KEEPALIVE_SECONDS", "BACKLOG", "PORT"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+
+    options = server_options_from_env()
+
+    assert options["workers"] == 4
+    assert (options["loop"], options["http"]) == ("auto", "auto")
+    assert options["timeout_keep_alive"] == 75
+    assert options["backlog"] == 2048
+    assert options["port"] == 8000
+
+
+def test_environment_overrides(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setenv("KEEPALIVE_SECONDS", "120")
+    monkeypatch.setenv("GRACEFUL_SHUTDOWN_SECONDS", "10")
+    monkeypatch.setenv("ACCESS_LOG", "true")
+
+    options = server_options_from_env()
+
+    assert options["workers"] == 2
+    assert options["timeout_keep_alive"] == 120
+    assert options["timeout_graceful_shutdown"] == 10
+    assert options["access_log"] is True
@@ -0,0 +1,80 @@
+"""
+Test the Server-Timing header, the per-request log line and GET /debug/latency
+"""
+
+import logging
+
+import pytest
+
+from app import server_timing
+from app.ai_service import AIService
+from app.routes import brain_dumps
+from app.server_timing import PhaseTimings
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+
+def server_timing_phases(header):
+    """Phase names of a Server-Timing header, in order"""
+    return [entry.split(";")[0] for entry in header.split(", ")]
+
+
+@pytest.fixture
+def timed_db(test_async_session_factory):
+    """Count the test database's statements in the "db" phase"""
+    server_timing.instrument_engine(test_async_session_factory.kw["bind"].sync_engine)
+
+
+def test_header_lists_phases_then_total():
+    timings = PhaseTimings()
+    timings.add("db", 0.002)
+    timings.add("llm", 0.8)
+    timings.add("db", 0.001)
+
+    assert timings.header(0.85) == "db;dur=3.0, llm;dur=800.0, total;dur=850.0"
+
+
+def test_login_reports_db_time(client, test_user, timed_db):
+    response = client.post("/auth/login", json={"email": test_user.email})
+
+    assert response.status_code == 200
+    assert server_timing_phases(response.headers["server-timing"]) == ["db", "total"]
+    assert response.headers["timing-allow-origin"] == "*"
+
+
+def test_brain_dump_reports_phases_and_logs_one_line(
+    client, test_user, timed_db, monkeypatch, caplog
+):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0, items=3))
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", service.process_brain_dump
+    )
+
+    with caplog.at_level(logging.INFO, logger="app.server_timing"):
+        response = client.post(
+            "/brain-dumps/", json={"text": "Plan the week", "user_id": test_user.id}
+        )
+
+    assert response.status_code == 200
+    assert server_timing_phases(response.headers["server-timing"]) == [
+        "llm",
+        "parse",
+        "db",
+        "total",
+    ]
+    [record] = [r for r in caplog.records if r.getMessage() == "request"]
+    assert record.route == "POST /brain-dumps/"
+    assert record.status == 200
+    assert record.llm_ms <= record.total_ms
+
+
+def test_debug_latency_has_percentiles_per_route(client):
+    for _ in range(3):
+        client.get("/")
+
+    response = client.get("/debug/latency")
+
+    total = response.json()["GET /"]["total"]
+    assert total["count"] >= 3
+    assert total["p50_ms"] <= total["p99_ms"]
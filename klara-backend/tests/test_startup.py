@@ -0,0 +1,33 @@
+"""
+Test that importing the app is side-effect free and startup is measured
+"""
+
+import os
+import subprocess
+import sys
+
+from app.main import startup_seconds
+
+
+def test_import_does_not_touch_database_or_llm(tmp_path):
+    """Importing the app neither creates tables nor needs an API key"""
+    database = tmp_path / "startup.db"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    env.pop("ANTHROPIC_API_KEY", None)
+
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+        env=env,
+        check=True,
+    )
+
+    assert not database.exists()
+
+
+def test_startup_time_is_reported(client):
+    assert startup_seconds.value(phase="import") > 0
+    assert startup_seconds.value(phase="lifespan") > 0
+
+    response = client.get("/metrics")
+    assert 'app_startup_seconds{phase="lifespan"}' in response.text
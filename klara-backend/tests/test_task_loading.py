@@ -0,0 +1,66 @@
+"""
+Test that tasks and their subtasks load in a constant number of queries
+"""
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.access import task_access
+from app.db_models import Task, SubTask
+
+
+def seed_tasks(session, user_id, count):
+    """Create `count` tasks; every task but the last gets three subtasks"""
+    task_ids = session.scalars(
+        insert(Task).returning(Task.id),
+        [{"user_id": user_id, "description": f"Task {i}"} for i in range(count)],
+    ).all()
+    subtask_rows = [
+        # Inserted out of order to check that subtasks come back sorted
+        {"parent_task_id": task_id, "description": f"Step {order}", "order": order}
+        for task_id in task_ids[:-1]
+        for order in (3, 1, 2)
+    ]
+    if subtask_rows:
+        session.execute(insert(SubTask), subtask_rows)
+    session.commit()
+    return sorted(task_ids)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("count", [1, 100, 1000])
+async def test_get_tasks_uses_two_queries(
+    test_db_session, test_async_session_factory, test_user, count
+):
+    task_ids = seed_tasks(test_db_session, test_user.id, count)
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    engine = test_async_session_factory.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        async with test_async_session_factory() as session:
+            tasks = await task_access.get_tasks(session, test_user.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    assert len(statements) == 2
+    assert [task.id for task in tasks] == task_ids
+    assert tasks[-1].subtasks is None
+    for task in tasks[:-1]:
+        assert [subtask.order for subtask in task.subtasks] == [1, 2, 3]
+        assert {subtask.parent_task_id for subtask in task.subtasks} == {task.id}
+
+
+def test_task_list_includes_subtasks(client, test_db_session, test_user):
+    seed_tasks(test_db_session, test_user.id, 3)
+
+    response = client.get("/tasks/", params={"user_id": test_user.id})
+
+    tasks = response.json()["items"]
+    assert tasks[0]["subtasks"] is None
+    assert [
+        [subtask["description"] for subtask in task["subtasks"]] for task in tasks[1:]
+    ] == [["Step 1", "Step 2", "Step 3"]] * 2
@@ -0,0 +1,109 @@
+"""
+Test request tracing: spans per phase, tail sampling of slow traces and the
+OTLP JSON lines export
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.ai_service import AIService
+from app.database import TracedSession
+from app.routes import brain_dumps
+from app.tracing import (
+    JsonlExporter,
+    Tracer,
+    format_tree,
+    instrument_engine,
+    load_traces,
+    tracer,
+)
+from benchmarks.fake_llm import FakeBrainDumpLLM
+
+
+class MemoryExporter(list):
+    def export(self, trace):
+        self.append(trace)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    """Trace every request and collect the traces"""
+    exporter = MemoryExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_ratio", 1.0)
+    return exporter
+
+
+def test_brain_dump_request_is_traced_by_phase(
+    client, test_user, test_async_session_factory, exported, monkeypatch
+):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("FAST_PATH_ENABLED", "false")
+    service = AIService(llm=FakeBrainDumpLLM(latency_seconds=0, items=3))
+    monkeypatch.setattr(
+        brain_dumps.get_ai_service(), "process_brain_dump", service.process_brain_dump
+    )
+    instrument_engine(test_async_session_factory.kw["bind"].sync_engine)
+
+    response = client.post(
+        "/brain-dumps/", json={"text": "Plan the week", "user_id": test_user.id}
+    )
+
+    assert response.status_code == 200
+    [trace] = exported
+    assert response.headers["x-trace-id"] == trace.trace_id
+    spans = {span.name: span for span in trace.spans}
+    root = spans["POST /brain-dumps/"]
+    assert root.parent_id is None
+    assert root.attributes["http.response.status_code"] == 200
+    for name in ("prompt.build", "llm.call", "llm.parse", "brain_dump.save"):
+        assert spans[name].parent_id == root.span_id
+    assert spans["llm.call"].attributes["gen_ai.request.model"] == "fake-brain-dump"
+    inserts = [span for span in trace.spans if span.name == "INSERT"]
+    assert inserts
+    assert all(span.parent_id == spans["brain_dump.save"].span_id for span in inserts)
+
+
+def test_incoming_traceparent_is_continued(client, exported):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    client.get("/", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+    [trace] = exported
+    assert trace.trace_id == trace_id
+    assert trace.spans[0].parent_id == "00f067aa0ba902b7"
+
+
+def test_only_sampled_or_slow_traces_are_kept():
+    exporter = MemoryExporter()
+    never_sampled = Tracer(exporter, sample_ratio=0.0, slow_seconds=60)
+    with never_sampled.start_trace("fast"):
+        pass
+
+    always_slow = Tracer(exporter, sample_ratio=0.0, slow_seconds=0)
+    with always_slow.start_trace("slow"):
+        with always_slow.span("child"):
+            pass
+
+    assert [trace.spans[-1].name for trace in exporter] == ["slow"]
+
+
+@pytest.mark.anyio
+async def test_statements_and_commits_are_spans(tmp_path, monkeypatch):
+    trace_file = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracer, "exporter", JsonlExporter(trace_file, "test"))
+    monkeypatch.setattr(tracer, "sample_ratio", 1.0)
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine.sync_engine)
+    try:
+        with tracer.start_trace("job"):
+            async with TracedSession(bind=engine) as session:
+                await session.execute(text("SELECT 1"))
+                await session.commit()
+    finally:
+        await engine.dispose()
+
+    [trace] = load_traces(trace_file)
+    tree = format_tree(trace["spans"])
+    assert [line.split()[-1] for line in tree] == ["job", "SELECT", "COMMIT"]